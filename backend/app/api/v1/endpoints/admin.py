@@ -1,77 +1,166 @@
 """
 Endpoints de administración (solo para rol admin).
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
 from app.db.deps import get_db
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, modulos_efectivos
+from app.services.usuario_importacion_service import UsuarioImportacionService, leer_csv_usuarios
 from app.schemas.auth import (
     UsuarioCreate,
     UsuarioUpdate,
     UsuarioResponse,
+    UsuarioListItem,
+    UsuarioImportacionRequest,
+    UsuarioImportacionResponse,
     RoleResponse,
     ModuloResponse
 )
 from app.core.security import require_role
-from app.models.auth import Usuario
+from app.core.concurrency import run_sync
+from app.core.principal import Principal
+from app.core.config import settings
 
 router = APIRouter()
 
 
 # === Gestión de Usuarios ===
 
-@router.get("/users", response_model=List[UsuarioResponse])
+@router.get("/users", response_model=List[UsuarioListItem])
 async def list_users(
-    current_user: Usuario = Depends(require_role(["admin"])),
+    response: Response,
+    q: Optional[str] = Query(None, description="Busca en username, nombre completo y email"),
+    activo: Optional[bool] = Query(None, description="Filtra por estado"),
+    orden: Literal["username", "-username", "id", "-id", "created_at", "-created_at"] = Query(
+        "username", description="Columna de orden; con '-' delante, descendente"
+    ),
+    limite: Optional[int] = Query(None, ge=1, le=500, description="Tamaño de página; sin límite trae todos"),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
-    """Listar todos los usuarios del sistema."""
+    """
+    Listar usuarios con su rol y módulos efectivos.
+    
+    Paginación por keyset: si hay más resultados, el header X-Next-Cursor trae
+    el cursor para pedir la página siguiente con los mismos filtros y orden.
+    """
     auth_service = AuthService(db)
-    users = auth_service.get_all_users()
-    return [UsuarioResponse.model_validate(u) for u in users]
+    
+    def listar():
+        users, siguiente = auth_service.list_users_page(
+            orden=orden, busqueda=q, activo=activo, cursor=cursor, limite=limite
+        )
+        items = [
+            UsuarioListItem.model_validate(u).model_copy(update={"modulos_efectivos": modulos_efectivos(u)})
+            for u in users
+        ]
+        return items, siguiente
+    
+    items, siguiente = await run_sync(listar)
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
+    return items
 
 
 @router.post("/users", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UsuarioCreate,
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Crear un nuevo usuario."""
     auth_service = AuthService(db)
     
-    # Verificar que el username no exista
-    existing = auth_service.repository.get_user_by_username(user_data.username)
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"El usuario '{user_data.username}' ya existe"
+    def crear():
+        # Verificar que el username no exista
+        existing = auth_service.repository.get_user_by_username(user_data.username)
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El usuario '{user_data.username}' ya existe"
+            )
+        
+        # Crea el usuario
+        user = auth_service.create_user(
+            username=user_data.username,
+            password=user_data.password,
+            rol_id=user_data.rol_id,
+            email=user_data.email,
+            nombre_completo=user_data.nombre_completo,
+            modulo_ids=user_data.modulo_ids
         )
+        
+        return UsuarioResponse.model_validate(user)
+    
+    return await run_sync(crear)
+
+
+@router.post("/users/importar", response_model=UsuarioImportacionResponse)
+async def import_users(
+    request: UsuarioImportacionRequest,
+    current_user: Principal = Depends(require_role(["admin"])),
+    db: Session = Depends(get_db)
+):
+    """
+    Crear o actualizar usuarios en lote (JSON).
+    
+    Las filas válidas se guardan en una sola transacción; las inválidas se
+    informan en `resultados` con su error y no impiden importar las demás.
+    """
+    _verificar_tamano_importacion(len(request.usuarios))
+    service = UsuarioImportacionService(db)
+    return await run_sync(service.importar, request.usuarios, request.actualizar_existentes)
+
+
+@router.post("/users/importar/csv", response_model=UsuarioImportacionResponse)
+async def import_users_csv(
+    archivo: UploadFile = File(..., description="CSV con columnas username, password, email, nombre_completo, rol, modulos, activo"),
+    actualizar_existentes: bool = Query(True, description="False: un username existente es error"),
+    current_user: Principal = Depends(require_role(["admin"])),
+    db: Session = Depends(get_db)
+):
+    """
+    Crear o actualizar usuarios en lote desde un CSV.
     
-    # Crea el usuario
-    user = auth_service.create_user(
-        username=user_data.username,
-        password=user_data.password,
-        rol_id=user_data.rol_id,
-        email=user_data.email,
-        nombre_completo=user_data.nombre_completo,
-        modulo_ids=user_data.modulo_ids
-    )
+    `modulos` separa los códigos con '|'. Las filas que no se pueden leer
+    vuelven como error junto al resultado de las demás.
+    """
+    contenido = await archivo.read()
+    try:
+        filas, errores = await run_sync(leer_csv_usuarios, contenido)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    return UsuarioResponse.model_validate(user)
+    _verificar_tamano_importacion(len(filas))
+    service = UsuarioImportacionService(db)
+    return await run_sync(service.importar, filas, actualizar_existentes, errores)
+
+
+def _verificar_tamano_importacion(filas: int) -> None:
+    if filas > settings.USUARIOS_IMPORTACION_MAX_FILAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {settings.USUARIOS_IMPORTACION_MAX_FILAS} usuarios por importación"
+        )
 
 
 @router.get("/users/{user_id}", response_model=UsuarioResponse)
 async def get_user(
     user_id: int,
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Obtener un usuario por ID."""
     auth_service = AuthService(db)
-    user = auth_service.get_user_by_id(user_id)
+    
+    def obtener():
+        user = auth_service.get_user_by_id(user_id)
+        return UsuarioResponse.model_validate(user) if user else None
+    
+    user = await run_sync(obtener)
     
     if not user:
         raise HTTPException(
@@ -79,28 +168,32 @@ async def get_user(
             detail="Usuario no encontrado"
         )
     
-    return UsuarioResponse.model_validate(user)
+    return user
 
 
 @router.put("/users/{user_id}", response_model=UsuarioResponse)
 async def update_user(
     user_id: int,
     user_data: UsuarioUpdate,
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Actualizar un usuario existente."""
     auth_service = AuthService(db)
     
-    user = auth_service.update_user(
-        user_id=user_id,
-        email=user_data.email,
-        nombre_completo=user_data.nombre_completo,
-        rol_id=user_data.rol_id,
-        activo=user_data.activo,
-        password=user_data.password,
-        modulo_ids=user_data.modulo_ids
-    )
+    def actualizar():
+        user = auth_service.update_user(
+            user_id=user_id,
+            email=user_data.email,
+            nombre_completo=user_data.nombre_completo,
+            rol_id=user_data.rol_id,
+            activo=user_data.activo,
+            password=user_data.password,
+            modulo_ids=user_data.modulo_ids
+        )
+        return UsuarioResponse.model_validate(user) if user else None
+    
+    user = await run_sync(actualizar)
     
     if not user:
         raise HTTPException(
@@ -108,13 +201,13 @@ async def update_user(
             detail="Usuario no encontrado"
         )
     
-    return UsuarioResponse.model_validate(user)
+    return user
 
 
 @router.delete("/users/{user_id}", response_model=UsuarioResponse)
 async def deactivate_user(
     user_id: int,
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Desactivar un usuario (soft delete)."""
@@ -125,7 +218,12 @@ async def deactivate_user(
         )
     
     auth_service = AuthService(db)
-    user = auth_service.deactivate_user(user_id)
+    
+    def desactivar():
+        user = auth_service.deactivate_user(user_id)
+        return UsuarioResponse.model_validate(user) if user else None
+    
+    user = await run_sync(desactivar)
     
     if not user:
         raise HTTPException(
@@ -133,19 +231,36 @@ async def deactivate_user(
             detail="Usuario no encontrado"
         )
     
-    return UsuarioResponse.model_validate(user)
+    return user
+
+
+@router.post("/users/{user_id}/revocar-sesiones", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_user_sessions(
+    user_id: int,
+    current_user: Principal = Depends(require_role(["admin"])),
+    db: Session = Depends(get_db)
+):
+    """Cerrar todas las sesiones abiertas de un usuario (sus tokens actuales dejan de valer)."""
+    auth_service = AuthService(db)
+    user = await run_sync(auth_service.revoke_sessions, user_id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
 
 
 # === Gestión de Roles ===
 
 @router.get("/roles", response_model=List[RoleResponse])
 async def list_roles(
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Listar todos los roles disponibles."""
     auth_service = AuthService(db)
-    roles = auth_service.get_all_roles()
+    roles = await run_sync(auth_service.get_all_roles)
     return [RoleResponse.model_validate(r) for r in roles]
 
 
@@ -153,12 +268,12 @@ async def list_roles(
 
 @router.get("/modules", response_model=List[ModuloResponse])
 async def list_modules(
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Listar todos los módulos (activos e inactivos)."""
     auth_service = AuthService(db)
-    modules = auth_service.get_all_modules(only_active=False)
+    modules = await run_sync(auth_service.get_all_modules, only_active=False)
     return [ModuloResponse.model_validate(m) for m in modules]
 
 
@@ -166,12 +281,12 @@ async def list_modules(
 async def toggle_module(
     module_id: int,
     active: bool,
-    current_user: Usuario = Depends(require_role(["admin"])),
+    current_user: Principal = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Activar o desactivar un módulo."""
     auth_service = AuthService(db)
-    module = auth_service.toggle_module(module_id, active)
+    module = await run_sync(auth_service.toggle_module, module_id, active)
     
     if not module:
         raise HTTPException(
@@ -3,6 +3,7 @@ Endpoints de autenticación.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from typing import Optional
 from sqlalchemy.orm import Session
 
 from app.db.deps import get_db
@@ -14,12 +15,39 @@ from app.schemas.auth import (
     ModuloResponse,
     UsuarioResponse
 )
-from app.core.security import get_current_user
+from app.core.security import get_current_user, decode_access_token, oauth2_scheme_opcional
+from app.core.revocacion import lista_revocacion
+from app.core.concurrency import run_sync
 from app.models.auth import Usuario
 
 router = APIRouter()
 
 
+def _build_auth_response(auth_service: AuthService, user: Usuario) -> AuthResponse:
+    """Arma la respuesta de login (puede disparar lazy loads de rol y módulos)."""
+    # Generar token
+    access_token = auth_service.create_token_for_user(user)
+    
+    # Obtener módulos permitidos
+    modules = auth_service.get_user_modules(user)
+    
+    return AuthResponse(
+        access_token=access_token,
+        token_type="bearer",
+        user=UsuarioResponse.model_validate(user),
+        modulos=[ModuloResponse.model_validate(m) for m in modules]
+    )
+
+
+def _build_me_response(auth_service: AuthService, user: Usuario) -> MeResponse:
+    """Arma la respuesta de /me."""
+    modules = auth_service.get_user_modules(user)
+    return MeResponse(
+        user=UsuarioResponse.model_validate(user),
+        modulos=[ModuloResponse.model_validate(m) for m in modules]
+    )
+
+
 @router.post("/login", response_model=AuthResponse)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -32,7 +60,9 @@ async def login(
     """
     auth_service = AuthService(db)
     
-    user = auth_service.authenticate(form_data.username, form_data.password)
+    # bcrypt y las queries son bloqueantes: se ejecutan fuera del event loop.
+    # Si el pool de bcrypt está saturado responde 503 de inmediato.
+    user = await auth_service.authenticate_async(form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -41,18 +71,7 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Generar token
-    access_token = auth_service.create_token_for_user(user)
-    
-    # Obtener módulos permitidos
-    modules = auth_service.get_user_modules(user)
-    
-    return AuthResponse(
-        access_token=access_token,
-        token_type="bearer",
-        user=UsuarioResponse.model_validate(user),
-        modulos=[ModuloResponse.model_validate(m) for m in modules]
-    )
+    return await run_sync(_build_auth_response, auth_service, user)
 
 
 @router.get("/me", response_model=MeResponse)
@@ -64,12 +83,7 @@ async def get_current_user_info(
     Obtener información del usuario actual autenticado.
     """
     auth_service = AuthService(db)
-    modules = auth_service.get_user_modules(current_user)
-    
-    return MeResponse(
-        user=UsuarioResponse.model_validate(current_user),
-        modulos=[ModuloResponse.model_validate(m) for m in modules]
-    )
+    return await run_sync(_build_me_response, auth_service, current_user)
 
 
 @router.get("/modules", response_model=list[ModuloResponse])
@@ -81,17 +95,22 @@ async def get_user_modules(
     Obtener los módulos a los que el usuario tiene acceso.
     """
     auth_service = AuthService(db)
-    modules = auth_service.get_user_modules(current_user)
     
-    return [ModuloResponse.model_validate(m) for m in modules]
+    def listar_modulos():
+        return [ModuloResponse.model_validate(m) for m in auth_service.get_user_modules(current_user)]
+    
+    return await run_sync(listar_modulos)
 
 
 @router.post("/logout")
-async def logout():
+async def logout(token: Optional[str] = Depends(oauth2_scheme_opcional)):
     """
     Cerrar sesión.
     
-    Nota: Como usamos JWT stateless, el logout real se hace en el cliente
-    eliminando el token. Este endpoint es solo para consistencia de la API.
+    Revoca el token del header (por su jti) hasta que expire; el cliente
+    además lo elimina. Sin token, o con uno inválido, no hay nada que revocar.
     """
+    payload = decode_access_token(token) if token else None
+    if payload is not None and payload.get("jti") and payload.get("exp"):
+        await run_sync(lista_revocacion.revocar_token, payload["jti"], payload["exp"])
     return {"message": "Sesión cerrada exitosamente"}
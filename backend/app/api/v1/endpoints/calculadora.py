@@ -1,76 +1,213 @@
 """
 Endpoints de la calculadora de sueldos.
 """
-from fastapi import APIRouter
-from typing import List
+import time
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List, Literal, Optional
+
+from app.core.config import settings
 
 from app.services.calculadora_service import CalculadoraService
+from app.services.calculadora_lote_service import CalculadoraLoteService
+from app.services.simulacion_dotacion_service import simulacion_dotacion_service
 from app.schemas.calculadora import (
     CalculoRequest, CalculoResponse,
     SimulacionRequest, SimulacionResponse,
+    CalculoLoteRequest, CalculoLoteResponse,
+    SimulacionLoteRequest, SimulacionLoteResponse,
+    CurvaRequest, CurvaResponse,
+    CompararRequest, CompararResponse,
+    SimulacionDotacionRequest, SimulacionDotacionEstado,
     ParametrosResponse
 )
-from app.core.calculadora_data import (
-    VALOR_UF_ACTUAL, SUELDO_MINIMO, TASAS_AFP,
-    TOPE_IMPONIBLE_AFP_SALUD, TOPE_IMPONIBLE_CESANTIA,
-    DEFAULT_PLAN_ISAPRE_UF, TRAMOS_IMPUESTO
-)
+from app.core.calculadora_parametros import registro_parametros
 
 router = APIRouter()
 service = CalculadoraService()
+lote_service = CalculadoraLoteService()
+
+FECHA_QUERY = Query(None, description="Fecha (YYYY-MM-DD) para usar los parámetros vigentes a esa fecha; hoy por defecto")
 
 
 @router.get("/parametros", response_model=ParametrosResponse)
-def obtener_parametros():
-    """Obtiene los parámetros actuales del sistema (UF, AFPs, tramos, etc.)"""
+def obtener_parametros(fecha: Optional[date] = FECHA_QUERY):
+    """Obtiene los parámetros vigentes del sistema (UF, AFPs, tramos, etc.)"""
+    version = registro_parametros.version
+    p = registro_parametros.obtener(fecha)
     return ParametrosResponse(
-        valor_uf=VALOR_UF_ACTUAL,
-        sueldo_minimo=SUELDO_MINIMO,
-        tope_imponible_afp_salud_uf=TOPE_IMPONIBLE_AFP_SALUD,
-        tope_imponible_cesantia_uf=TOPE_IMPONIBLE_CESANTIA,
-        default_plan_isapre_uf=DEFAULT_PLAN_ISAPRE_UF,
-        afps=TASAS_AFP,
-        tramos_impuesto=TRAMOS_IMPUESTO
+        valor_uf=p.uf,
+        sueldo_minimo=p.sueldo_minimo,
+        tope_imponible_afp_salud_uf=p.tope_afp_salud_uf,
+        tope_imponible_cesantia_uf=p.tope_cesantia_uf,
+        default_plan_isapre_uf=p.default_plan_isapre_uf,
+        afps=dict(p.tasas_afp),
+        tramos_impuesto=[dict(t) for t in p.tramos_impuesto],
+        vigente_desde=p.vigente_desde if p.vigente_desde != date.min else None,
+        version=version
     )
 
 
 @router.get("/afps", response_model=List[str])
-def listar_afps():
+def listar_afps(fecha: Optional[date] = FECHA_QUERY):
     """Lista las AFPs disponibles ordenadas alfabéticamente"""
-    return sorted(list(TASAS_AFP.keys()))
+    return sorted(registro_parametros.obtener(fecha).tasas_afp.keys())
 
 
 @router.post("/calcular", response_model=CalculoResponse)
-def calcular_sueldo_base(request: CalculoRequest):
+def calcular_sueldo_base(
+    request: CalculoRequest,
+    metodo: Literal["exacto", "biseccion", "verificar"] = Query(
+        "exacto", description="Solver a usar; 'verificar' compara ambos y registra diferencias"
+    ),
+    fecha: Optional[date] = FECHA_QUERY,
+):
     """
     Calcula el sueldo base necesario para obtener el líquido deseado.
     
-    Usa búsqueda binaria y redondea el resultado a miles hacia arriba.
+    Invierte la fórmula por tramos lineales (o por búsqueda binaria si
+    metodo=biseccion) y redondea el resultado a miles hacia arriba.
     """
-    return service.resolver_sueldo_base(request)
+    return service.resolver_sueldo_base(request, metodo, fecha)
 
 
 @router.post("/simular", response_model=SimulacionResponse)
-def simular_liquido(request: SimulacionRequest):
+def simular_liquido(request: SimulacionRequest, fecha: Optional[date] = FECHA_QUERY):
     """
     Simula el sueldo líquido dado un sueldo base.
     
     Útil para verificar cálculos o hacer simulaciones "forward".
     """
-    datos = {
-        "movilizacion": request.movilizacion,
-        "afp_nombre": request.afp_nombre,
-        "salud_sistema": request.salud_sistema,
-        "salud_uf": request.salud_uf,
-        "bonos": [b.model_dump() for b in request.bonos]
-    }
+    return service.simular(request, fecha)
+
+
+def _validar_tamano_lote(cantidad: int):
+    if cantidad > settings.CALCULADORA_LOTE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.CALCULADORA_LOTE_MAX_ITEMS} cálculos por lote"
+        )
+
+
+@router.post("/calcular/lote", response_model=CalculoLoteResponse)
+def calcular_sueldo_base_lote(request: CalculoLoteRequest, fecha: Optional[date] = FECHA_QUERY):
+    """
+    Calcula el sueldo base de muchos trabajadores en una sola llamada.
+    
+    Evalúa todo el lote con arreglos NumPy (tramos, topes y tasas AFP a la vez).
+    Los resultados vienen en el mismo orden que los items.
+    """
+    _validar_tamano_lote(len(request.items))
+    inicio = time.perf_counter()
+    resultados = lote_service.resolver_lote(request.items, fecha)
+    return CalculoLoteResponse(
+        total=len(resultados),
+        duracion_ms=round((time.perf_counter() - inicio) * 1000, 2),
+        resultados=resultados
+    )
+
+
+@router.post("/simular/lote", response_model=SimulacionLoteResponse)
+def simular_liquido_lote(request: SimulacionLoteRequest, fecha: Optional[date] = FECHA_QUERY):
+    """
+    Simula el líquido de muchos sueldos base en una sola llamada.
+    
+    Los resultados vienen en el mismo orden que los items.
+    """
+    _validar_tamano_lote(len(request.items))
+    inicio = time.perf_counter()
+    resultados = lote_service.simular_lote(request.items, fecha)
+    return SimulacionLoteResponse(
+        total=len(resultados),
+        duracion_ms=round((time.perf_counter() - inicio) * 1000, 2),
+        resultados=resultados
+    )
+
+
+@router.post("/curva", response_model=CurvaResponse)
+def curva_sueldos(request: CurvaRequest, fecha: Optional[date] = FECHA_QUERY):
+    """
+    Barre un rango de sueldos base con los mismos parámetros.
     
-    liquido, detalles = service.simular_liquido(request.sueldo_base, datos)
+    Retorna líquido, impuesto, cotizaciones y tasa marginal por punto en una
+    sola respuesta, para graficar la curva completa sin llamar a /simular
+    por cada valor.
+    """
+    if request.base_hasta < request.base_desde:
+        raise HTTPException(status_code=400, detail="base_hasta debe ser mayor o igual a base_desde")
+    puntos = (request.base_hasta - request.base_desde) // request.paso + 1
+    if puntos > settings.CALCULADORA_CURVA_MAX_PUNTOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.CALCULADORA_CURVA_MAX_PUNTOS} puntos por curva; aumente el paso"
+        )
+    return lote_service.curva(request, fecha)
+
+
+@router.post("/comparar", response_model=CompararResponse)
+def comparar_escenarios(request: CompararRequest, fecha: Optional[date] = FECHA_QUERY):
+    """
+    Compara un mismo líquido objetivo en todas las AFP x (FONASA y planes isapre).
+    
+    Resuelve la matriz completa en una llamada y la retorna como grilla:
+    valor[i][j] corresponde a afps[i] y salud[j].
+    """
+    if request.afps is not None:
+        disponibles = registro_parametros.obtener(fecha).tasas_afp
+        desconocidas = [a for a in request.afps if a not in disponibles]
+        if desconocidas:
+            raise HTTPException(status_code=400, detail=f"AFP desconocidas: {', '.join(desconocidas)}")
+    if not request.incluir_fonasa and request.planes_isapre_uf == []:
+        raise HTTPException(status_code=400, detail="Debe incluir al menos una opción de salud")
+    return lote_service.comparar(request, fecha)
+
+
+@router.post("/simulaciones-dotacion", response_model=SimulacionDotacionEstado, status_code=202)
+async def iniciar_simulacion_dotacion(escenario: SimulacionDotacionRequest):
+    """
+    Lanza la proyección de líquido y costo empleador de toda la dotación activa.
+    
+    Corre en segundo plano: consultar el progreso con GET /simulaciones-dotacion/{id}
+    y descargar el CSV con GET /simulaciones-dotacion/{id}/resultado al completarse.
     
-    return SimulacionResponse(
-        sueldo_base=request.sueldo_base,
-        sueldo_liquido=round(liquido),
-        total_haberes=round(detalles['hab']),
-        total_descuentos=round(detalles['desc']),
-        detalle=detalles
-    )
\ No newline at end of file
+    El estado vive en la memoria del worker que la lanzó: requiere correr la
+    API con un solo worker de uvicorn (con varios, las consultas que caen en
+    otro worker responden 404).
+    """
+    try:
+        trabajo = simulacion_dotacion_service.iniciar(escenario)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return trabajo.a_estado()
+
+
+@router.get("/simulaciones-dotacion", response_model=List[SimulacionDotacionEstado])
+def listar_simulaciones_dotacion():
+    """Simulaciones de este proceso, las más recientes primero."""
+    return [t.a_estado() for t in simulacion_dotacion_service.listar()]
+
+
+@router.get("/simulaciones-dotacion/{simulacion_id}", response_model=SimulacionDotacionEstado)
+def estado_simulacion_dotacion(simulacion_id: str):
+    """Progreso de una simulación."""
+    return simulacion_dotacion_service.obtener(simulacion_id).a_estado()
+
+
+@router.post("/simulaciones-dotacion/{simulacion_id}/cancelar", response_model=SimulacionDotacionEstado)
+async def cancelar_simulacion_dotacion(simulacion_id: str):
+    """Cancela una simulación en curso (se detiene al terminar el bloque actual)."""
+    return simulacion_dotacion_service.cancelar(simulacion_id).a_estado()
+
+
+@router.get("/simulaciones-dotacion/{simulacion_id}/resultado")
+def descargar_simulacion_dotacion(simulacion_id: str):
+    """Descarga el CSV de una simulación completada."""
+    trabajo = simulacion_dotacion_service.obtener(simulacion_id)
+    if trabajo.estado != "completada" or trabajo.archivo is None:
+        raise HTTPException(status_code=409, detail=f"La simulación está {trabajo.estado}")
+    return FileResponse(
+        trabajo.archivo,
+        media_type="text/csv",
+        filename=f"simulacion_dotacion_{simulacion_id}.csv"
+    )
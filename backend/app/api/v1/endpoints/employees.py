@@ -4,10 +4,35 @@ from typing import List, Optional
 
 from app.db.deps import get_db
 from app.services.finiquitos_service import FiniquitosService
-from app.schemas.finiquitos import VacacionesDisponiblesResponse, EmployeeSueldoResponse
+from app.core.config import settings
+from app.schemas.finiquitos import (
+    VacacionesDisponiblesResponse, 
+    EmployeeSueldoResponse,
+    VacacionesLoteRequest,
+    VacacionesLoteResponse
+)
 
 router = APIRouter()
 
+@router.post("/vacations-available/batch", response_model=VacacionesLoteResponse)
+async def get_vacaciones_disponibles_lote(
+    request: VacacionesLoteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene las vacaciones disponibles de muchos trabajadores en una sola petición.
+    
+    Las consultas a BUK se hacen en paralelo con concurrencia acotada. Los errores
+    por RUT se informan en cada resultado sin abortar el lote.
+    """
+    if len(request.ruts) > settings.BUK_BATCH_MAX_RUTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.BUK_BATCH_MAX_RUTS} RUTs por consulta"
+        )
+    service = FiniquitosService(db)
+    return await service.get_vacaciones_disponibles_lote(request.ruts, request.date)
+
 @router.get("/{rut}/vacations-available", response_model=VacacionesDisponiblesResponse)
 async def get_vacaciones_disponibles(
     rut: str, 
@@ -29,6 +54,8 @@ async def get_vacaciones_disponibles(
     rut_limpio = rut.replace(".", "").strip()
     try:
         return await service.get_vacaciones_disponibles(rut_limpio, date)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -48,5 +75,7 @@ async def get_sueldo_base(rut: str, db: Session = Depends(get_db)):
     rut_limpio = rut.replace(".", "").strip()
     try:
         return await service.get_sueldo_base(rut_limpio)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,43 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Literal
 
 from app.db.deps import get_db
+from app.db.session import SessionLocal
+from app.core.config import settings
+from app.core.concurrency import iterar_sync, run_sync
 from app.services.finiquitos_service import FiniquitosService
+from app.services.finiquito_calculo_service import FiniquitoCalculoService
 from app.schemas.finiquitos import (
     FiniquitoCreate, 
     FiniquitoResponse, 
-    FiniquitoItemResponse
+    FiniquitoItemResponse,
+    FiniquitoCompletoResponse,
+    FiniquitoCalculoRequest,
+    FiniquitoCalculoLoteRequest,
+    FiniquitoCalculoResultado,
+    FiniquitoCalculoLoteResponse
 )
 
 router = APIRouter()
 
 @router.get("/", response_model=List[FiniquitoResponse])
-def read_general_finiquitos(db: Session = Depends(get_db)):
+async def read_general_finiquitos(db: Session = Depends(get_db)):
     """Obtiene la información de los trabajadores."""
     service = FiniquitosService(db)
-    return service.get_trabajadores_general()
+    return await run_sync(service.get_trabajadores_general)
+
+@router.get("/meses-anteriores")
+async def read_tres_meses_finiquitos(
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato del reporte")
+):
+    """
+    Obtiene los items de los trabajadores activos de los últimos 5 periodos.
+    
+    El reporte se transmite por partes (NDJSON: un trabajador por línea; CSV: un
+    item por fila), leyendo la BD a medida que se envía la respuesta. Cada parte
+    se lee en el compartimento de Licencias (run_sync), como el resto de las
+    queries; la primera se pide antes de responder, así un compartimento
+    saturado da 503 y no un stream cortado.
+    """
+    # La sesión de get_db se cierra antes de enviar el body, por eso el
+    # stream abre y cierra su propia sesión.
+    db = SessionLocal()
+    partes = FiniquitosService(db).get_items_cinco_meses(formato)
+    
+    def cerrar():
+        partes.close()
+        db.close()
+    
+    stream = iterar_sync(partes, cerrar)
+    try:
+        primera = await stream.__anext__()
+    except StopAsyncIteration:
+        primera = ""
+    
+    async def generar():
+        try:
+            yield primera
+            async for parte in stream:
+                yield parte
+        finally:
+            await stream.aclose()
+    
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    filename = f"finiquitos_meses_anteriores.{formato}"
+    return StreamingResponse(
+        generar(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/calculo", response_model=FiniquitoCalculoResultado)
+async def calcular_finiquito(request: FiniquitoCalculoRequest, db: Session = Depends(get_db)):
+    """
+    Calcula el finiquito de un trabajador: indemnización por años de servicio,
+    mes de aviso, vacaciones proporcionales y descuentos, con sus bases.
+    """
+    service = FiniquitoCalculoService(db)
+    return await service.calcular(request)
+
+@router.post("/calculo/lote", response_model=FiniquitoCalculoLoteResponse)
+async def calcular_finiquitos_lote(request: FiniquitoCalculoLoteRequest, db: Session = Depends(get_db)):
+    """
+    Calcula finiquitos de una lista de RUTs o de todos los activos de un área
+    con un mismo escenario de término (fecha, causal y aviso).
+    """
+    service = FiniquitoCalculoService(db)
+    # El tope aplica también a un área: cada trabajador son 3 llamadas a BUK
+    if await service.contar_lote(request) > settings.FINIQUITO_LOTE_MAX_RUTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.FINIQUITO_LOTE_MAX_RUTS} trabajadores por lote"
+        )
+    return await service.calcular_lote(request)
 
 @router.get("/{rut}", response_model=List[FiniquitoItemResponse]) 
-def read_rut_finiquitos(rut: str, db: Session = Depends(get_db)):
+async def read_rut_finiquitos(rut: str, db: Session = Depends(get_db)):
     """Obtiene la información del trabajador."""
     service = FiniquitosService(db)
-    return service.get_item_by_rut(rut)
+    return await run_sync(service.get_item_by_rut, rut)
 
 @router.get("/{rut}/variable", response_model=List[FiniquitoItemResponse])
-def read_rut_finiquitos_variable(rut: str, variable: str, db: Session = Depends(get_db)):
+async def read_rut_finiquitos_variable(rut: str, variable: str, db: Session = Depends(get_db)):
     """Obtiene la información de remuneración variable de los trabajadores."""
     service = FiniquitosService(db)
-    return service.get_item_variable_by_rut(rut, variable)
-
-@router.get("/meses-anteriores", response_model=List[FiniquitoItemResponse])
-def read_tres_meses_finiquitos(db: Session = Depends(get_db)):
-    """Obtiene los items de los trabajadores de los últimos 5 meses."""
-    service = FiniquitosService(db)
-    return service.get_items_cinco_meses()
+    return await run_sync(service.get_item_variable_by_rut, rut, variable)
 
 @router.get("/{rut}/descuentos", response_model=List[FiniquitoItemResponse])
 async def read_descuentos_finiquitos(rut: str, db: Session = Depends(get_db)):
     """Obtiene los descuentos de los trabajadores."""
     service = FiniquitosService(db)
     return await service.get_descuentos_by_rut_finiquito(rut)
+
+@router.get("/{rut}/completo", response_model=FiniquitoCompletoResponse)
+async def read_finiquito_completo(
+    rut: str,
+    date: Optional[str] = Query(None, description="Fecha de proyección de vacaciones (YYYY-MM-DD)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene en una sola petición los items de sueldo (BD), el sueldo base,
+    las vacaciones disponibles y los descuentos (BUK), con tiempos por fuente.
+    """
+    service = FiniquitosService(db)
+    return await service.get_finiquito_completo(rut, date)
@@ -0,0 +1,92 @@
+"""
+Endpoints de estado de la API y sus dependencias.
+
+`GET /health` es la prueba de vida, pública y sin dependencias. El detalle
+(circuit breaker, pools, bulkheads, caches de auth, arranque) expone la
+configuración interna y solo lo ve el rol admin.
+"""
+from fastapi import APIRouter, Depends, Request
+
+from app.core.buk_client import buk_client
+from app.core.calculadora_parametros import registro_parametros
+from app.core.concurrency import bcrypt_executor, licencias_executor, marcas_executor
+from app.core.permisos import registro_permisos
+from app.core.principal import cache_principales
+from app.core.revocacion import lista_revocacion
+from app.core.security import require_role
+from app.db import session, session_marcas
+from app.db.pool_metricas import estado_pools
+from app.services.calculadora_service import memo_calculadora
+
+router = APIRouter()
+
+SOLO_ADMIN = [Depends(require_role(["admin"]))]
+
+
+@router.get("")
+def vivo():
+    """Prueba de vida del worker (no consulta BD ni BUK)."""
+    return {"status": "ok"}
+
+
+@router.get("/buk", dependencies=SOLO_ADMIN)
+def estado_buk():
+    """Estado del circuit breaker de BUK y latencias (p50/p95/p99) por endpoint."""
+    return buk_client.estado()
+
+
+@router.get("/calculadora", dependencies=SOLO_ADMIN)
+def estado_calculadora():
+    """Versión de parámetros cargada y aciertos del memo de /calcular y /simular."""
+    return {
+        "parametros": registro_parametros.estado(),
+        "memo": memo_calculadora.estadisticas(),
+    }
+
+
+@router.get("/auth", dependencies=SOLO_ADMIN)
+def estado_auth():
+    """Cache de principales, matriz de permisos, pool de bcrypt y lista de revocación."""
+    return {
+        "principales": cache_principales.estadisticas(),
+        "permisos": registro_permisos.estado(),
+        "bcrypt": bcrypt_executor.estado(),
+        "revocacion": lista_revocacion.estado(),
+    }
+
+
+@router.get("/pools", dependencies=SOLO_ADMIN)
+def estado_pools_bd():
+    """
+    Pools de conexiones por BD: configuración, conexiones en uso, overflow,
+    máximos observados, histograma de espera por una conexión y resultado de
+    la validación en segundo plano (pings, reaperturas y reintentos por
+    desconexión). Solo aparecen las BD cuyo engine ya se creó (en el primer uso).
+    """
+    return estado_pools()
+
+
+@router.get("/bulkheads", dependencies=SOLO_ADMIN)
+def estado_bulkheads():
+    """
+    Compartimento de cada dependencia (BD Licencias, BD Marcas, bcrypt, BUK):
+    trabajos en curso y en espera, completados y rechazados con 503.
+    """
+    return {
+        "licencias": licencias_executor.estado(),
+        "marcas": marcas_executor.estado(),
+        "bcrypt": bcrypt_executor.estado(),
+        "buk": buk_client.bulkhead.estado(),
+    }
+
+
+@router.get("/arranque", dependencies=SOLO_ADMIN)
+def estado_arranque(request: Request):
+    """Tiempo de import y de arranque (lifespan) del worker, y qué engines ya se crearon."""
+    return {
+        **getattr(request.app.state, "perfil_arranque", {}),
+        "engines_creados": {
+            "licencias": session.engine_creado(),
+            "marcas": session_marcas.engine_creado(),
+        },
+    }
@@ -3,53 +3,57 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 
 from app.db.deps import get_db
+from app.core.concurrency import run_sync
+from app.core.exceptions import ServicioSaturadoError
 from app.services.licencias_service import LicenciasService
 from app.schemas.licencias import LicenciaCreate, LicenciaResponse, LicenciaByRut
 
 router = APIRouter()
 
 @router.get("/", response_model=List[LicenciaResponse])
-def read_licencias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_licencias(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Obtiene todas las licencias con paginación"""
     service = LicenciasService(db)
-    return service.get_licencias(skip, limit)
+    return await run_sync(service.get_licencias, skip, limit)
 
 @router.get("/vigentes", response_model=List[Dict[str, Any]])
-def read_licencias_vigentes(db: Session = Depends(get_db)):
+async def read_licencias_vigentes(db: Session = Depends(get_db)):
     """Obtiene las licencias vigentes (fecha actual entre fecha_inicio y fecha_fin)"""
     service = LicenciasService(db)
-    return service.get_licencias_vigentes()
+    return await run_sync(service.get_licencias_vigentes)
 
 @router.get("/por-vencer", response_model=List[Dict[str, Any]])
-def read_licencias_por_vencer(dias: int = 5, db: Session = Depends(get_db)):
+async def read_licencias_por_vencer(dias: int = 5, db: Session = Depends(get_db)):
     """Obtiene licencias que vencen en los próximos N días (default: 5)"""
     service = LicenciasService(db)
-    return service.get_licencias_por_vencer(dias)
+    return await run_sync(service.get_licencias_por_vencer, dias)
 
 @router.get("/vencidas-recientes", response_model=List[Dict[str, Any]])
-def read_licencias_vencidas_recientes(dias: int = 5, db: Session = Depends(get_db)):
+async def read_licencias_vencidas_recientes(dias: int = 5, db: Session = Depends(get_db)):
     """Obtiene licencias que vencieron en los últimos N días (default: 5)"""
     service = LicenciasService(db)
-    return service.get_licencias_vencidas_recientes(dias)
+    return await run_sync(service.get_licencias_vencidas_recientes, dias)
 
 @router.get("/rut/{rut}", response_model=List[LicenciaByRut])
-def read_licencias_by_rut(rut: str, db: Session = Depends(get_db)):
+async def read_licencias_by_rut(rut: str, db: Session = Depends(get_db)):
     """Obtiene las últimas 5 licencias de un trabajador por su RUT"""
     service = LicenciasService(db)
     try:
-        return service.get_licencia_by_rut(rut)
+        return await run_sync(service.get_licencia_by_rut, rut)
+    except ServicioSaturadoError:
+        raise
     except Exception:
         # Si no hay licencias, retornar lista vacía en vez de error
         return []
 
 @router.get("/{licencia_id}", response_model=LicenciaResponse)
-def read_licencia(licencia_id: int, db: Session = Depends(get_db)):
+async def read_licencia(licencia_id: int, db: Session = Depends(get_db)):
     """Obtiene una licencia por su ID"""
     service = LicenciasService(db)
-    return service.get_licencia(licencia_id)
+    return await run_sync(service.get_licencia, licencia_id)
 
 @router.post("/", response_model=LicenciaResponse)
-def create_licencia(licencia: LicenciaCreate, db: Session = Depends(get_db)):
+async def create_licencia(licencia: LicenciaCreate, db: Session = Depends(get_db)):
     """Crea una nueva licencia"""
     service = LicenciasService(db)
-    return service.create_licencia(licencia)
\ No newline at end of file
+    return await run_sync(service.create_licencia, licencia)
\ No newline at end of file
@@ -3,12 +3,13 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 
 from app.db.deps import get_db
+from app.core.concurrency import run_sync
 from app.services.vacaciones_service import VacacionesService
 from app.schemas.vacaciones import VacacionBase
 
 router = APIRouter()
 
 @router.get("/", response_model=List[VacacionBase])
-def get_vacaciones(db: Session = Depends(get_db)):
-    return VacacionesService(db).get_vacaciones()
+async def get_vacaciones(db: Session = Depends(get_db)):
+    return await run_sync(VacacionesService(db).get_vacaciones)
     
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Cliente resiliente para la API externa de BUK.
+
+Agrupa en un solo lugar las llamadas HTTP a BUK y les agrega:
+- Medición de latencia por endpoint (ventana móvil con p50/p95/p99).
+- Circuit breaker: si BUK falla repetidamente se responde de inmediato
+  con 503 en vez de esperar el timeout en cada request.
+- Reintentos acotados con backoff exponencial y jitter, limitados por un
+  presupuesto de reintentos para no amplificar la carga cuando BUK está caído.
+- Hedging opcional: si la respuesta tarda más que el p95 del endpoint se
+  lanza una segunda petición y se usa la primera que responda.
+- Presupuesto de llamadas por segundo (BUK_RATE_LIMIT_PER_SECOND) para todo
+  el proceso: cada petición HTTP (incluidos reintentos y hedging) toma un
+  token, sin importar cuántos requests o lotes estén consultando a la vez.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.concurrency import LimitadorConcurrencia
+from app.core.exceptions import BukNoDisponibleError, BukSaturadoError
+from app.core.logging_config import logger
+from app.core.rate_limit import AsyncRateLimiter
+
+
+class LatencyTracker:
+    """Ventana móvil de latencias (en segundos) de un endpoint."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.total = 0
+        self.errores = 0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self._samples.append(seconds)
+        self.total += 1
+        if not ok:
+            self.errores += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordenadas = sorted(self._samples)
+        idx = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+        return ordenadas[idx]
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "total": self.total,
+            "errores": self.errores,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico de tres estados.
+
+    - closed: las llamadas pasan; `failure_threshold` fallas seguidas lo abren.
+    - open: las llamadas fallan de inmediato durante `reset_timeout` segundos.
+    - half_open: se deja pasar una llamada de prueba; si funciona se cierra.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Libera la llamada de prueba que terminó sin veredicto (rechazo local o cancelación)."""
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker BUK cerrado: API recuperada")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker BUK abierto tras {self._failures} fallas")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"estado": self.state, "fallas_consecutivas": self._failures}
+
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos: cada petición deposita `ratio` tokens y cada
+    reintento consume uno. Así los reintentos nunca superan ~ratio del tráfico.
+    """
+
+    def __init__(self, ratio: float, min_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = min_tokens
+        self._tokens = min_tokens
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+def _es_reintentable(exc: Exception) -> bool:
+    """Errores de red, 5xx y 429 se reintentan; el resto de 4xx no."""
+    if isinstance(exc, httpx.RequestError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return False
+
+
+class BukClient:
+    """Cliente HTTP compartido para BUK con la capa de resiliencia."""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.BUK_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BUK_BREAKER_RESET_SECONDS,
+        )
+        self.retry_budget = RetryBudget(settings.BUK_RETRY_BUDGET_RATIO)
+        # Compartimento de BUK: llamadas en curso y en espera, con rechazo inmediato
+        self.bulkhead = LimitadorConcurrencia(
+            settings.BUK_MAX_CONNECTIONS, settings.BUK_MAX_QUEUE, "buk", error=BukSaturadoError
+        )
+        self.rate_limiter = AsyncRateLimiter(settings.BUK_RATE_LIMIT_PER_SECOND)
+        self.latencias: Dict[str, LatencyTracker] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # El cliente queda asociado al event loop donde se creó
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.BUK_API_BASE_URL,
+                timeout=httpx.Timeout(settings.BUK_TIMEOUT_SECONDS, connect=settings.BUK_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=settings.BUK_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.BUK_MAX_CONNECTIONS,
+                ),
+                headers={
+                    "auth_token": settings.BUK_API_KEY,
+                    "Content-Type": "application/json",
+                },
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def _tracker(self, endpoint: str) -> LatencyTracker:
+        if endpoint not in self.latencias:
+            self.latencias[endpoint] = LatencyTracker()
+        return self.latencias[endpoint]
+
+    async def _send(self, endpoint: str, path: str, params: Optional[dict]) -> httpx.Response:
+        """Una petición individual, medida y validada (el token de rate_limiter ya se tomó)."""
+        tracker = self._tracker(endpoint)
+        inicio = time.perf_counter()
+        try:
+            response = await self._get_client().get(path, params=params)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            # Un 4xx (ej: RUT inexistente) es una respuesta válida de BUK
+            tracker.record(time.perf_counter() - inicio, ok=not _es_reintentable(e))
+            raise
+        except httpx.RequestError:
+            tracker.record(time.perf_counter() - inicio, ok=False)
+            raise
+        tracker.record(time.perf_counter() - inicio)
+        return response
+
+    async def _send_hedged(self, endpoint: str, path: str, params: Optional[dict]) -> httpx.Response:
+        """Lanza una segunda petición si la primera supera el p95 del endpoint."""
+        p95 = self._tracker(endpoint).percentile(95)
+        if not settings.BUK_HEDGE_ENABLED or p95 is None or self._tracker(endpoint).total < settings.BUK_HEDGE_MIN_SAMPLES:
+            return await self._send(endpoint, path, params)
+
+        delay = max(p95, settings.BUK_HEDGE_MIN_DELAY_MS / 1000)
+        primera = asyncio.create_task(self._send(endpoint, path, params))
+        done, _ = await asyncio.wait({primera}, timeout=delay)
+        if done:
+            return primera.result()
+
+        # La segunda petición solo sale si hay presupuesto ya: esperarlo
+        # retendría el cupo del bulkhead y el hedge llegaría tarde igual
+        if not self.rate_limiter.intentar():
+            return await primera
+        logger.info(f"Hedging BUK {endpoint}: segunda petición tras {delay * 1000:.0f} ms")
+        segunda = asyncio.create_task(self._send(endpoint, path, params))
+        pendientes = {primera, segunda}
+        ultimo_error: Optional[BaseException] = None
+        try:
+            while pendientes:
+                done, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    ultimo_error = task.exception()
+            raise ultimo_error
+        finally:
+            for task in pendientes:
+                task.cancel()
+
+    async def get(self, endpoint: str, path: str, params: Optional[dict] = None) -> httpx.Response:
+        """
+        GET a BUK con circuit breaker, reintentos y hedging.
+
+        Args:
+            endpoint: Nombre lógico del endpoint (para métricas de latencia)
+            path: Ruta relativa a BUK_API_BASE_URL
+            params: Query params opcionales
+
+        Raises:
+            BukNoDisponibleError: Si el circuit breaker está abierto
+            BukSaturadoError: Si ya hay BUK_MAX_QUEUE llamadas esperando cupo
+            httpx.HTTPStatusError / httpx.RequestError: Si la llamada falla
+        """
+        if not self.breaker.allow_request():
+            raise BukNoDisponibleError()
+        es_prueba = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        self.retry_budget.deposit()
+        intento = 0
+        try:
+            while True:
+                try:
+                    # El token y el cupo se toman por intento, en ese orden: la
+                    # espera por presupuesto no retiene cupo del bulkhead ni
+                    # cuenta en la latencia del endpoint
+                    await self.rate_limiter.acquire()
+                    async with self.bulkhead.ocupar():
+                        response = await self._send_hedged(endpoint, path, params)
+                    self.breaker.record_success()
+                    return response
+                except BukSaturadoError:
+                    # Rechazo local: no dice nada de la salud de BUK
+                    raise
+                except Exception as e:
+                    if not _es_reintentable(e):
+                        self.breaker.record_success()
+                        raise
+                    self.breaker.record_failure()
+                    intento += 1
+                    if (
+                        intento > settings.BUK_MAX_RETRIES
+                        or self.breaker.state == CircuitBreaker.OPEN
+                        or not self.retry_budget.try_withdraw()
+                    ):
+                        raise
+                    # Backoff exponencial con "full jitter"
+                    espera = random.uniform(0, settings.BUK_RETRY_BASE_DELAY_MS / 1000 * (2 ** (intento - 1)))
+                    logger.warning(f"Reintento {intento} a BUK {endpoint} en {espera * 1000:.0f} ms: {type(e).__name__}")
+                    await asyncio.sleep(espera)
+        finally:
+            # Si la prueba no llegó a un veredicto (cupo lleno, cancelación), otra
+            # llamada debe poder probar; si no, el circuito queda en half_open para siempre
+            if es_prueba:
+                self.breaker.release_probe()
+
+    async def get_json(self, endpoint: str, path: str, params: Optional[dict] = None) -> Any:
+        response = await self.get(endpoint, path, params)
+        return response.json()
+
+    def estado(self) -> Dict[str, Any]:
+        """Estado del circuit breaker, del compartimento de llamadas y latencias por endpoint."""
+        return {
+            "circuit_breaker": self.breaker.snapshot(),
+            "bulkhead": self.bulkhead.estado(),
+            "endpoints": {nombre: t.snapshot() for nombre, t in self.latencias.items()},
+        }
+
+
+# Instancia compartida por todo el proceso
+buk_client = BukClient()
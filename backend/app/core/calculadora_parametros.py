@@ -0,0 +1,337 @@
+"""
+Parámetros de la calculadora compilados en snapshots inmutables y versionados por fecha.
+
+Los valores económicos (UF, sueldo mínimo, topes, tasas AFP, tramos) se leen
+de un archivo JSON con una entrada por fecha de vigencia. Cada versión se
+compila una sola vez: topes en pesos, tope de gratificación, tasas AFP y los
+límites de los tramos como tupla ordenada para `bisect`.
+
+El archivo se vigila por polling; cuando cambia se compila completo y se
+reemplaza el registro con una sola asignación, así los requests en curso
+siguen usando el snapshot que ya tomaron. Si el archivo no existe se usan los
+valores de `calculadora_data`.
+"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.core import calculadora_data
+from app.core.exceptions import ParametrosNoVigentesError
+from app.core.logging_config import logger
+
+TASA_AFP_DEFAULT = 0.1049
+
+RUTA_POR_DEFECTO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "parametros_calculadora.json"
+)
+
+
+@dataclass(frozen=True)
+class ParametrosCalculadora:
+    """Snapshot inmutable de parámetros; compartirlo entre hilos es seguro."""
+    __slots__ = (
+        "vigente_desde",
+        "uf", "sueldo_minimo",
+        "tope_afp_salud_uf", "tope_cesantia_uf", "default_plan_isapre_uf",
+        "tope_afp_salud", "tope_cesantia",
+        "tope_gratificacion", "porcentaje_gratificacion",
+        "tasa_salud", "tasa_cesantia",
+        "tasa_cesantia_empleador", "tasa_sis", "tasa_mutual",
+        "tasas_afp", "tramos_impuesto",
+        "tramos_hasta", "tramos_tasa", "tramos_rebaja",
+    )
+
+    vigente_desde: date
+    uf: float
+    sueldo_minimo: float
+    tope_afp_salud_uf: float
+    tope_cesantia_uf: float
+    default_plan_isapre_uf: float
+    tope_afp_salud: float  # En pesos
+    tope_cesantia: float  # En pesos
+    tope_gratificacion: float  # Mensual, en pesos
+    porcentaje_gratificacion: float
+    tasa_salud: float
+    tasa_cesantia: float
+    tasa_cesantia_empleador: float  # Aporte del empleador, sobre el imponible con tope de cesantía
+    tasa_sis: float  # Seguro de invalidez y sobrevivencia, con tope AFP
+    tasa_mutual: float  # Seguro de accidentes (cotización básica), con tope AFP
+    tasas_afp: Mapping[str, float]
+    tramos_impuesto: Tuple[Mapping[str, float], ...]  # Tal como se informan en /parametros
+    tramos_hasta: Tuple[float, ...]  # Límite superior de cada tramo, ordenado
+    tramos_tasa: Tuple[float, ...]
+    tramos_rebaja: Tuple[float, ...]
+
+    def tasa_afp(self, nombre: str) -> float:
+        return self.tasas_afp.get(nombre, TASA_AFP_DEFAULT)
+
+    def impuesto(self, base_tributable: float) -> float:
+        """Impuesto único: el tramo es el primero cuyo límite superior cubre la base."""
+        if base_tributable <= 0:
+            return 0.0
+        i = bisect_left(self.tramos_hasta, base_tributable)
+        if i == len(self.tramos_hasta):
+            i -= 1
+        return base_tributable * self.tramos_tasa[i] - self.tramos_rebaja[i]
+
+
+class _TramoArchivo(BaseModel):
+    desde: float
+    hasta: Optional[float] = None  # null = sin límite
+    tasa: float = Field(ge=0, lt=1)
+    rebaja: float
+
+
+class _VersionArchivo(BaseModel):
+    """Una versión de parámetros tal como viene en el archivo JSON."""
+    vigente_desde: date
+    valor_uf: float = Field(gt=0)
+    sueldo_minimo: float = Field(gt=0)
+    tope_imponible_afp_salud_uf: float = Field(gt=0)
+    tope_imponible_cesantia_uf: float = Field(gt=0)
+    default_plan_isapre_uf: float = Field(ge=0)
+    tasas_afp: Dict[str, float]
+    tasa_salud: float
+    tasa_cesantia: float
+    factor_gratificacion: float
+    porcentaje_gratificacion: float
+    tasa_cesantia_empleador: float = 0.024
+    tasa_sis: float = 0.0188
+    tasa_mutual: float = 0.0093
+    tramos_impuesto: List[_TramoArchivo]
+
+    @field_validator("tramos_impuesto")
+    @classmethod
+    def tramos_ordenados(cls, tramos: List[_TramoArchivo]) -> List[_TramoArchivo]:
+        limites = [t.hasta if t.hasta is not None else float('inf') for t in tramos]
+        if not tramos or any(a >= b for a, b in zip(limites, limites[1:])):
+            raise ValueError("los tramos deben venir ordenados por 'hasta' creciente")
+        return tramos
+
+
+class _ArchivoParametros(BaseModel):
+    versiones: List[_VersionArchivo]
+
+
+def _version_por_defecto() -> _VersionArchivo:
+    """Valores de `calculadora_data`, vigentes desde siempre."""
+    return _VersionArchivo(
+        vigente_desde=date.min,
+        valor_uf=calculadora_data.VALOR_UF_ACTUAL,
+        sueldo_minimo=calculadora_data.SUELDO_MINIMO,
+        tope_imponible_afp_salud_uf=calculadora_data.TOPE_IMPONIBLE_AFP_SALUD,
+        tope_imponible_cesantia_uf=calculadora_data.TOPE_IMPONIBLE_CESANTIA,
+        default_plan_isapre_uf=calculadora_data.DEFAULT_PLAN_ISAPRE_UF,
+        tasas_afp=calculadora_data.TASAS_AFP,
+        tramos_impuesto=[
+            {**t, "hasta": None if t['hasta'] == float('inf') else t['hasta']}
+            for t in calculadora_data.TRAMOS_IMPUESTO
+        ],
+        **calculadora_data.PARAMETROS,
+    )
+
+
+def compilar_parametros(v: _VersionArchivo) -> ParametrosCalculadora:
+    """Construye el snapshot de una versión: todo lo derivable se calcula acá."""
+    hasta = tuple(t.hasta if t.hasta is not None else float('inf') for t in v.tramos_impuesto)
+    return ParametrosCalculadora(
+        vigente_desde=v.vigente_desde,
+        uf=v.valor_uf,
+        sueldo_minimo=v.sueldo_minimo,
+        tope_afp_salud_uf=v.tope_imponible_afp_salud_uf,
+        tope_cesantia_uf=v.tope_imponible_cesantia_uf,
+        default_plan_isapre_uf=v.default_plan_isapre_uf,
+        tope_afp_salud=v.tope_imponible_afp_salud_uf * v.valor_uf,
+        tope_cesantia=v.tope_imponible_cesantia_uf * v.valor_uf,
+        tope_gratificacion=(v.factor_gratificacion * v.sueldo_minimo) / 12,
+        porcentaje_gratificacion=v.porcentaje_gratificacion,
+        tasa_salud=v.tasa_salud,
+        tasa_cesantia=v.tasa_cesantia,
+        tasa_cesantia_empleador=v.tasa_cesantia_empleador,
+        tasa_sis=v.tasa_sis,
+        tasa_mutual=v.tasa_mutual,
+        tasas_afp=MappingProxyType(dict(v.tasas_afp)),
+        tramos_impuesto=tuple(
+            MappingProxyType({"desde": t.desde, "hasta": h, "tasa": t.tasa, "rebaja": t.rebaja})
+            for t, h in zip(v.tramos_impuesto, hasta)
+        ),
+        tramos_hasta=hasta,
+        tramos_tasa=tuple(t.tasa for t in v.tramos_impuesto),
+        tramos_rebaja=tuple(t.rebaja for t in v.tramos_impuesto),
+    )
+
+
+def compilar_desde_datos(datos: Mapping) -> ParametrosCalculadora:
+    """Valida y compila una versión en formato dict (ej: la de `datos_version` con ajustes)."""
+    return compilar_parametros(_VersionArchivo.model_validate(datos))
+
+
+@dataclass(frozen=True)
+class _EstadoRegistro:
+    fechas: Tuple[date, ...]  # vigente_desde ordenadas
+    versiones: Tuple[_VersionArchivo, ...]
+    snapshots: Tuple[ParametrosCalculadora, ...]
+    version: int
+    origen: str
+
+
+class RegistroParametros:
+    """
+    Conjunto de snapshots por fecha de vigencia con recarga en caliente.
+
+    Las lecturas no toman locks: leen `_estado` una vez y buscan con bisect.
+    Las recargas construyen un `_EstadoRegistro` nuevo y lo asignan de una vez.
+    """
+
+    def __init__(self):
+        self._estado = self._construir_estado([_version_por_defecto()], version=0, origen="calculadora_data")
+        self._lock = threading.Lock()
+        self._ruta: Optional[str] = None
+        self._firma_archivo: Optional[Tuple[int, int]] = None
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._al_recargar: List[Callable[[], None]] = []
+
+    @staticmethod
+    def _construir_estado(versiones: List[_VersionArchivo], version: int, origen: str) -> _EstadoRegistro:
+        ordenadas = sorted(versiones, key=lambda v: v.vigente_desde)
+        fechas = tuple(v.vigente_desde for v in ordenadas)
+        if len(set(fechas)) != len(fechas):
+            raise ValueError("hay versiones con la misma fecha de vigencia")
+        return _EstadoRegistro(
+            fechas=fechas,
+            versiones=tuple(ordenadas),
+            snapshots=tuple(compilar_parametros(v) for v in ordenadas),
+            version=version,
+            origen=origen,
+        )
+
+    @property
+    def version(self) -> int:
+        """Se incrementa con cada recarga exitosa del archivo."""
+        return self._estado.version
+
+    def obtener(self, fecha: Optional[date] = None) -> ParametrosCalculadora:
+        """Snapshot vigente en `fecha` (hoy por defecto)."""
+        return self.obtener_con_version(fecha)[1]
+
+    def obtener_con_version(self, fecha: Optional[date] = None) -> Tuple[int, ParametrosCalculadora]:
+        """Versión del registro y snapshot, leídos del mismo estado."""
+        estado = self._estado
+        i = self._indice(estado, fecha)
+        return estado.version, estado.snapshots[i]
+
+    def datos_version(self, fecha: Optional[date] = None) -> dict:
+        """
+        Versión vigente como dict serializable, para ajustarla (escenarios
+        what-if) o enviarla a otro proceso y compilarla con `compilar_desde_datos`.
+        """
+        estado = self._estado
+        return estado.versiones[self._indice(estado, fecha)].model_dump(mode="json")
+
+    @staticmethod
+    def _indice(estado: _EstadoRegistro, fecha: Optional[date]) -> int:
+        if fecha is None:
+            fecha = date.today()
+        i = bisect_right(estado.fechas, fecha) - 1
+        if i < 0:
+            raise ParametrosNoVigentesError(fecha)
+        return i
+
+    def al_recargar(self, callback: Callable[[], None]) -> None:
+        """Registra una función a llamar después de cada recarga exitosa."""
+        self._al_recargar.append(callback)
+
+    def cargar(self, ruta: str) -> None:
+        """Lee, valida y compila el archivo completo; solo entonces reemplaza el estado."""
+        with self._lock:
+            firma = self._firma(ruta)
+            with open(ruta, encoding="utf-8") as f:
+                archivo = _ArchivoParametros.model_validate(json.load(f))
+            self._estado = self._construir_estado(
+                archivo.versiones, version=self._estado.version + 1, origen=ruta
+            )
+            self._ruta = ruta
+            self._firma_archivo = firma
+        logger.info(
+            f"Parámetros de calculadora cargados desde {ruta}: "
+            f"{len(archivo.versiones)} versiones (v{self._estado.version})"
+        )
+        for callback in self._al_recargar:
+            callback()
+
+    @staticmethod
+    def _firma(ruta: str) -> Tuple[int, int]:
+        st = os.stat(ruta)
+        return st.st_mtime_ns, st.st_size
+
+    def recargar_si_cambio(self) -> bool:
+        """Recarga si el archivo cambió. Un archivo inválido se ignora y se mantiene el estado actual."""
+        if self._ruta is None:
+            return False
+        try:
+            firma = self._firma(self._ruta)
+        except OSError:
+            return False
+        if firma == self._firma_archivo:
+            return False
+        try:
+            self.cargar(self._ruta)
+            return True
+        except Exception as e:
+            # Se recuerda la firma para no repetir el error hasta que el archivo vuelva a cambiar
+            self._firma_archivo = firma
+            logger.error(f"No se pudo recargar {self._ruta}, se mantienen los parámetros actuales: {e}")
+            return False
+
+    def iniciar_vigilancia(self, ruta: str, intervalo_segundos: float) -> None:
+        """Carga el archivo y lanza un hilo que lo revisa cada `intervalo_segundos`."""
+        self._ruta = ruta
+        if os.path.exists(ruta):
+            try:
+                self.cargar(ruta)
+            except Exception as e:
+                logger.error(f"Archivo de parámetros inválido {ruta}, se usan valores por defecto: {e}")
+        else:
+            logger.warning(f"No existe {ruta}, se usan los parámetros de calculadora_data")
+
+        if self._hilo is not None or intervalo_segundos <= 0:
+            return
+        self._detener.clear()
+
+        def vigilar():
+            while not self._detener.wait(intervalo_segundos):
+                self.recargar_si_cambio()
+
+        self._hilo = threading.Thread(target=vigilar, name="parametros-calculadora", daemon=True)
+        self._hilo.start()
+
+    def detener_vigilancia(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def estado(self) -> dict:
+        estado = self._estado
+        return {
+            "version": estado.version,
+            "origen": estado.origen,
+            "vigencias": [f.isoformat() if f != date.min else None for f in estado.fechas],
+        }
+
+
+registro_parametros = RegistroParametros()
+
+
+def obtener_parametros(fecha: Optional[date] = None) -> ParametrosCalculadora:
+    """Snapshot vigente en `fecha`. Leerlo una vez por cálculo para usar valores consistentes."""
+    return registro_parametros.obtener(fecha)
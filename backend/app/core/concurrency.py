@@ -0,0 +1,230 @@
+"""
+Ejecución de código síncrono (SQLAlchemy, bcrypt) fuera del event loop.
+
+Los endpoints `async def` no deben llamar directamente a funciones
+bloqueantes: mientras una query o un hash bcrypt corre en el event loop,
+ninguna otra request del worker avanza. `run_sync` delega la llamada a un
+pool de hilos acotado y espera el resultado sin bloquear.
+
+Para trabajo de CPU largo (ej: simulaciones masivas) `run_in_process` usa un
+pool de procesos, que no compite por el GIL con las requests.
+
+Cada dependencia tiene su propio compartimento (bulkhead): la BD de Licencias
+(`run_sync`), la BD de Marcas (`run_marcas`), bcrypt y la API de BUK
+(`LimitadorConcurrencia` en buk_client). Todos tienen hilos o cupos propios y
+una cola acotada; si la cola se llena se rechaza al tiro con 503 en vez de
+acumular requests que igual van a vencer. Así una dependencia lenta (ej:
+escaneos pesados de AccessLog en Marcas) agota solo su compartimento y no
+deja sin hilos a Licencias ni al login.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.exceptions import ServicioSaturadoError
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """
+    Pool de hilos con límite de trabajos pendientes (en ejecución + en cola).
+
+    Si al enviar un trabajo ya hay `max_workers + max_queue` pendientes, se
+    lanza ServicioSaturadoError sin encolarlo. El cupo se libera cuando el
+    hilo termina, aunque quien esperaba el resultado haya sido cancelado.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, nombre: str):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.capacidad = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=nombre)
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self.completados = 0
+        self.rechazados = 0
+
+    def _liberar(self, _: Future) -> None:
+        with self._lock:
+            self._pendientes -= 1
+            self.completados += 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            if self._pendientes >= self.capacidad:
+                self.rechazados += 1
+                raise ServicioSaturadoError()
+            self._pendientes += 1
+        try:
+            call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+            futuro = self._executor.submit(call)
+        except BaseException:
+            with self._lock:
+                self._pendientes -= 1
+            raise
+        futuro.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(futuro)
+
+    def estado(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pendientes": self._pendientes,
+                "completados": self.completados,
+                "rechazados": self.rechazados,
+            }
+
+
+class LimitadorConcurrencia:
+    """
+    Equivalente de BoundedExecutor para dependencias async (ej: API de BUK).
+
+    Deja pasar hasta `max_concurrentes` corrutinas a la vez y hace esperar a
+    otras `max_queue`; con eso lleno, `ocupar()` lanza `error()` sin esperar.
+    """
+
+    def __init__(
+        self,
+        max_concurrentes: int,
+        max_queue: int,
+        nombre: str,
+        error: Callable[[], Exception] = ServicioSaturadoError
+    ):
+        self.max_concurrentes = max_concurrentes
+        self.max_queue = max_queue
+        self.capacidad = max_concurrentes + max_queue
+        self.nombre = nombre
+        self._error = error
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._semaforo_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pendientes = 0
+        self.completados = 0
+        self.rechazados = 0
+
+    def _semaforo_actual(self) -> asyncio.Semaphore:
+        # El semáforo queda asociado al event loop donde se creó
+        loop = asyncio.get_running_loop()
+        if self._semaforo is None or self._semaforo_loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.max_concurrentes)
+            self._semaforo_loop = loop
+        return self._semaforo
+
+    @contextlib.asynccontextmanager
+    async def ocupar(self) -> AsyncIterator[None]:
+        if self._pendientes >= self.capacidad:
+            self.rechazados += 1
+            raise self._error()
+        self._pendientes += 1
+        try:
+            async with self._semaforo_actual():
+                yield
+        finally:
+            self._pendientes -= 1
+            self.completados += 1
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "max_concurrentes": self.max_concurrentes,
+            "max_queue": self.max_queue,
+            "pendientes": self._pendientes,
+            "completados": self.completados,
+            "rechazados": self.rechazados,
+        }
+
+
+# Un compartimento por dependencia síncrona
+licencias_executor = BoundedExecutor(settings.SYNC_IO_MAX_WORKERS, settings.SYNC_IO_MAX_QUEUE, "bd-licencias")
+marcas_executor = BoundedExecutor(settings.MARCAS_IO_MAX_WORKERS, settings.MARCAS_IO_MAX_QUEUE, "bd-marcas")
+bcrypt_executor = BoundedExecutor(settings.BCRYPT_MAX_WORKERS, settings.BCRYPT_MAX_QUEUE, "bcrypt")
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta `func(*args, **kwargs)` en el compartimento de la BD de Licencias.
+
+    Raises:
+        ServicioSaturadoError (503): Si ya hay demasiados trabajos pendientes
+
+    Usage:
+        user = await run_sync(auth_service.authenticate, username, password)
+    """
+    return await licencias_executor.run(func, *args, **kwargs)
+
+
+async def run_marcas(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta `func(*args, **kwargs)` en el compartimento de la BD de Marcas.
+
+    Raises:
+        ServicioSaturadoError (503): Si ya hay demasiados trabajos pendientes
+    """
+    return await marcas_executor.run(func, *args, **kwargs)
+
+
+async def iterar_sync(
+    iterador: Iterator[T],
+    cerrar: Optional[Callable[[], None]] = None,
+    executor: Optional[BoundedExecutor] = None
+) -> AsyncIterator[T]:
+    """
+    Recorre un iterador bloqueante (ej: un cursor con yield_per) pidiendo cada
+    elemento en el compartimento `executor` (Licencias por defecto).
+
+    Cada `next()` es un trabajo aparte: entre elementos el hilo queda libre
+    para otras requests. `cerrar` se llama al terminar, también si el cliente
+    corta el stream; si el compartimento no tiene cupo para eso, se cierra en
+    el hilo actual para no dejar la conexión tomada.
+
+    Raises:
+        ServicioSaturadoError (503): Si el compartimento está saturado
+    """
+    executor = executor or licencias_executor
+    fin = object()
+    try:
+        while True:
+            elemento = await executor.run(next, iterador, fin)
+            if elemento is fin:
+                return
+            yield elemento
+    finally:
+        if cerrar is not None:
+            try:
+                await executor.run(cerrar)
+            except (ServicioSaturadoError, asyncio.CancelledError):
+                cerrar()
+
+
+# Pool de procesos para CPU; se crea recién cuando se usa
+_process_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(max_workers=settings.PROCESS_POOL_MAX_WORKERS)
+    return _process_executor
+
+
+async def run_in_process(func: Callable[..., T], *args: Any) -> T:
+    """
+    Ejecuta `func(*args)` en el pool de procesos.
+
+    `func` debe ser una función de nivel de módulo y los argumentos y el
+    resultado deben poder serializarse con pickle.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args))
+
+
+def shutdown_process_pool() -> None:
+    global _process_executor
+    if _process_executor is not None:
+        _process_executor.shutdown(wait=False, cancel_futures=True)
+        _process_executor = None
@@ -11,6 +11,10 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_NAME: str
     DB_DRIVER: str = "ODBC Driver 18 for SQL Server"
+    DB_POOL_SIZE: int = 5  # Conexiones que el pool mantiene abiertas
+    DB_MAX_OVERFLOW: int = 10  # Conexiones extra permitidas en peaks (se cierran al devolverse)
+    DB_POOL_TIMEOUT: float = 30.0  # Segundos esperando una conexión libre antes de error
+    DB_POOL_RECYCLE: int = 1800  # Segundos de vida de una conexión antes de reabrirla (-1 = sin límite)
     
     # Variables de Base de Datos (Marcas)
     MARCAS_DB_SERVER: str
@@ -18,15 +22,74 @@ class Settings(BaseSettings):
     MARCAS_DB_PASSWORD: str
     MARCAS_DB_NAME: str
     MARCAS_DB_DRIVER: str = "ODBC Driver 18 for SQL Server"
+    MARCAS_DB_POOL_SIZE: int = 5
+    MARCAS_DB_MAX_OVERFLOW: int = 10
+    MARCAS_DB_POOL_TIMEOUT: float = 30.0
+    MARCAS_DB_POOL_RECYCLE: int = 1800
+    # Validación de conexiones inactivas en segundo plano (reemplaza el pre-ping por checkout)
+    DB_VALIDACION_INTERVALO_SECONDS: float = 60.0  # Cada cuánto se revisan los pools (0 = pre-ping en cada checkout)
+    DB_VALIDACION_INACTIVIDAD_SECONDS: float = 120.0  # Inactividad desde la que una conexión recibe ping
+    DB_VALIDACION_RESERVA: int = 1  # Conexiones libres que deben quedar para los requests mientras se valida una
+    DB_VALIDACION_PING_TIMEOUT_SECONDS: int = 5  # Timeout de consulta del ping (pyodbc, segundos enteros)
+    DB_CONNECT_TIMEOUT_SECONDS: int = 10  # Timeout de login al abrir una conexión (ambas BD)
     
     # Configuración JWT para autenticación
     JWT_SECRET_KEY: str = "change-this-secret-key-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 480  # 8 horas
+    AUTH_PRINCIPAL_TTL_SECONDS: float = 30.0  # Vida del usuario/rol/módulos cacheados por token (0 = sin cache)
+    AUTH_PRINCIPAL_MAX_ITEMS: int = 5000
+    AUTH_PERMISOS_REFRESH_SECONDS: float = 60.0  # Edad máxima de la matriz rol/usuario -> módulos (0 = solo al escribir)
+    AUTH_REVOCACION_PATH: str = ""  # Archivo de tokens revocados (vacío = backend/revocaciones.json)
+    AUTH_REVOCACION_RECARGA_SECONDS: float = 5.0  # Cada cuánto revisar si otro worker cambió el archivo
+    
+    # Hilos para ejecutar I/O síncrono de la BD de Licencias desde endpoints async,
+    # y cuántos trabajos pueden esperar antes de responder 503
+    SYNC_IO_MAX_WORKERS: int = 16
+    SYNC_IO_MAX_QUEUE: int = 64
+    # Lo mismo para la BD de Marcas (compartimento separado)
+    MARCAS_IO_MAX_WORKERS: int = 4
+    MARCAS_IO_MAX_QUEUE: int = 16
+    # Hilos para bcrypt (login) y cuántos hashes pueden esperar antes de responder 503
+    BCRYPT_MAX_WORKERS: int = 4
+    BCRYPT_MAX_QUEUE: int = 32
+    # Procesos para trabajo de CPU (simulaciones masivas)
+    PROCESS_POOL_MAX_WORKERS: int = 2
+    
+    # Calculadora de sueldos
+    CALCULADORA_LOTE_MAX_ITEMS: int = 20000  # Máximo de cálculos por request en /lote
+    CALCULADORA_CURVA_MAX_PUNTOS: int = 5000  # Máximo de puntos por request en /curva
+    CALCULADORA_PARAMETROS_PATH: str = ""  # JSON de parámetros por vigencia; vacío = backend/parametros_calculadora.json
+    CALCULADORA_PARAMETROS_POLL_SECONDS: float = 30.0  # Cada cuánto se revisa si el archivo cambió (0 = no vigilar)
+    CALCULADORA_MEMO_MAX_ITEMS: int = 4096  # Resultados recordados de /calcular y /simular (0 = sin memo)
+    SIMULACION_DOTACION_DIR: str = ""  # Dónde se escriben los resultados; vacío = backend/simulaciones
+    SIMULACION_DOTACION_TAMANO_BLOQUE: int = 200  # Trabajadores por bloque enviado al pool de procesos
+    SIMULACION_DOTACION_MAX_ACTIVAS: int = 2  # Simulaciones en ejecución al mismo tiempo
+    SIMULACION_DOTACION_RETENCION_HORAS: float = 24.0  # Vida de una simulación terminada y su CSV
+    SIMULACION_DOTACION_MAX_TERMINADAS: int = 20  # Terminadas que se conservan; las más antiguas se borran
+    
+    # Cálculo de finiquitos
+    FINIQUITO_LOTE_MAX_RUTS: int = 2000  # Máximo de trabajadores por request en /calculo/lote
+    USUARIOS_IMPORTACION_MAX_FILAS: int = 5000  # Máximo de filas por importación masiva de usuarios
     
     # Configuración API BUK
     BUK_API_BASE_URL: str 
     BUK_API_KEY: str 
+    BUK_MAX_CONCURRENCY: int = 10  # Llamadas simultáneas máximas en consultas masivas
+    BUK_RATE_LIMIT_PER_SECOND: float = 20.0  # Presupuesto de llamadas por segundo a BUK (todo el proceso)
+    BUK_BATCH_MAX_RUTS: int = 2000  # Máximo de RUTs por consulta masiva
+    BUK_TIMEOUT_SECONDS: float = 15.0
+    BUK_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    BUK_MAX_CONNECTIONS: int = 20  # También es el máximo de llamadas simultáneas a BUK del proceso
+    BUK_MAX_QUEUE: int = 200  # Llamadas que pueden esperar cupo antes de responder 503
+    BUK_MAX_RETRIES: int = 2  # Reintentos ante errores de red, 5xx o 429
+    BUK_RETRY_BASE_DELAY_MS: int = 200
+    BUK_RETRY_BUDGET_RATIO: float = 0.2  # Reintentos permitidos por petición original
+    BUK_BREAKER_FAILURE_THRESHOLD: int = 5  # Fallas seguidas para abrir el circuito
+    BUK_BREAKER_RESET_SECONDS: float = 30.0  # Tiempo en abierto antes de probar de nuevo
+    BUK_HEDGE_ENABLED: bool = False  # Segunda petición tras el p95 del endpoint
+    BUK_HEDGE_MIN_SAMPLES: int = 20
+    BUK_HEDGE_MIN_DELAY_MS: int = 100
 
     class Config:
         # Indica dónde buscar el archivo .env
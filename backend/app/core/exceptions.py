@@ -13,6 +13,45 @@ class FiniquitoNotFoundError(HTTPException):
     def __init__(self, finiquito_id: int):
         super().__init__(status_code=404, detail=f"Finiquito {finiquito_id} no encontrado")
 
+class TrabajadorNoEncontradoError(HTTPException):
+    def __init__(self, rut: str):
+        super().__init__(status_code=404, detail=f"Trabajador {rut} no encontrado o no activo")
+
+class BukNoDisponibleError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="API de BUK no disponible temporalmente",
+            headers={"Retry-After": "30"}
+        )
+
+class BukSaturadoError(BukNoDisponibleError):
+    """Demasiadas llamadas a BUK en espera en este proceso (se rechaza sin llamar)."""
+    def __init__(self):
+        super().__init__()
+        self.detail = "API de BUK saturada, intente nuevamente en unos segundos"
+        self.headers = {"Retry-After": "1"}
+
+class ServicioSaturadoError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Servicio saturado, intente nuevamente en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+
+class ParametrosNoVigentesError(HTTPException):
+    def __init__(self, fecha):
+        super().__init__(status_code=404, detail=f"No hay parámetros de calculadora vigentes al {fecha}")
+
+class CursorInvalidoError(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=400, detail="Cursor de paginación inválido o de otro orden")
+
+class SimulacionNoEncontradaError(HTTPException):
+    def __init__(self, simulacion_id: str):
+        super().__init__(status_code=404, detail=f"Simulación {simulacion_id} no encontrada")
+
 async def generic_exception_handler(request: Request, exc: Exception):
     return JSONResponse(
         status_code=500,
@@ -0,0 +1,63 @@
+"""
+Memo LRU acotado y seguro entre hilos, con estadísticas de aciertos.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class MemoLRU:
+    """
+    Diccionario con tamaño máximo que descarta la entrada usada hace más tiempo.
+
+    Los endpoints sync corren en el threadpool, así que todo acceso pasa por
+    un lock. El cálculo en sí se hace fuera del lock: dos requests iguales que
+    llegan a la vez pueden calcular los dos, pero nunca se bloquean entre sí.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._datos: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+        self.invalidaciones = 0
+
+    def obtener_o_calcular(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        if self.max_items <= 0:
+            return calcular()
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+
+        valor = calcular()
+
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self.descartes += 1
+        return valor
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "items": len(self._datos),
+                "max_items": self.max_items,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "descartes": self.descartes,
+                "invalidaciones": self.invalidaciones,
+            }
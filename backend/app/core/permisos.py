@@ -0,0 +1,120 @@
+"""
+Matriz de permisos rol/usuario -> módulos, en memoria.
+
+Se arma con tres queries (módulos activos, RolModulos y UsuarioModulos) y
+queda como un objeto inmutable de frozensets; require_module consulta la
+matriz con una pertenencia a conjunto, sin ir a la BD. Las escrituras de
+AuthService la reconstruyen completa y la reemplazan de una vez, así que un
+request ve la matriz anterior o la nueva, nunca una mezcla.
+
+Como la cache de principales, vive en el proceso: los otros workers la
+reconstruyen cuando tiene más de AUTH_PERMISOS_REFRESH_SECONDS.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.auth import Role, Modulo, rol_modulos, usuario_modulos
+
+
+@dataclass(frozen=True)
+class MatrizPermisos:
+    __slots__ = ("modulos_activos", "por_rol", "por_usuario", "construida")
+
+    modulos_activos: Mapping[str, str]  # código -> nombre, solo módulos activos
+    por_rol: Mapping[str, FrozenSet[str]]  # nombre de rol -> códigos activos
+    por_usuario: Mapping[int, FrozenSet[str]]  # id de usuario -> códigos activos asignados directo
+    construida: float  # time.monotonic() al construirla
+
+    def tiene_acceso(self, rol: Optional[str], usuario_id: int, codigo: str) -> bool:
+        """El módulo está en los del rol o en los asignados al usuario."""
+        return codigo in self.por_rol.get(rol, frozenset()) or codigo in self.por_usuario.get(usuario_id, frozenset())
+
+
+def construir_matriz(db: Session) -> MatrizPermisos:
+    activos = {codigo: nombre for codigo, nombre in db.query(Modulo.codigo, Modulo.nombre).filter(Modulo.activo == True)}
+
+    por_rol: Dict[str, Set[str]] = {nombre: set() for (nombre,) in db.query(Role.nombre)}
+    filas_rol = (
+        db.query(Role.nombre, Modulo.codigo)
+        .join(rol_modulos, rol_modulos.c.rol_id == Role.id)
+        .join(Modulo, Modulo.id == rol_modulos.c.modulo_id)
+        .filter(Modulo.activo == True)
+    )
+    for rol, codigo in filas_rol:
+        por_rol[rol].add(codigo)
+
+    por_usuario: Dict[int, Set[str]] = {}
+    filas_usuario = (
+        db.query(usuario_modulos.c.usuario_id, Modulo.codigo)
+        .join(Modulo, Modulo.id == usuario_modulos.c.modulo_id)
+        .filter(Modulo.activo == True)
+    )
+    for usuario_id, codigo in filas_usuario:
+        por_usuario.setdefault(usuario_id, set()).add(codigo)
+
+    return MatrizPermisos(
+        modulos_activos=MappingProxyType(activos),
+        por_rol=MappingProxyType({r: frozenset(c) for r, c in por_rol.items()}),
+        por_usuario=MappingProxyType({u: frozenset(c) for u, c in por_usuario.items()}),
+        construida=time.monotonic(),
+    )
+
+
+class RegistroPermisos:
+    """Guarda la matriz vigente y la reemplaza al reconstruirla."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._matriz: Optional[MatrizPermisos] = None
+        self._secuencia_matriz = 0
+        self._secuencia = 0
+        self.reconstrucciones = 0
+
+    def actual(self) -> Optional[MatrizPermisos]:
+        """Matriz vigente, o None si no existe o ya debe refrescarse."""
+        matriz = self._matriz
+        if matriz is None:
+            return None
+        if self.refresh_seconds > 0 and time.monotonic() - matriz.construida > self.refresh_seconds:
+            return None
+        return matriz
+
+    def reconstruir(self, db: Session) -> MatrizPermisos:
+        """
+        Arma una matriz nueva desde la BD y la deja vigente.
+
+        Si dos reconstrucciones se cruzan, queda la que empezó después (vio
+        los datos más recientes), aunque termine antes.
+        """
+        with self._lock:
+            self._secuencia += 1
+            secuencia = self._secuencia
+        matriz = construir_matriz(db)
+        with self._lock:
+            if secuencia > self._secuencia_matriz:
+                self._matriz = matriz
+                self._secuencia_matriz = secuencia
+                self.reconstrucciones += 1
+            return self._matriz
+
+    def estado(self) -> Dict[str, Any]:
+        matriz = self._matriz
+        return {
+            "construida": matriz is not None,
+            "edad_segundos": round(time.monotonic() - matriz.construida, 1) if matriz else None,
+            "refresh_seconds": self.refresh_seconds,
+            "modulos_activos": len(matriz.modulos_activos) if matriz else 0,
+            "roles": len(matriz.por_rol) if matriz else 0,
+            "usuarios_con_modulos": len(matriz.por_usuario) if matriz else 0,
+            "reconstrucciones": self.reconstrucciones,
+        }
+
+
+registro_permisos = RegistroPermisos(settings.AUTH_PERMISOS_REFRESH_SECONDS)
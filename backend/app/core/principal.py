@@ -0,0 +1,118 @@
+"""
+Cache de principales: lo que la autorización necesita saber del usuario del token.
+
+Cada request protegido resolvía el usuario con una query. Aquí se guarda, por
+`sub` del token, una foto inmutable del usuario (id, activo y rol) con un TTL
+corto. Las escrituras de AuthService invalidan la entrada del usuario
+afectado. Los módulos a los que tiene acceso salen de la matriz de permisos
+(app.core.permisos).
+
+La cache vive en el proceso: con varios workers, la invalidación solo llega
+al worker que atendió el cambio y los demás ven el dato nuevo al vencer el TTL.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Foto del usuario autenticado; no toca la sesión de BD."""
+    __slots__ = ("id", "username", "activo", "rol")
+
+    id: int
+    username: str
+    activo: bool
+    rol: Optional[str]
+
+    @classmethod
+    def desde_usuario(cls, user: Any) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            activo=bool(user.activo),
+            rol=user.rol.nombre if user.rol is not None else None,
+        )
+
+
+class CachePrincipales:
+    """
+    Principales por username con TTL y contador de versión por usuario.
+
+    Una entrada sirve mientras no venza y la versión del usuario no haya
+    cambiado desde que se cargó.
+    """
+
+    def __init__(self, ttl_seconds: float, max_items: int):
+        self.ttl = ttl_seconds
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._entradas: Dict[str, Tuple[Principal, float, int]] = {}
+        self._versiones: Dict[str, int] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, username: str) -> Optional[Principal]:
+        """Principal vigente de `username`, o None si hay que cargarlo."""
+        with self._lock:
+            entrada = self._entradas.get(username)
+            if entrada is not None:
+                principal, expira, version = entrada
+                if version == self._versiones.get(username, 0) and expira > time.monotonic():
+                    self.aciertos += 1
+                    return principal
+            self.fallos += 1
+            return None
+
+    def cargar(self, username: str, cargar: Callable[[], Optional[Principal]]) -> Optional[Principal]:
+        """
+        Carga el principal con `cargar()` (fuera del lock) y lo guarda.
+
+        Si el usuario se invalida mientras se carga, el resultado se retorna
+        pero no se guarda, para no dejar en cache una foto anterior al cambio.
+        """
+        with self._lock:
+            version = self._versiones.get(username, 0)
+        principal = cargar()
+        if principal is None or self.ttl <= 0:
+            return principal
+        with self._lock:
+            if self._versiones.get(username, 0) == version:
+                if len(self._entradas) >= self.max_items:
+                    self._purgar()
+                self._entradas[username] = (principal, time.monotonic() + self.ttl, version)
+        return principal
+
+    def _purgar(self) -> None:
+        """Saca las entradas vencidas y, si no alcanza, las más antiguas."""
+        ahora = time.monotonic()
+        for username in [u for u, (_, expira, _) in self._entradas.items() if expira <= ahora]:
+            del self._entradas[username]
+        while len(self._entradas) >= self.max_items:
+            del self._entradas[next(iter(self._entradas))]
+
+    def invalidar_usuario(self, username: str) -> None:
+        with self._lock:
+            self._versiones[username] = self._versiones.get(username, 0) + 1
+            self._entradas.pop(username, None)
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "items": len(self._entradas),
+                "max_items": self.max_items,
+                "ttl_seconds": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+cache_principales = CachePrincipales(settings.AUTH_PRINCIPAL_TTL_SECONDS, settings.AUTH_PRINCIPAL_MAX_ITEMS)
@@ -0,0 +1,55 @@
+"""
+Limitador de tasa asíncrono (token bucket) para llamadas a APIs externas.
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket compartido entre corrutinas.
+
+    Permite ráfagas de hasta `burst` llamadas y luego limita a `rate`
+    llamadas por segundo. `acquire()` espera lo necesario sin bloquear
+    el event loop.
+
+    Cada llamada reserva su token antes de dormir (el saldo puede quedar
+    negativo) y duerme hasta que le toca, en orden de llegada. La reserva no
+    tiene ningún await, así que no necesita lock: nadie duerme reteniendo
+    nada y el limitador sirve desde cualquier event loop.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que 0")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def intentar(self) -> bool:
+        """Consume un token si hay uno disponible ahora; nunca espera."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Consume un token, esperando si el presupuesto está agotado."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            # La reserva no se usó: se devuelve para no retrasar a los que siguen
+            self._tokens += 1
+            raise
@@ -0,0 +1,258 @@
+"""
+Lista de tokens revocados (logout y revocación forzada), en memoria.
+
+Cada token lleva un `jti`. Revocarlo lo agrega a un dict jti -> exp y a un
+balde por hora de expiración; cuando pasa la hora, el balde completo se
+descarta, así la lista nunca crece más allá de los tokens aún vigentes.
+Revocar a un usuario guarda "revocado antes de" (epoch): todo token suyo con
+`iat` anterior queda inválido, y la marca se descarta cuando ya no puede
+quedar ningún token emitido antes de ella (JWT_EXPIRE_MINUTES).
+
+La consulta es O(1) y no toca la BD ni el disco: lee una foto inmutable
+(jtis y marcas por usuario) que se reemplaza de una vez en cada cambio, sin
+lock. Cada cambio se escribe a un archivo JSON local (reemplazo atómico)
+para sobrevivir reinicios; un hilo en segundo plano (`iniciar_recarga`,
+arrancado en el lifespan de la app) relee el archivo si otro worker lo
+cambió y descarta lo vencido, cada AUTH_REVOCACION_RECARGA_SECONDS.
+
+Varios workers comparten el archivo: cada escritura toma un lock del sistema
+operativo (`<ruta>.lock`), relee el archivo y lo fusiona con lo que hay en
+memoria antes de escribir, así una revocación hecha por otro worker nunca se
+pisa. Las revocaciones solo se agregan (hasta que vencen), por lo que
+fusionar es unir.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterator, Mapping, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.core.config import settings
+from app.core.logging_config import logger
+
+RUTA_POR_DEFECTO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "revocaciones.json"
+)
+
+SEGUNDOS_BALDE = 3600
+
+
+@dataclass(frozen=True)
+class _Vista:
+    """Lo que consulta `revocado`; se reemplaza entera, nunca se modifica."""
+    __slots__ = ("jtis", "usuarios")
+
+    jtis: FrozenSet[str]
+    usuarios: Mapping[str, float]  # username -> revocado antes de (epoch)
+
+
+class ListaRevocacion:
+
+    def __init__(self, ruta: str, recarga_seconds: float, vida_token_seconds: float):
+        self.ruta = ruta
+        self.recarga_seconds = recarga_seconds
+        self.vida_token_seconds = vida_token_seconds
+        self._lock = threading.Lock()
+        self._jtis: Dict[str, float] = {}
+        self._baldes: Dict[int, Set[str]] = {}
+        self._usuarios: Dict[str, float] = {}
+        self._balde_purgado = 0
+        self._firma_archivo: Optional[tuple] = None
+        self._vista = _Vista(frozenset(), MappingProxyType({}))
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    # === Consulta ===
+
+    def revocado(self, payload: Mapping[str, Any]) -> bool:
+        """True si el token (payload ya decodificado) fue revocado. Solo memoria."""
+        vista = self._vista
+        jti = payload.get("jti")
+        if jti is not None and jti in vista.jtis:
+            return True
+        antes = vista.usuarios.get(payload.get("sub"))
+        if antes is not None:
+            # Tokens sin iat son anteriores a este módulo: se consideran viejos
+            return payload.get("iat", 0) < antes
+        return False
+
+    # === Revocación ===
+
+    def revocar_token(self, jti: str, exp: float) -> None:
+        """Revoca un token hasta su expiración (logout)."""
+        with self._lock, self._bloqueo_archivo():
+            self._fusionar(self._leer())
+            self._agregar(jti, float(exp))
+            self._purgar(time.time())
+            self._guardar()
+            self._publicar()
+
+    def revocar_usuario(self, username: str) -> None:
+        """Revoca todos los tokens de `username` emitidos hasta ahora."""
+        with self._lock, self._bloqueo_archivo():
+            self._fusionar(self._leer())
+            self._usuarios[username] = max(time.time(), self._usuarios.get(username, 0.0))
+            self._purgar(time.time())
+            self._guardar()
+            self._publicar()
+        logger.info(f"Sesiones revocadas para usuario: {username}")
+
+    def _agregar(self, jti: str, exp: float) -> None:
+        self._jtis[jti] = exp
+        self._baldes.setdefault(int(exp // SEGUNDOS_BALDE), set()).add(jti)
+
+    def _purgar(self, ahora: float) -> None:
+        """Descarta los baldes ya vencidos y las marcas de usuario que no aplican."""
+        balde_actual = int(ahora // SEGUNDOS_BALDE)
+        if balde_actual == self._balde_purgado:
+            return
+        for balde in [b for b in self._baldes if b < balde_actual]:
+            for jti in self._baldes.pop(balde):
+                self._jtis.pop(jti, None)
+        limite = ahora - self.vida_token_seconds
+        for username in [u for u, antes in self._usuarios.items() if antes < limite]:
+            del self._usuarios[username]
+        self._balde_purgado = balde_actual
+
+    def _publicar(self) -> None:
+        """Deja vigente una foto nueva de lo revocado (llamar con self._lock)."""
+        self._vista = _Vista(frozenset(self._jtis), MappingProxyType(dict(self._usuarios)))
+
+    # === Persistencia ===
+
+    @contextlib.contextmanager
+    def _bloqueo_archivo(self) -> Iterator[None]:
+        """Lock exclusivo entre procesos para leer-fusionar-escribir el archivo."""
+        try:
+            f = open(f"{self.ruta}.lock", "a+b")
+        except OSError as e:
+            logger.error(f"No se pudo abrir el lock de la lista de revocación: {e}")
+            yield
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            # Cerrar el archivo libera el lock
+            f.close()
+
+    def _guardar(self) -> None:
+        """Escribe la lista (llamar con el lock del archivo tomado)."""
+        datos = {"jtis": self._jtis, "usuarios": self._usuarios}
+        directorio, nombre = os.path.split(os.path.abspath(self.ruta))
+        temporal = None
+        try:
+            # Temporal único por escritura: dos procesos nunca comparten el mismo
+            with tempfile.NamedTemporaryFile(
+                "w", dir=directorio, prefix=f"{nombre}.", suffix=".tmp", delete=False, encoding="utf-8"
+            ) as f:
+                temporal = f.name
+                json.dump(datos, f)
+            os.replace(temporal, self.ruta)
+            self._firma_archivo = self._firma()
+        except OSError as e:
+            logger.error(f"No se pudo guardar la lista de revocación en {self.ruta}: {e}")
+            if temporal is not None and os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _firma(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.ruta)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _revisar_archivo(self, ahora: float) -> None:
+        """Relee el archivo si otro worker lo cambió y descarta lo vencido."""
+        if self._firma() != self._firma_archivo:
+            self.cargar()
+        elif int(ahora // SEGUNDOS_BALDE) != self._balde_purgado:
+            with self._lock:
+                self._purgar(ahora)
+                self._publicar()
+
+    def _leer(self) -> Dict[str, Any]:
+        """Contenido del archivo ({} si no existe o no se puede leer)."""
+        if not os.path.exists(self.ruta):
+            return {}
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"No se pudo leer la lista de revocación {self.ruta}: {e}")
+            return {}
+
+    def _fusionar(self, datos: Mapping[str, Any]) -> None:
+        """Agrega a la memoria lo revocado en el archivo (llamar con self._lock)."""
+        ahora = time.time()
+        for jti, exp in datos.get("jtis", {}).items():
+            if exp > ahora and jti not in self._jtis:
+                self._agregar(jti, float(exp))
+        for username, antes in datos.get("usuarios", {}).items():
+            self._usuarios[username] = max(float(antes), self._usuarios.get(username, 0.0))
+        self._balde_purgado = 0
+        self._purgar(ahora)
+
+    def cargar(self) -> None:
+        """Lee el archivo (si existe) y lo fusiona con la lista en memoria."""
+        firma = self._firma()
+        if firma is None:
+            return
+        datos = self._leer()
+        with self._lock:
+            self._fusionar(datos)
+            self._firma_archivo = firma
+            self._publicar()
+
+    def iniciar_recarga(self) -> None:
+        """Carga el archivo y lanza el hilo que lo revisa cada `recarga_seconds`."""
+        self.cargar()
+        if self._hilo is not None or self.recarga_seconds <= 0:
+            return
+        self._detener.clear()
+
+        def recargar():
+            while not self._detener.wait(self.recarga_seconds):
+                try:
+                    self._revisar_archivo(time.time())
+                except Exception as e:
+                    logger.error(f"Error recargando la lista de revocación: {type(e).__name__}: {e}")
+
+        self._hilo = threading.Thread(target=recargar, name="revocacion", daemon=True)
+        self._hilo.start()
+
+    def detener_recarga(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "ruta": self.ruta,
+            "tokens_revocados": len(self._jtis),
+            "baldes": len(self._baldes),
+            "usuarios_revocados": len(self._usuarios),
+        }
+
+
+lista_revocacion = ListaRevocacion(
+    settings.AUTH_REVOCACION_PATH or RUTA_POR_DEFECTO,
+    settings.AUTH_REVOCACION_RECARGA_SECONDS,
+    settings.JWT_EXPIRE_MINUTES * 60,
+)
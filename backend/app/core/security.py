@@ -1,23 +1,30 @@
 """
 Módulo de seguridad para autenticación JWT y hashing de passwords.
 """
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import settings
+from app.core.concurrency import run_sync, bcrypt_executor
 from app.db.deps import get_db
-from app.models.auth import Usuario, Modulo
+from app.core.permisos import registro_permisos
+from app.core.principal import Principal, cache_principales
+from app.core.revocacion import lista_revocacion
+from app.models.auth import Usuario
 
 # Configuración de hashing de passwords
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Esquema OAuth2 para extraer token del header Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme_opcional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -25,6 +32,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password en el pool acotado de bcrypt.
+    
+    Raises:
+        ServicioSaturadoError (503): Si ya hay demasiadas verificaciones pendientes
+    """
+    return await bcrypt_executor.run(verify_password, plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """Genera el hash bcrypt de una contraseña."""
     return pwd_context.hash(password)
@@ -48,7 +65,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti identifica el token para revocarlo; iat con fracción para comparar
+    # contra la marca de revocación del usuario sin empates dentro del segundo
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode, 
         settings.JWT_SECRET_KEY, 
@@ -75,15 +94,12 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> Usuario:
+def _username_del_token(token: str) -> str:
     """
-    Dependencia FastAPI que obtiene el usuario actual desde el token JWT.
+    Decodifica el token, verifica que no esté revocado y retorna su `sub`.
     
     Raises:
-        HTTPException 401: Si el token es inválido o el usuario no existe
+        HTTPException 401: Si el token es inválido, no trae `sub` o fue revocado
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -99,9 +115,85 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(Usuario).filter(Usuario.username == username).first()
+    if lista_revocacion.revocado(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión revocada",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return username
+
+
+def _get_user_by_username(db: Session, username: str) -> Optional[Usuario]:
+    """Carga el usuario con su rol (se ejecuta en el pool de I/O síncrono)."""
+    return (
+        db.query(Usuario)
+        .options(joinedload(Usuario.rol))
+        .filter(Usuario.username == username)
+        .first()
+    )
+
+
+def _get_principal(db: Session, username: str) -> Optional[Principal]:
+    """Carga usuario y rol y arma el principal."""
+    user = _get_user_by_username(db, username)
+    return Principal.desde_usuario(user) if user is not None else None
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Dependencia FastAPI con el principal del token, desde la cache de principales.
+    
+    Solo va a la BD cuando el principal no está en cache (o venció). Para
+    endpoints que necesitan el modelo Usuario completo, usar get_current_user.
+    
+    Raises:
+        HTTPException 401: Si el token es inválido o revocado, el usuario no existe o está desactivado
+    """
+    username = _username_del_token(token)
+    
+    principal = cache_principales.obtener(username)
+    if principal is None:
+        principal = await run_sync(cache_principales.cargar, username, lambda: _get_principal(db, username))
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciales inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not principal.activo:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario desactivado"
+        )
+    
+    return principal
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Usuario:
+    """
+    Dependencia FastAPI que obtiene el usuario actual desde el token JWT.
+    
+    Raises:
+        HTTPException 401: Si el token es inválido o revocado, o el usuario no existe
+    """
+    username = _username_del_token(token)
+    
+    user = await run_sync(_get_user_by_username, db, username)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciales inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     if not user.activo:
         raise HTTPException(
@@ -133,19 +225,21 @@ def require_role(allowed_roles: list[str]):
     
     Usage:
         @router.get("/admin-only")
-        async def admin_route(user: Usuario = Depends(require_role(["admin"]))):
+        async def admin_route(user: Principal = Depends(require_role(["admin"]))):
             ...
     """
+    roles_permitidos = frozenset(allowed_roles)
+    
     async def role_checker(
-        current_user: Usuario = Depends(get_current_user)
-    ) -> Usuario:
+        current_user: Principal = Depends(get_current_principal)
+    ) -> Principal:
         if current_user.rol is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario sin rol asignado"
             )
         
-        if current_user.rol.nombre not in allowed_roles:
+        if current_user.rol not in roles_permitidos:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Acceso denegado. Rol requerido: {', '.join(allowed_roles)}"
@@ -165,36 +259,34 @@ def require_module(module_code: str):
     
     Usage:
         @router.get("/finiquitos")
-        async def finiquitos_route(user: Usuario = Depends(require_module("finiquitos"))):
+        async def finiquitos_route(user: Principal = Depends(require_module("finiquitos"))):
             ...
+    
+    Hoy ningún router la usa: fuera de /auth y /admin el frontend no envía
+    token. Aplica la misma regla que los módulos de login y /me
+    (AuthService.get_user_modules), así que un usuario sin rol con módulos
+    asignados directo también pasa.
     """
     async def module_checker(
-        current_user: Usuario = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_principal),
         db: Session = Depends(get_db)
-    ) -> Usuario:
-        if current_user.rol is None:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Usuario sin rol asignado"
-            )
-        
-        # Verificar si el rol del usuario tiene acceso al módulo
-        module = db.query(Modulo).filter(
-            Modulo.codigo == module_code,
-            Modulo.activo == True
-        ).first()
+    ) -> Principal:
+        matriz = registro_permisos.actual()
+        if matriz is None:
+            matriz = await run_sync(registro_permisos.reconstruir, db)
         
-        if module is None:
+        nombre_modulo = matriz.modulos_activos.get(module_code)
+        if nombre_modulo is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Módulo '{module_code}' no encontrado"
             )
         
-        # Verificar si el módulo está en los permisos del rol
-        if module not in current_user.rol.modulos:
+        # Módulos del rol más los asignados directamente al usuario
+        if not matriz.tiene_acceso(current_user.rol, current_user.id, module_code):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"No tienes acceso al módulo '{module.nombre}'"
+                detail=f"No tienes acceso al módulo '{nombre_modulo}'"
             )
         
         return current_user
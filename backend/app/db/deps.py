@@ -15,13 +15,16 @@ def get_db() -> Generator[Session, None, None]:
 def get_marcas_db() -> Generator[Session, None, None]:
     """Dependencia para obtener sesión de BD de Marcas en cada petición."""
     logger.info("Creando sesión de Marcas DB...")
+    # Antes del try/finally: el engine se crea en el primer uso y puede fallar aquí,
+    # y en ese caso no hay sesión que cerrar
     try:
         db = MarcasSessionLocal()
-        logger.info(f"Sesión de Marcas creada: {db}")
-        yield db
     except Exception as e:
         logger.error(f"Error al crear sesión de Marcas: {type(e).__name__}: {str(e)}")
         raise
+    logger.info(f"Sesión de Marcas creada: {db}")
+    try:
+        yield db
     finally:
         db.close()
         logger.info("Sesión de Marcas cerrada")
\ No newline at end of file
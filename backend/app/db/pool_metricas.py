@@ -0,0 +1,184 @@
+"""
+Pool de conexiones instrumentado, para dimensionar los pools con carga real.
+
+`PoolInstrumentado` es un QueuePool que mide cuánto espera cada checkout por
+una conexión (incluye abrirla si hay que crear una de overflow) y cuenta los
+timeouts. También acumula lo que hace app.db.salud_conexiones: pings a
+conexiones inactivas, reaperturas en segundo plano y reintentos por
+desconexión. Cada engine registrado con `instrumentar`
+queda visible en /health/pools con su configuración, conexiones en uso,
+overflow actual, máximos observados y el histograma de espera.
+
+Si el p95 de espera crece o aparecen timeouts, el pool se queda corto para
+la concurrencia real (subir *_DB_POOL_SIZE o *_DB_MAX_OVERFLOW); si el máximo
+en uso nunca se acerca a pool_size, sobra.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# Límites superiores (ms) de los baldes del histograma de espera; el último es +inf
+BALDES_ESPERA_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class MetricasPool:
+    """Histograma de espera y contadores de un pool (acumulados desde el arranque)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baldes = [0] * (len(BALDES_ESPERA_MS) + 1)
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.timeouts = 0
+        self.max_en_uso = 0
+        self.max_overflow = 0
+        self.conexiones_abiertas = 0
+        self.invalidaciones = 0
+        self.validaciones = 0
+        self.validaciones_fallidas = 0
+        self.recicladas = 0
+        self.validaciones_omitidas = 0
+        self.reintentos = 0
+
+    def registrar_espera(self, segundos: float, en_uso: int, overflow: int) -> None:
+        with self._lock:
+            self._baldes[bisect_left(BALDES_ESPERA_MS, segundos * 1000)] += 1
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+            self.max_en_uso = max(self.max_en_uso, en_uso)
+            self.max_overflow = max(self.max_overflow, overflow)
+
+    def registrar_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_conexion(self) -> None:
+        with self._lock:
+            self.conexiones_abiertas += 1
+
+    def registrar_invalidacion(self) -> None:
+        with self._lock:
+            self.invalidaciones += 1
+
+    def registrar_validacion(self, validadas: int, fallidas: int, recicladas: int, omitidas: int) -> None:
+        with self._lock:
+            self.validaciones += validadas
+            self.validaciones_fallidas += fallidas
+            self.recicladas += recicladas
+            self.validaciones_omitidas += omitidas
+
+    def registrar_reintento(self) -> None:
+        with self._lock:
+            self.reintentos += 1
+
+    def _percentil_ms(self, p: float) -> Optional[float]:
+        """Límite superior del balde donde cae el percentil p (None si es +inf o no hay datos)."""
+        if not self.checkouts:
+            return None
+        objetivo = p / 100 * self.checkouts
+        acumulado = 0
+        for limite, cantidad in zip(BALDES_ESPERA_MS, self._baldes):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return limite
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            etiquetas: List[str] = [f"<={b}ms" for b in BALDES_ESPERA_MS] + [f">{BALDES_ESPERA_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": round(self.espera_total / self.checkouts * 1000, 2) if self.checkouts else None,
+                "espera_max_ms": round(self.espera_max * 1000, 1),
+                "espera_p50_ms": self._percentil_ms(50),
+                "espera_p95_ms": self._percentil_ms(95),
+                "espera_p99_ms": self._percentil_ms(99),
+                "histograma_espera": dict(zip(etiquetas, self._baldes)),
+                "max_en_uso": self.max_en_uso,
+                "max_overflow_usado": self.max_overflow,
+                "conexiones_abiertas": self.conexiones_abiertas,
+                "invalidaciones": self.invalidaciones,
+                "validaciones": self.validaciones,
+                "validaciones_fallidas": self.validaciones_fallidas,
+                "recicladas_en_segundo_plano": self.recicladas,
+                "validaciones_omitidas_por_reserva": self.validaciones_omitidas,
+                "reintentos_por_desconexion": self.reintentos,
+            }
+
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que registra la espera de cada checkout en `metricas`."""
+
+    metricas: Optional[MetricasPool] = None
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._midiendo = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get se llama a sí mismo al reintentar: se mide solo la llamada externa
+        if self.metricas is None or getattr(self._midiendo, "activo", False):
+            return super()._do_get()
+        self._midiendo.activo = True
+        inicio = time.perf_counter()
+        try:
+            registro = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar_timeout()
+            raise
+        finally:
+            self._midiendo.activo = False
+        self.metricas.registrar_espera(time.perf_counter() - inicio, self.checkedout(), max(self.overflow(), 0))
+        return registro
+
+    def recreate(self) -> "PoolInstrumentado":
+        # dispose() e invalidaciones masivas crean un pool nuevo: conserva las métricas
+        pool = super().recreate()
+        pool.metricas = self.metricas
+        return pool
+
+
+_pools: Dict[str, Engine] = {}
+
+
+def instrumentar(engine: Engine, nombre: str) -> Engine:
+    """Asocia métricas al pool del engine (creado con poolclass=PoolInstrumentado) y lo registra."""
+    metricas = MetricasPool()
+    engine.pool.metricas = metricas
+
+    @event.listens_for(engine, "connect")
+    def _conexion_abierta(dbapi_connection, connection_record):
+        metricas.registrar_conexion()
+
+    @event.listens_for(engine, "invalidate")
+    def _conexion_invalidada(dbapi_connection, connection_record, exception):
+        metricas.registrar_invalidacion()
+
+    _pools[nombre] = engine
+    return engine
+
+
+def estado_pools() -> Dict[str, Any]:
+    """Configuración, uso actual y métricas de cada pool registrado."""
+    estado = {}
+    for nombre, engine in _pools.items():
+        pool = engine.pool
+        estado[nombre] = {
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "recycle_seconds": pool._recycle,
+            "en_uso": pool.checkedout(),
+            "disponibles": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            **(pool.metricas.snapshot() if getattr(pool, "metricas", None) else {}),
+        }
+    return estado
@@ -0,0 +1,243 @@
+"""
+Salud de las conexiones a BD sin costo en el checkout.
+
+Con `pool_pre_ping=True` cada checkout hacía un `SELECT 1` antes de usar la
+conexión: un round trip completo por request hacia SQL Server. Aquí ese
+trabajo sale del camino del request:
+
+- `ValidadorConexiones` recorre en segundo plano las conexiones libres de
+  cada pool con checkouts normales (`pool.connect()` / `close()`), así que
+  pasan por los eventos del pool, sus métricas y la cuenta de overflow. Las
+  que llevan más de DB_VALIDACION_INACTIVIDAD_SECONDS sin uso reciben un
+  ping; si falla se invalidan y la pasada siguiente, que se pide de
+  inmediato, las reabre. Las que cumplieron *_DB_POOL_RECYCLE, o quedaron
+  viejas tras una invalidación del pool, las reabre el propio pool en ese
+  checkout. Nunca deja al pool sin DB_VALIDACION_RESERVA conexiones libres
+  (contando el overflow disponible), y el ping y la reapertura tienen
+  timeout, así un request no queda esperando detrás del validador. Si el
+  validador está apagado, los engines usan `pool_pre_ping`.
+- `SesionResiliente` cubre lo que el validador no alcanza a ver (una conexión
+  que se cae entre dos pasadas): si la primera sentencia de una transacción
+  falla por desconexión, descarta la conexión y la reintenta una vez con una
+  nueva. Después de la primera sentencia no se reintenta, porque se perdería
+  lo que la transacción ya hizo.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.logging_config import logger
+
+# Marcas en connection_record.info: última vez (epoch) que la conexión se usó
+# o validó, cuándo se abrió, y que el checkin en curso es del validador
+_ULTIMA_ACTIVIDAD = "ultima_actividad"
+_ABIERTA = "abierta"
+_CHECKIN_VALIDADOR = "checkin_validador"
+
+
+def marcar_actividad(connection_record: Any) -> None:
+    connection_record.info[_ULTIMA_ACTIVIDAD] = time.time()
+
+
+def _libres_sin_esperar(pool: QueuePool) -> float:
+    """Checkouts que el pool puede atender ahora sin esperar: conexiones en la cola más overflow disponible."""
+    if pool._max_overflow < 0:
+        return float("inf")
+    return pool.checkedin() + max(pool._max_overflow - max(pool.overflow(), 0), 0)
+
+
+def validar_pool(
+    engine: Engine,
+    inactividad_seconds: float,
+    reserva: int = 1,
+    ping_timeout: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Una pasada sobre las conexiones que están en el pool (no las prestadas).
+
+    Cada una se pide con un checkout y se devuelve con close(); la cola es
+    FIFO, así que tras recorrerla queda en el mismo orden. Solo se pide una
+    conexión si, sin ella, quedan al menos `reserva` checkouts que el pool
+    atiende sin esperar; si no (pool chico, o en uso y sin overflow), la
+    pasada se salta y esas conexiones quedan cubiertas por SesionResiliente.
+    Un checkout concurrente puede esperar solo si en esa misma ventana llegan
+    más requests que la reserva, y a lo más `ping_timeout` segundos.
+
+    Si el pool no logra reabrir una conexión (BD caída), el error sube y la
+    pasada termina ahí.
+    """
+    pool = engine.pool
+    resultado = {"validadas": 0, "fallidas": 0, "recicladas": 0, "omitidas": 0}
+    for _ in range(pool.checkedin()):
+        if _libres_sin_esperar(pool) - 1 < reserva:
+            resultado["omitidas"] += 1
+            continue
+        inicio = time.time()
+        conexion = pool.connect()
+        try:
+            _revisar_conexion(engine, conexion, inicio, inactividad_seconds, ping_timeout, resultado)
+        finally:
+            if conexion.is_valid:
+                # El checkin del validador no cuenta como uso
+                conexion.info[_CHECKIN_VALIDADOR] = True
+                conexion.close()
+    return resultado
+
+
+def _revisar_conexion(
+    engine: Engine,
+    conexion: Any,
+    inicio: float,
+    inactividad_seconds: float,
+    ping_timeout: Optional[int],
+    resultado: Dict[str, int]
+) -> None:
+    if conexion.info.get(_ABIERTA, 0) >= inicio:
+        # El checkout la reabrió (pool_recycle, invalidación previa o del pool)
+        resultado["recicladas"] += 1
+        marcar_actividad(conexion)
+        return
+    ultima = conexion.info.get(_ULTIMA_ACTIVIDAD, conexion.info.get(_ABIERTA, inicio))
+    if inicio - ultima < inactividad_seconds:
+        return
+    try:
+        _ping(engine, conexion.dbapi_connection, ping_timeout)
+        resultado["validadas"] += 1
+        marcar_actividad(conexion)
+    except Exception as e:
+        resultado["fallidas"] += 1
+        logger.warning(f"Conexión inactiva no respondió al ping, se reabre: {type(e).__name__}: {e}")
+        # La devuelve al pool sin conexión; la próxima pasada (o checkout) la reabre
+        conexion.invalidate(e)
+
+
+def _ping(engine: Engine, dbapi_connection: Any, timeout: Optional[int]) -> None:
+    """SELECT 1 con timeout de consulta (atributo `timeout` de pyodbc), restaurado al terminar."""
+    anterior = getattr(dbapi_connection, "timeout", None)
+    usar_timeout = timeout and anterior is not None
+    if usar_timeout:
+        dbapi_connection.timeout = timeout
+    try:
+        engine.dialect.do_ping(dbapi_connection)
+    finally:
+        if usar_timeout:
+            dbapi_connection.timeout = anterior
+
+
+class ValidadorConexiones:
+    """Hilo que valida y recicla cada `intervalo_seconds` las conexiones inactivas de los engines registrados."""
+
+    def __init__(
+        self,
+        intervalo_seconds: float,
+        inactividad_seconds: float,
+        reserva: int = 1,
+        ping_timeout: Optional[int] = None
+    ):
+        self.intervalo_seconds = intervalo_seconds
+        self.inactividad_seconds = inactividad_seconds
+        self.reserva = reserva
+        self.ping_timeout = ping_timeout
+        self._engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detenido = False
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def activo(self) -> bool:
+        return self.intervalo_seconds > 0
+
+    def registrar(self, engine: Engine, nombre: str) -> None:
+        """Marca apertura y actividad de cada conexión del engine, lo agrega y arranca el hilo si es el primero."""
+        if not self.activo:
+            return
+
+        @event.listens_for(engine, "connect")
+        def _conexion_abierta(dbapi_connection, connection_record):
+            connection_record.info[_ABIERTA] = time.time()
+
+        @event.listens_for(engine, "checkin")
+        def _conexion_devuelta(dbapi_connection, connection_record):
+            if not connection_record.info.pop(_CHECKIN_VALIDADOR, False):
+                marcar_actividad(connection_record)
+
+        with self._lock:
+            self._engines[nombre] = engine
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detenido = False
+                self._hilo = threading.Thread(target=self._ciclo, name="validador-conexiones", daemon=True)
+                self._hilo.start()
+
+    def solicitar_pasada(self) -> None:
+        """Adelanta la próxima pasada (ej: tras una desconexión, para reabrir las demás conexiones)."""
+        self._despertar.set()
+
+    def detener(self) -> None:
+        self._detenido = True
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+
+    def _ciclo(self) -> None:
+        while True:
+            self._despertar.wait(self.intervalo_seconds)
+            self._despertar.clear()
+            if self._detenido:
+                return
+            self.validar()
+
+    def validar(self) -> None:
+        """Una pasada sobre todos los pools registrados."""
+        with self._lock:
+            engines: List[Engine] = list(self._engines.values())
+        for engine in engines:
+            try:
+                resultado = validar_pool(engine, self.inactividad_seconds, self.reserva, self.ping_timeout)
+            except Exception as e:
+                logger.error(f"Error validando conexiones del pool: {type(e).__name__}: {e}")
+                continue
+            metricas = getattr(engine.pool, "metricas", None)
+            if metricas is not None:
+                metricas.registrar_validacion(**resultado)
+            if resultado["fallidas"]:
+                # Reabrir ya las que no respondieron, sin esperar el intervalo
+                self.solicitar_pasada()
+
+
+validador_conexiones = ValidadorConexiones(
+    settings.DB_VALIDACION_INTERVALO_SECONDS,
+    settings.DB_VALIDACION_INACTIVIDAD_SECONDS,
+    settings.DB_VALIDACION_RESERVA,
+    settings.DB_VALIDACION_PING_TIMEOUT_SECONDS,
+)
+
+
+def es_desconexion(error: BaseException) -> bool:
+    return isinstance(error, exc.DBAPIError) and error.connection_invalidated
+
+
+class SesionResiliente(Session):
+    """Session que reintenta una vez la primera sentencia de una transacción si la conexión estaba caída."""
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        # Solo es seguro reintentar si no hay nada hecho en la transacción
+        puede_reintentar = not self.in_transaction() and not (self.new or self.dirty or self.deleted)
+        try:
+            return super().execute(*args, **kwargs)
+        except exc.DBAPIError as e:
+            if not (puede_reintentar and es_desconexion(e)):
+                raise
+            self.rollback()
+            metricas = getattr(self.get_bind().pool, "metricas", None)
+            if metricas is not None:
+                metricas.registrar_reintento()
+            logger.warning(f"Conexión caída en la primera sentencia, se reintenta: {type(e.orig).__name__}")
+            validador_conexiones.solicitar_pasada()
+            return super().execute(*args, **kwargs)
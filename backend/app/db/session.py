@@ -1,14 +1,68 @@
+import threading
+from typing import Any, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import get_database_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings, get_database_url
+from app.core.logging_config import logger
+from app.db.pool_metricas import PoolInstrumentado, instrumentar
+from app.db.salud_conexiones import SesionResiliente, validador_conexiones
+
+# El engine se crea recién en el primer uso, no al importar: así el worker
+# arranca (y responde /health) aunque la BD no esté disponible.
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Engine de la BD de Licencias (lo crea la primera vez)."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                # Creamos el motor de base de datos
+                # Sin pre-ping: las conexiones inactivas se validan en segundo
+                # plano (app.db.salud_conexiones); solo si eso está apagado se
+                # vuelve al SELECT 1 en cada checkout
+                # El tamaño del pool se ajusta con DB_POOL_* mirando /health/pools
+                engine = create_engine(
+                    get_database_url(),
+                    pool_pre_ping=not validador_conexiones.activo,
+                    poolclass=PoolInstrumentado,
+                    pool_size=settings.DB_POOL_SIZE,
+                    max_overflow=settings.DB_MAX_OVERFLOW,
+                    pool_timeout=settings.DB_POOL_TIMEOUT,
+                    pool_recycle=settings.DB_POOL_RECYCLE,
+                    # Timeout de login de pyodbc: una reapertura nunca cuelga indefinidamente
+                    connect_args={"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS},
+                )
+                instrumentar(engine, "licencias")
+                validador_conexiones.registrar(engine, "licencias")
+                # Creamos la fábrica de sesiones
+                # autocommit=False: Para tener control total de cuándo guardar los cambios
+                # SesionResiliente: reintenta una vez si la conexión estaba caída
+                _session_factory = sessionmaker(
+                    class_=SesionResiliente, autocommit=False, autoflush=False, bind=engine
+                )
+                _engine = engine
+                logger.info("Engine de Licencias creado")
+    return _engine
+
+
+def SessionLocal(**kwargs: Any) -> Session:
+    """Sesión nueva de la BD de Licencias."""
+    get_engine()
+    return _session_factory(**kwargs)
+
 
-# Obtenemos la URL construida en config.py
-SQLALCHEMY_DATABASE_URL = get_database_url()
+def engine_creado() -> bool:
+    return _engine is not None
 
-# Creamos el motor de base de datos
-# pool_pre_ping=True ayuda a reconectar si la conexión se cae
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
 
-# Creamos la fábrica de sesiones
-# autocommit=False: Para tener control total de cuándo guardar los cambios
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+def __getattr__(nombre: str) -> Any:
+    # Compatibilidad con `from app.db.session import engine` (scripts)
+    if nombre == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
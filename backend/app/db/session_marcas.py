@@ -1,24 +1,67 @@
+import threading
+from typing import Any, Optional
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import get_marcas_database_url
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings, get_marcas_database_url
 from app.core.logging_config import logger
+from app.db.pool_metricas import PoolInstrumentado, instrumentar
+from app.db.salud_conexiones import SesionResiliente, validador_conexiones
+
+# Igual que app.db.session: el engine se crea en el primer uso
+_marcas_engine: Optional[Engine] = None
+_marcas_session_factory: Optional[sessionmaker] = None
+_lock = threading.Lock()
+
+
+def get_marcas_engine() -> Engine:
+    """Engine de la BD de Marcas (lo crea la primera vez)."""
+    global _marcas_engine, _marcas_session_factory
+    if _marcas_engine is None:
+        with _lock:
+            if _marcas_engine is None:
+                url = get_marcas_database_url()
+                # Log de la URL (ocultando password)
+                logger.info(f"URL de conexión Marcas: {make_url(url).render_as_string(hide_password=True)}")
+                try:
+                    # Motor de base de datos para Marcas
+                    engine = create_engine(
+                        url,
+                        pool_pre_ping=not validador_conexiones.activo,
+                        poolclass=PoolInstrumentado,
+                        pool_size=settings.MARCAS_DB_POOL_SIZE,
+                        max_overflow=settings.MARCAS_DB_MAX_OVERFLOW,
+                        pool_timeout=settings.MARCAS_DB_POOL_TIMEOUT,
+                        pool_recycle=settings.MARCAS_DB_POOL_RECYCLE,
+                        connect_args={"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS},
+                    )
+                    instrumentar(engine, "marcas")
+                    validador_conexiones.registrar(engine, "marcas")
+                    # Fábrica de sesiones para Marcas
+                    _marcas_session_factory = sessionmaker(
+                        class_=SesionResiliente, autocommit=False, autoflush=False, bind=engine
+                    )
+                    _marcas_engine = engine
+                    logger.info("Engine de Marcas creado correctamente")
+                except Exception as e:
+                    logger.error(f"Error al crear engine de Marcas: {type(e).__name__}: {str(e)}")
+                    raise
+    return _marcas_engine
+
+
+def MarcasSessionLocal(**kwargs: Any) -> Session:
+    """Sesión nueva de la BD de Marcas."""
+    get_marcas_engine()
+    return _marcas_session_factory(**kwargs)
+
+
+def engine_creado() -> bool:
+    return _marcas_engine is not None
 
-# Obtenemos la URL de la BD de Marcas
-MARCAS_DATABASE_URL = get_marcas_database_url()
-
-# Log de la URL (ocultando password)
-url_safe = MARCAS_DATABASE_URL.replace(MARCAS_DATABASE_URL.split(':')[2].split('@')[0], '****')
-logger.info(f"URL de conexión Marcas: {url_safe}")
-
-try:
-    # Motor de base de datos para Marcas
-    marcas_engine = create_engine(MARCAS_DATABASE_URL, pool_pre_ping=True)
-    logger.info("Engine de Marcas creado correctamente")
-    
-    # Fábrica de sesiones para Marcas
-    MarcasSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=marcas_engine)
-    logger.info("SessionLocal de Marcas creado correctamente")
-except Exception as e:
-    logger.error(f"Error al crear engine de Marcas: {type(e).__name__}: {str(e)}")
-    raise
 
+def __getattr__(nombre: str) -> Any:
+    # Compatibilidad con `from app.db.session_marcas import marcas_engine`
+    if nombre == "marcas_engine":
+        return get_marcas_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
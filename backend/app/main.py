@@ -1,23 +1,63 @@
+import time
+from contextlib import asynccontextmanager
+
+# Perfil de arranque: desde aquí se mide cuánto tarda importar la app
+_inicio_import = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware 
 from app.core.config import settings
 from app.core.exceptions import generic_exception_handler
 from app.core.logging_config import logger
-from app.db.session import engine
-from app.db.base import Base
 from app.api.v1.api import api_router
+from app.core.buk_client import buk_client
+from app.core.calculadora_parametros import registro_parametros, RUTA_POR_DEFECTO
+from app.core.revocacion import lista_revocacion
+from app.core.concurrency import shutdown_process_pool
+from app.db.salud_conexiones import validador_conexiones
+from app.services.simulacion_dotacion_service import simulacion_dotacion_service
 
 logger.info("Iniciando Dashboard Licencias API")
 
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Conexión a BD establecida")
-except Exception as e:
-    logger.warning(f"No se pudo conectar a la BD: {e}")
+# Las tablas no se crean al importar: los engines se abren en el primer uso
+# y el esquema se crea con `python init_db.py`. Así el worker arranca y
+# responde /health aunque una BD no esté disponible.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque y apagado del worker, en un solo lugar y en orden.
+
+    Al apagar, primero se cancelan las simulaciones (usan BUK, el pool de
+    procesos y la BD) y recién después se cierran esos recursos; el
+    validador de conexiones se detiene al final, cuando ya nadie usa los pools.
+    """
+    inicio_startup = time.perf_counter()
+    registro_parametros.iniciar_vigilancia(
+        settings.CALCULADORA_PARAMETROS_PATH or RUTA_POR_DEFECTO,
+        settings.CALCULADORA_PARAMETROS_POLL_SECONDS
+    )
+    lista_revocacion.iniciar_recarga()
+    perfil = app.state.perfil_arranque
+    perfil["startup_ms"] = round((time.perf_counter() - inicio_startup) * 1000, 1)
+    logger.info(f"Arranque: import {perfil['import_ms']} ms, startup {perfil['startup_ms']} ms")
+    try:
+        yield
+    finally:
+        try:
+            await simulacion_dotacion_service.cancelar_todas()
+        finally:
+            shutdown_process_pool()
+            await buk_client.aclose()
+            registro_parametros.detener_vigilancia()
+            lista_revocacion.detener_recarga()
+            validador_conexiones.detener()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Handler global de excepciones
@@ -36,6 +76,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -43,4 +84,6 @@ def root():
     return {"mensaje": "Bienvenido al Dashboard de Licencias API"}
 
 # Incluir todas las rutas definidas en api/v1
-app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(api_router, prefix="/api/v1")
+
+app.state.perfil_arranque = {"import_ms": round((time.perf_counter() - _inicio_import) * 1000, 1)}
\ No newline at end of file
@@ -1,11 +1,34 @@
 """
 Repositorio para operaciones de base de datos relacionadas con autenticación.
 """
-from typing import Optional, List
-from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, Iterable, Optional, List, Tuple
+from sqlalchemy import and_, delete, func, insert, or_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from datetime import datetime
 
-from app.models.auth import Usuario, Role, Modulo
+from app.models.auth import Usuario, Role, Modulo, usuario_modulos
+
+# created_at admite NULL: se ordena y compara como esta fecha, para que un
+# cursor que cae en un usuario sin fecha no termine en `created_at < NULL`
+FECHA_NULA_ORDEN = datetime(1900, 1, 1)
+
+# Columnas por las que se puede ordenar el listado (id desempata)
+COLUMNAS_ORDEN_USUARIOS = {
+    "username": Usuario.username,
+    "id": Usuario.id,
+    "created_at": func.coalesce(Usuario.created_at, FECHA_NULA_ORDEN),
+}
+
+
+def valor_orden_usuario(user: Usuario, orden: str) -> Any:
+    """Valor de `user` en la columna de orden, tal como lo compara get_users_page."""
+    valor = getattr(user, orden)
+    if orden == "created_at" and valor is None:
+        return FECHA_NULA_ORDEN
+    return valor
+
+# SQL Server acepta hasta 2100 parámetros por sentencia
+TAMANO_LOTE_IN = 1000
 
 
 class AuthRepository:
@@ -47,6 +70,56 @@ class AuthRepository:
             .all()
         )
     
+    def get_users_page(
+        self,
+        orden: str = "username",
+        descendente: bool = False,
+        busqueda: Optional[str] = None,
+        activo: Optional[bool] = None,
+        despues_de: Optional[Tuple[Any, int]] = None,
+        limite: Optional[int] = None
+    ) -> List[Usuario]:
+        """
+        Página de usuarios con rol, módulos del rol y módulos directos.
+        
+        Paginación por keyset: `despues_de` es (valor de la columna de orden, id)
+        del último usuario de la página anterior. Son siempre cuatro queries
+        (usuarios + tres selectinload), sin importar cuántos usuarios traiga.
+        """
+        columna = COLUMNAS_ORDEN_USUARIOS[orden]
+        query = self.db.query(Usuario).options(
+            selectinload(Usuario.rol).selectinload(Role.modulos),
+            selectinload(Usuario.modulos)
+        )
+        
+        if busqueda:
+            patron = busqueda.lower()
+            query = query.filter(or_(
+                func.lower(Usuario.username).contains(patron, autoescape=True),
+                func.lower(Usuario.nombre_completo).contains(patron, autoescape=True),
+                func.lower(Usuario.email).contains(patron, autoescape=True),
+            ))
+        if activo is not None:
+            query = query.filter(Usuario.activo == activo)
+        
+        if despues_de is not None:
+            valor, ultimo_id = despues_de
+            if columna is Usuario.id:
+                query = query.filter(Usuario.id < ultimo_id if descendente else Usuario.id > ultimo_id)
+            elif descendente:
+                query = query.filter(or_(columna < valor, and_(columna == valor, Usuario.id < ultimo_id)))
+            else:
+                query = query.filter(or_(columna > valor, and_(columna == valor, Usuario.id > ultimo_id)))
+        
+        if descendente:
+            query = query.order_by(columna.desc(), Usuario.id.desc())
+        else:
+            query = query.order_by(columna, Usuario.id)
+        
+        if limite is not None:
+            query = query.limit(limite)
+        return query.all()
+    
     def create_user( self, username: str, password_hash: str, rol_id: int, 
         email: Optional[str] = None, nombre_completo: Optional[str] = None ) -> Usuario:
         """Crea un nuevo usuario."""
@@ -83,6 +156,43 @@ class AuthRepository:
         self.db.refresh(user)
         return user
     
+    # === Operaciones masivas (no hacen commit: las confirma el servicio) ===
+    
+    def get_user_ids_by_usernames(self, usernames: Iterable[str]) -> Dict[str, int]:
+        """username -> id de los que existen, con un IN por lote."""
+        usernames = list(usernames)
+        ids: Dict[str, int] = {}
+        for i in range(0, len(usernames), TAMANO_LOTE_IN):
+            lote = usernames[i:i + TAMANO_LOTE_IN]
+            ids.update(self.db.query(Usuario.username, Usuario.id).filter(Usuario.username.in_(lote)))
+        return ids
+    
+    def bulk_insert_users(self, filas: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Inserta usuarios en lote y retorna username -> id de los insertados."""
+        if not filas:
+            return {}
+        self.db.execute(insert(Usuario), filas)
+        return self.get_user_ids_by_usernames(f["username"] for f in filas)
+    
+    def bulk_update_users(self, filas: List[Dict[str, Any]]) -> None:
+        """Actualiza usuarios en lote por id (cada dict trae `id` y los campos a cambiar)."""
+        if filas:
+            self.db.execute(update(Usuario), filas)
+    
+    def replace_users_modules(self, modulos_por_usuario: Dict[int, List[int]]) -> None:
+        """Reemplaza los módulos directos de varios usuarios (un DELETE y un INSERT por lote)."""
+        usuario_ids = list(modulos_por_usuario)
+        for i in range(0, len(usuario_ids), TAMANO_LOTE_IN):
+            lote = usuario_ids[i:i + TAMANO_LOTE_IN]
+            self.db.execute(delete(usuario_modulos).where(usuario_modulos.c.usuario_id.in_(lote)))
+        filas = [
+            {"usuario_id": usuario_id, "modulo_id": modulo_id}
+            for usuario_id, modulo_ids in modulos_por_usuario.items()
+            for modulo_id in set(modulo_ids)
+        ]
+        if filas:
+            self.db.execute(insert(usuario_modulos), filas)
+    
     def set_user_modules(self, user: Usuario, modulo_ids: List[int]) -> None:
         """Asigna módulos específicos a un usuario."""
         modules = self.db.query(Modulo).filter(Modulo.id.in_(modulo_ids)).all()
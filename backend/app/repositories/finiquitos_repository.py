@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List, Optional, Dict, Any
+from sqlalchemy import text, bindparam
+from typing import List, Optional, Dict, Any, Iterator
 from app.models.finiquito import Finiquito
 from app.schemas.finiquitos import FiniquitoCreate
 
@@ -92,6 +92,165 @@ class FiniquitosRepository:
         columns = result.keys()
         return [dict(zip(columns, row)) for row in result.fetchall()]
 
+    def iter_items_cinco_meses(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los items de los últimos 5 periodos de todos los trabajadores activos.
+        
+        Las filas se leen por bloques desde el cursor (stream_results + yield_per),
+        ordenadas por trabajador y periodo, sin cargar todo el resultado en memoria.
+        """
+        query = text("""
+            WITH DatosRankeados AS (
+                SELECT 
+                    e.full_name AS nombre_trabajador,
+                    e.rut AS rut_trabajador,
+                    e.name_role AS cargo,
+                    e.status,
+                    e.active_since AS fecha_ingreso,
+                    e.area_id AS cod_area,
+                    a.first_level_name AS nombre_empresa,
+                    a.second_level_name AS nombre_area, 
+                    s.Periodo AS periodo,
+                    s.Liquidacion_ID AS liquidacion_id,
+                    si.name AS concepto,
+                    si.income_type,
+                    si.amount AS monto, -- TODO: si.amount está encriptado
+
+                DENSE_RANK() OVER (
+                        PARTITION BY e.rut 
+                        ORDER BY RIGHT(s.Periodo, 4) DESC, LEFT(s.Periodo, 2) DESC
+                        ) AS RankingPeriodo
+
+                FROM [dbo].[employees] AS e
+                LEFT JOIN [dbo].[historical_settlements] AS s ON e.rut = s.RUT
+                LEFT JOIN [dbo].[historical_settlement_items] AS si ON s.Liquidacion_ID = si.Liquidacion_ID
+                LEFT JOIN [dbo].[areas] AS a ON a.id = e.area_id
+            
+                WHERE 
+                e.status = 'activo'
+                )
+
+            SELECT 
+                nombre_trabajador,
+                rut_trabajador,
+                cargo,
+                fecha_ingreso,
+                status,
+                cod_area,
+                nombre_empresa,
+                nombre_area,
+                RankingPeriodo AS ranking_periodo,
+                periodo,
+                liquidacion_id,
+                income_type,
+                concepto,
+                monto
+            FROM DatosRankeados
+            WHERE RankingPeriodo <= 5
+            ORDER BY 
+            rut_trabajador, RankingPeriodo ASC, concepto;
+        """)
+        result = self.db.execute(
+            query, 
+            execution_options={"stream_results": True, "yield_per": batch_size}
+        )
+        try:
+            for row in result:
+                yield dict(row._mapping)
+        finally:
+            result.close()
+
+    def count_activos_by_area(self, cod_area: int) -> int:
+        """Cantidad de trabajadores activos de un área."""
+        query = text("""
+            SELECT COUNT(*)
+            FROM [dbo].[employees] AS e
+            WHERE e.status = 'activo' AND e.area_id = :cod_area
+        """)
+        return self.db.execute(query, {"cod_area": cod_area}).scalar() or 0
+
+    def get_datos_calculo_finiquito(
+        self,
+        ruts: Optional[List[str]] = None,
+        cod_area: Optional[int] = None,
+        income_types: Optional[List[str]] = None,
+        conceptos: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Datos para calcular finiquitos de varios trabajadores en una consulta.
+        
+        Trae una fila por item de los últimos 5 periodos que sea de alguno de
+        los `income_types` o `conceptos` indicados; un trabajador sin items
+        aparece igual, con concepto NULL. Se filtra por lista de RUTs o por área.
+        """
+        if ruts:
+            filtro = "e.rut IN :ruts"
+        elif cod_area is not None:
+            filtro = "e.area_id = :cod_area"
+        else:
+            return []
+        query = text(f"""
+            WITH DatosRankeados AS (
+                SELECT 
+                    e.full_name AS nombre_trabajador,
+                    e.rut AS rut_trabajador,
+                    e.active_since AS fecha_ingreso,
+                    e.area_id AS cod_area,
+                    a.second_level_name AS nombre_area, 
+                    s.Periodo AS periodo,
+                    si.name AS concepto,
+                    si.income_type,
+                    si.amount AS monto,
+
+                DENSE_RANK() OVER (
+                        PARTITION BY e.rut 
+                        ORDER BY RIGHT(s.Periodo, 4) DESC, LEFT(s.Periodo, 2) DESC
+                        ) AS RankingPeriodo
+
+                FROM [dbo].[employees] AS e
+                LEFT JOIN [dbo].[historical_settlements] AS s ON e.rut = s.RUT
+                LEFT JOIN [dbo].[historical_settlement_items] AS si 
+                    ON s.Liquidacion_ID = si.Liquidacion_ID
+                    AND (si.income_type IN :income_types OR si.name IN :conceptos)
+                LEFT JOIN [dbo].[areas] AS a ON a.id = e.area_id
+            
+                WHERE 
+                e.status = 'activo'
+                AND {filtro}
+                )
+
+            SELECT 
+                rut_trabajador,
+                nombre_trabajador,
+                fecha_ingreso,
+                cod_area,
+                nombre_area,
+                RankingPeriodo AS ranking_periodo,
+                periodo,
+                income_type,
+                concepto,
+                monto
+            FROM DatosRankeados
+            WHERE RankingPeriodo <= 5
+            ORDER BY 
+            rut_trabajador, RankingPeriodo ASC, concepto;
+        """).bindparams(
+            bindparam("income_types", expanding=True),
+            bindparam("conceptos", expanding=True),
+        )
+        params: Dict[str, Any] = {
+            "income_types": income_types or [""],
+            "conceptos": conceptos or [""],
+        }
+        if ruts:
+            query = query.bindparams(bindparam("ruts", expanding=True))
+            params["ruts"] = ruts
+        else:
+            params["cod_area"] = cod_area
+        result = self.db.execute(query, params)
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+
     def get_descuentos_by_rut(self, rut: str) -> List[Finiquito]:
         """Obtiene los descuentos de finiquito filtrados por concepto"""
         query = text("""
@@ -2,7 +2,7 @@
 Schemas Pydantic para autenticación y gestión de usuarios.
 """
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 
@@ -106,6 +106,49 @@ class UsuarioResponse(UsuarioBase):
         from_attributes = True
 
 
+class UsuarioListItem(UsuarioResponse):
+    """Usuario del listado de administración"""
+    modulos_efectivos: List[str] = []  # Códigos activos del rol + directos
+
+
+class UsuarioImportacionFila(BaseModel):
+    """
+    Fila de una importación masiva. Si el usuario ya existe, los campos en None
+    no se modifican; `modulos` reemplaza sus módulos directos.
+    """
+    username: str
+    password: Optional[str] = None  # Obligatorio solo para usuarios nuevos
+    email: Optional[str] = None
+    nombre_completo: Optional[str] = None
+    rol: Optional[str] = None  # Nombre del rol; obligatorio para usuarios nuevos
+    modulos: Optional[List[str]] = None  # Códigos de módulos directos
+    activo: Optional[bool] = None
+
+
+class UsuarioImportacionRequest(BaseModel):
+    """Request de importación masiva de usuarios"""
+    usuarios: List[UsuarioImportacionFila]
+    actualizar_existentes: bool = True  # False: un username existente es error
+
+
+class UsuarioImportacionResultado(BaseModel):
+    """Resultado de una fila de la importación"""
+    fila: int  # 1 = primera fila de datos
+    username: Optional[str] = None
+    estado: Literal["creado", "actualizado", "error"]
+    error: Optional[str] = None
+
+
+class UsuarioImportacionResponse(BaseModel):
+    """Respuesta de la importación masiva"""
+    total: int
+    creados: int
+    actualizados: int
+    errores: int
+    duracion_ms: float
+    resultados: List[UsuarioImportacionResultado] = []
+
+
 class UsuarioWithModules(UsuarioResponse):
     """Usuario con sus módulos permitidos"""
     modulos: List[ModuloResponse] = []
@@ -2,6 +2,7 @@
 Schemas Pydantic para la calculadora de sueldos.
 """
 from pydantic import BaseModel, Field
+from datetime import date, datetime
 from typing import List, Optional, Literal
 
 class BonoInput(BaseModel):
@@ -61,6 +62,98 @@ class SimulacionResponse(BaseModel):
     total_descuentos: int
     detalle: dict
 
+class CalculoLoteRequest(BaseModel):
+    """Request para calcular muchos sueldos base en una sola llamada"""
+    items: List[CalculoRequest]
+
+class CalculoLoteResponse(BaseModel):
+    """Resultados del cálculo por lote, en el mismo orden de la request"""
+    total: int
+    duracion_ms: float
+    resultados: List[CalculoResponse] = []
+
+class SimulacionLoteRequest(BaseModel):
+    """Request para simular muchos líquidos en una sola llamada"""
+    items: List[SimulacionRequest]
+
+class SimulacionLoteResponse(BaseModel):
+    """Resultados de la simulación por lote, en el mismo orden de la request"""
+    total: int
+    duracion_ms: float
+    resultados: List[SimulacionResponse] = []
+
+class CurvaRequest(BaseModel):
+    """Request para barrer un rango de sueldos base con los mismos parámetros"""
+    base_desde: int = Field(default=0, ge=0)
+    base_hasta: int = Field(gt=0)
+    paso: int = Field(default=10000, gt=0)
+    movilizacion: int = Field(default=40000, ge=0)
+    afp_nombre: str = Field(default="Uno")
+    salud_sistema: Literal["fonasa", "isapre"] = "fonasa"
+    salud_uf: float = Field(default=0.0, ge=0)
+    bonos: List[BonoInput] = []
+
+class CurvaResponse(BaseModel):
+    """Curva en formato columnar: el índice i de cada lista es el mismo punto"""
+    sueldo_base: List[int]
+    sueldo_liquido: List[int]
+    impuesto: List[int]
+    cotizacion_previsional: List[int]
+    cotizacion_salud: List[int]
+    cesantia: List[int]
+    tasa_marginal: List[float] = Field(description="Fracción de $1 adicional de sueldo base que no llega al líquido")
+
+class CompararRequest(BaseModel):
+    """Request para comparar un líquido objetivo en todas las AFP y planes de salud"""
+    sueldo_liquido: int = Field(gt=0, description="Sueldo líquido objetivo")
+    movilizacion: int = Field(default=40000, ge=0)
+    bonos: List[BonoInput] = []
+    afps: Optional[List[str]] = Field(default=None, description="AFPs a comparar; todas si se omite")
+    incluir_fonasa: bool = True
+    planes_isapre_uf: Optional[List[float]] = Field(
+        default=None, max_length=20, description="Planes isapre en UF; el plan por defecto si se omite"
+    )
+
+class OpcionSalud(BaseModel):
+    """Columna de la matriz de comparación"""
+    sistema: Literal["fonasa", "isapre"]
+    plan_uf: float = 0.0
+
+class CompararResponse(BaseModel):
+    """Matrices AFP x salud: valor[i][j] corresponde a afps[i] y salud[j]"""
+    sueldo_liquido_objetivo: int
+    afps: List[str]
+    salud: List[OpcionSalud]
+    sueldo_base: List[List[int]]
+    sueldo_liquido: List[List[int]]
+    cotizacion_previsional: List[List[int]]
+    cotizacion_salud: List[List[int]]
+    impuesto: List[List[int]]
+
+class SimulacionDotacionRequest(BaseModel):
+    """Escenario para proyectar líquido y costo empleador de toda la dotación activa"""
+    fecha: Optional[date] = Field(default=None, description="Parámetros vigentes a esta fecha; hoy si se omite")
+    valor_uf: Optional[float] = Field(default=None, gt=0, description="UF what-if; la vigente si se omite")
+    sueldo_minimo: Optional[int] = Field(default=None, gt=0, description="Sueldo mínimo what-if")
+    afp_nombre: str = Field(default="Uno", description="AFP asumida para todos los trabajadores")
+    salud_sistema: Literal["fonasa", "isapre"] = "fonasa"
+    salud_uf: float = Field(default=0.0, ge=0)
+
+class SimulacionDotacionEstado(BaseModel):
+    """Estado y progreso de una simulación de dotación"""
+    id: str
+    estado: Literal["pendiente", "ejecutando", "completada", "cancelada", "error"]
+    fase: Optional[str] = None
+    total: int = 0
+    procesados: int = Field(default=0, description="Trabajadores simulados (sin contar los con error)")
+    errores: int = Field(default=0, description="Trabajadores sin sueldo base en BUK")
+    porcentaje: float = Field(default=0.0, description="Avance: simulados más con error, sobre el total")
+    creada: datetime
+    terminada: Optional[datetime] = None
+    escenario: SimulacionDotacionRequest
+    resumen: Optional[dict] = None
+    error: Optional[str] = None
+
 class ParametrosResponse(BaseModel):
     """Parámetros actuales del sistema"""
     valor_uf: float
@@ -69,4 +162,6 @@ class ParametrosResponse(BaseModel):
     tope_imponible_cesantia_uf: float
     default_plan_isapre_uf: float
     afps: dict
-    tramos_impuesto: list
\ No newline at end of file
+    tramos_impuesto: list
+    vigente_desde: Optional[date] = None  # None = valores por defecto sin fecha
+    version: int = 0  # Se incrementa al recargar el archivo de parámetros
\ No newline at end of file
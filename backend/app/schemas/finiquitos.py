@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import date
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict, Literal
 
 # Base: Propiedades compartidas al crear y leer
 class FiniquitoBase(BaseModel):
@@ -109,4 +109,116 @@ class EmployeeSueldoResponse(BaseModel):
     base_wage: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# ============================================
+# Schemas para consulta masiva de vacaciones
+# ============================================
+
+class VacacionesLoteRequest(BaseModel):
+    """Request para consultar vacaciones disponibles de varios trabajadores."""
+    ruts: List[str]
+    date: Optional[str] = None
+
+class VacacionesLoteItem(BaseModel):
+    """Resultado individual de la consulta masiva (éxito o error)."""
+    rut: str
+    ok: bool
+    data: Optional[VacacionesDisponiblesResponse] = None
+    error: Optional[str] = None
+
+class VacacionesLoteResponse(BaseModel):
+    """Respuesta de la consulta masiva de vacaciones."""
+    total: int
+    exitosos: int
+    fallidos: int
+    duracion_ms: float
+    resultados: List[VacacionesLoteItem] = []
+
+
+# ============================================
+# Schemas para datos completos de finiquito
+# ============================================
+
+class FuenteEstado(BaseModel):
+    """Resultado de consultar una fuente de datos (BD o BUK)."""
+    ok: bool
+    duracion_ms: float
+    error: Optional[str] = None
+
+class FiniquitoCompletoResponse(BaseModel):
+    """Datos necesarios para armar un finiquito, obtenidos en una sola petición."""
+    rut: str
+    items: List[FiniquitoItemResponse] = []
+    sueldo: Optional[EmployeeSueldoResponse] = None
+    vacaciones: Optional[VacacionesDisponiblesResponse] = None
+    descuentos: List[FiniquitoItemResponse] = []
+    fuentes: Dict[str, FuenteEstado] = {}
+    duracion_total_ms: float
+
+
+# ============================================
+# Schemas para cálculo de finiquitos
+# ============================================
+
+CausalTermino = Literal["necesidades_empresa", "mutuo_acuerdo", "no_concurrencia", "renuncia"]
+
+class FiniquitoEscenario(BaseModel):
+    """Supuestos del término de contrato, comunes a uno o varios trabajadores."""
+    fecha_termino: date
+    causal: CausalTermino = "necesidades_empresa"
+    aviso_dado: bool = Field(default=False, description="Si se dio aviso con 30 días; si no, se paga mes de aviso")
+    movilizacion: int = Field(default=40000, ge=0)
+    incluir_descuentos: bool = Field(default=True, description="Descontar préstamos y descuentos por planilla de BUK")
+
+class FiniquitoCalculoRequest(FiniquitoEscenario):
+    """Request para calcular el finiquito de un trabajador."""
+    rut: str
+
+class FiniquitoCalculoLoteRequest(FiniquitoEscenario):
+    """Request para calcular finiquitos de una lista de RUTs o de un área completa."""
+    ruts: List[str] = []
+    cod_area: Optional[int] = None
+
+    @model_validator(mode="after")
+    def un_filtro(self):
+        if bool(self.ruts) == (self.cod_area is not None):
+            raise ValueError("Indique 'ruts' o 'cod_area' (solo uno)")
+        return self
+
+class FiniquitoCalculoResultado(BaseModel):
+    """Finiquito calculado de un trabajador (o el error que lo impidió)."""
+    rut: str
+    ok: bool
+    error: Optional[str] = None
+    advertencias: List[str] = []
+    nombre_trabajador: Optional[str] = None
+    fecha_ingreso: Optional[date] = None
+    cod_area: Optional[int] = None
+    nombre_area: Optional[str] = None
+    # Bases de cálculo
+    sueldo_base: int = 0
+    fuente_sueldo: Optional[Literal["buk", "liquidacion"]] = None
+    promedio_variable: int = 0
+    gratificacion: int = 0
+    total_haberes: int = 0
+    anios_servicio: float = 0
+    anios_indemnizacion: float = 0
+    dias_vacaciones: float = 0
+    dias_corridos: float = 0
+    # Montos
+    indemnizacion_anios: int = 0
+    mes_aviso: int = 0
+    vacaciones_proporcionales: int = 0
+    descuentos: int = 0
+    total_finiquito: int = 0
+
+class FiniquitoCalculoLoteResponse(BaseModel):
+    """Respuesta del cálculo masivo de finiquitos."""
+    total: int
+    exitosos: int
+    fallidos: int
+    total_finiquitos: int = Field(description="Suma de total_finiquito de los cálculos exitosos")
+    duracion_ms: float
+    duracion_calculo_ms: float
+    resultados: List[FiniquitoCalculoResultado] = []
@@ -1,28 +1,69 @@
 """
 Servicio de autenticación y gestión de usuarios.
 """
-from typing import Optional, List
+import base64
+import json
+from datetime import datetime
+from typing import Optional, List, Tuple
 from sqlalchemy.orm import Session
 
-from app.repositories.auth_repository import AuthRepository
+from app.repositories.auth_repository import AuthRepository, valor_orden_usuario
 from app.models.auth import Usuario, Modulo
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password, verify_password_async, get_password_hash, create_access_token
+from app.core.concurrency import run_sync
+from app.core.principal import cache_principales
+from app.core.permisos import registro_permisos
+from app.core.revocacion import lista_revocacion
+from app.core.exceptions import CursorInvalidoError
 from app.core.logging_config import logger
 
 
+def modulos_accesibles(user: Usuario) -> List[Modulo]:
+    """
+    Módulos activos del rol más los asignados directo al usuario, por `orden`.
+
+    Es la misma regla que MatrizPermisos.tiene_acceso (require_module): lo que
+    ve el usuario en login, /me y /modules es lo que después se le permite.
+    """
+    modulos = {m.id: m for m in (user.rol.modulos if user.rol else []) if m.activo}
+    modulos.update((m.id, m) for m in user.modulos if m.activo)
+    return sorted(modulos.values(), key=lambda m: (m.orden or 0, m.id))
+
+
+def modulos_efectivos(user: Usuario) -> List[str]:
+    """Códigos de modulos_accesibles(user)."""
+    return [m.codigo for m in modulos_accesibles(user)]
+
+
+def _codificar_cursor(orden: str, user: Usuario) -> str:
+    valor = valor_orden_usuario(user, orden.lstrip("-"))
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    datos = json.dumps({"o": orden, "v": valor, "id": user.id})
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(orden: str, cursor: str) -> Tuple[object, int]:
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if datos["o"] != orden:
+            raise ValueError(datos["o"])
+        valor = datos["v"]
+        if orden.lstrip("-") == "created_at":
+            valor = datetime.fromisoformat(valor)
+        return valor, int(datos["id"])
+    except (ValueError, KeyError, TypeError):
+        raise CursorInvalidoError()
+
+
 class AuthService:
     """Servicio para lógica de negocio de autenticación."""
     
     def __init__(self, db: Session):
         self.repository = AuthRepository(db)
     
-    def authenticate(self, username: str, password: str) -> Optional[Usuario]:
-        """
-        Autentica un usuario con username y password.
-        
-        Returns:
-            Usuario si las credenciales son válidas, None en caso contrario
-        """
+    def _get_user_for_login(self, username: str) -> Optional[Usuario]:
+        """Usuario activo con ese username, o None."""
         user = self.repository.get_user_by_username(username)
         
         if not user:
@@ -33,14 +74,48 @@ class AuthService:
             logger.warning(f"Este usuario no está activo: {username}")
             return None
         
+        return user
+    
+    def _register_login(self, user: Usuario) -> None:
+        # Actualizar último login
+        self.repository.update_last_login(user)
+        logger.info(f"Login exitoso para usuario: {user.username}")
+    
+    def authenticate(self, username: str, password: str) -> Optional[Usuario]:
+        """
+        Autentica un usuario con username y password.
+        
+        Returns:
+            Usuario si las credenciales son válidas, None en caso contrario
+        """
+        user = self._get_user_for_login(username)
+        if not user:
+            return None
+        
         if not verify_password(password, user.password_hash):
             logger.warning(f"Contraseña incorrecta para usuario: {username}")
             return None
         
-        # Actualizar último login
-        self.repository.update_last_login(user)
-        logger.info(f"Login exitoso para usuario: {username}")
+        self._register_login(user)
+        return user
+    
+    async def authenticate_async(self, username: str, password: str) -> Optional[Usuario]:
+        """
+        Igual que authenticate, para endpoints async: las queries van al pool
+        de I/O síncrono y bcrypt al pool acotado de bcrypt.
         
+        Raises:
+            ServicioSaturadoError (503): Si el pool de bcrypt está saturado
+        """
+        user = await run_sync(self._get_user_for_login, username)
+        if not user:
+            return None
+        
+        if not await verify_password_async(password, user.password_hash):
+            logger.warning(f"Contraseña incorrecta para usuario: {username}")
+            return None
+        
+        await run_sync(self._register_login, user)
         return user
     
     def create_token_for_user(self, user: Usuario) -> str:
@@ -58,12 +133,9 @@ class AuthService:
     
     def get_user_modules(self, user: Usuario) -> List[Modulo]:
         """
-        Obtiene los módulos a los que el usuario tiene acceso.
+        Obtiene los módulos a los que el usuario tiene acceso (rol + directos).
         """
-        if not user.rol:
-            return []
-        
-        return [m for m in user.rol.modulos if m.activo]
+        return modulos_accesibles(user)
     
     # === Gestión de usuarios (para admin) ===
     
@@ -90,6 +162,7 @@ class AuthService:
         # Asignar módulos específicos si se proporcionan
         if modulo_ids:
             self.repository.set_user_modules(user, modulo_ids)
+            registro_permisos.reconstruir(self.repository.db)
         
         logger.info(f"Usuario creado: {username}")
         return user
@@ -126,7 +199,9 @@ class AuthService:
         # Actualizar módulos específicos si se proporcionan
         if modulo_ids is not None:
             self.repository.set_user_modules(updated_user, modulo_ids)
+            registro_permisos.reconstruir(self.repository.db)
         
+        cache_principales.invalidar_usuario(user.username)
         logger.info(f"Usuario actualizado: {user.username}")
         
         return updated_user
@@ -135,6 +210,34 @@ class AuthService:
         """Obtiene todos los usuarios."""
         return self.repository.get_all_users()
     
+    def list_users_page(
+        self,
+        orden: str = "username",
+        busqueda: Optional[str] = None,
+        activo: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limite: Optional[int] = None
+    ) -> Tuple[List[Usuario], Optional[str]]:
+        """
+        Página de usuarios y cursor de la siguiente (None si no hay más).
+        
+        `orden` es una columna de COLUMNAS_ORDEN_USUARIOS, con "-" delante para
+        orden descendente. Sin `limite` trae todos los usuarios.
+        """
+        despues_de = _decodificar_cursor(orden, cursor) if cursor else None
+        users = self.repository.get_users_page(
+            orden=orden.lstrip("-"),
+            descendente=orden.startswith("-"),
+            busqueda=busqueda,
+            activo=activo,
+            despues_de=despues_de,
+            limite=limite + 1 if limite is not None else None
+        )
+        if limite is None or len(users) <= limite:
+            return users, None
+        users = users[:limite]
+        return users, _codificar_cursor(orden, users[-1])
+    
     def get_user_by_id(self, user_id: int) -> Optional[Usuario]:
         """Obtiene un usuario por ID."""
         return self.repository.get_user_by_id(user_id)
@@ -144,9 +247,18 @@ class AuthService:
         user = self.repository.get_user_by_id(user_id)
         if user:
             self.repository.deactivate_user(user)
+            cache_principales.invalidar_usuario(user.username)
+            lista_revocacion.revocar_usuario(user.username)
             logger.info(f"Usuario desactivado: {user.username}")
         return user
     
+    def revoke_sessions(self, user_id: int) -> Optional[Usuario]:
+        """Revoca todos los tokens emitidos hasta ahora para el usuario."""
+        user = self.repository.get_user_by_id(user_id)
+        if user:
+            lista_revocacion.revocar_usuario(user.username)
+        return user
+    
     def get_all_roles(self):
         """Obtiene todos los roles."""
         return self.repository.get_all_roles()
@@ -157,4 +269,7 @@ class AuthService:
     
     def toggle_module(self, module_id: int, active: bool):
         """Activa/desactiva un módulo."""
-        return self.repository.toggle_module(module_id, active)
+        module = self.repository.toggle_module(module_id, active)
+        if module:
+            registro_permisos.reconstruir(self.repository.db)
+        return module
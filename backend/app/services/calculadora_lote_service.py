@@ -0,0 +1,321 @@
+"""
+Cálculo de sueldos por lotes con NumPy.
+
+Misma fórmula que CalculadoraService, pero evaluada sobre arreglos: cada
+trabajador es una fila y los tramos de impuesto, topes y tasas AFP se
+aplican a todas las filas a la vez. Pensado para revisiones de
+remuneraciones que calculan bandas completas de sueldos.
+"""
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.calculadora_parametros import ParametrosCalculadora, obtener_parametros
+from app.schemas.calculadora import (
+    CalculoRequest, CalculoResponse,
+    SimulacionRequest, SimulacionResponse,
+    CurvaRequest, CurvaResponse,
+    CompararRequest, CompararResponse, OpcionSalud
+)
+
+
+def _tramos(p: ParametrosCalculadora):
+    """Tramos del snapshot como arreglos para searchsorted."""
+    return np.asarray(p.tramos_hasta), np.asarray(p.tramos_tasa), np.asarray(p.tramos_rebaja)
+
+
+class CalculadoraLoteService:
+
+    @staticmethod
+    def _columnas(
+        requests: Sequence[Union[CalculoRequest, SimulacionRequest, CurvaRequest]],
+        p: ParametrosCalculadora
+    ) -> Dict[str, np.ndarray]:
+        """Pasa la lista de requests a columnas NumPy (una fila por trabajador)."""
+        uf = p.uf
+        bonos_imp = [sum(b.monto for b in r.bonos if b.imponible) for r in requests]
+        bonos_no_imp = [sum(b.monto for b in r.bonos if not b.imponible) for r in requests]
+        return {
+            "movilizacion": np.array([r.movilizacion for r in requests], dtype=float),
+            "tasa_afp": np.array([p.tasa_afp(r.afp_nombre) for r in requests]),
+            "fonasa": np.array([r.salud_sistema == 'fonasa' for r in requests]),
+            "plan_isapre": np.array(
+                [0.0 if r.salud_sistema == 'fonasa' else r.salud_uf * uf for r in requests]
+            ),
+            "bonos_imp": np.array(bonos_imp, dtype=float),
+            "bonos_no_imp": np.array(bonos_no_imp, dtype=float),
+        }
+
+    @staticmethod
+    def calcular_impuesto_unico(base_tributable: np.ndarray, p: ParametrosCalculadora) -> np.ndarray:
+        """Impuesto de segunda categoría para un arreglo de bases tributables."""
+        hasta, tasa, rebaja = _tramos(p)
+        idx = np.searchsorted(hasta, base_tributable, side='left')
+        idx = np.minimum(idx, len(hasta) - 1)
+        impuesto = base_tributable * tasa[idx] - rebaja[idx]
+        return np.where(base_tributable <= 0, 0.0, impuesto)
+
+    @staticmethod
+    def _descuentos(
+        imponible: np.ndarray, col: Dict[str, np.ndarray], p: ParametrosCalculadora
+    ) -> Dict[str, np.ndarray]:
+        """Cotizaciones AFP, salud y cesantía aplicando topes y plan isapre."""
+        afecto_afp_salud = np.minimum(imponible, p.tope_afp_salud)
+        afecto_cesantia = np.minimum(imponible, p.tope_cesantia)
+        siete_porciento = afecto_afp_salud * p.tasa_salud
+        return {
+            "afp": afecto_afp_salud * col['tasa_afp'],
+            "salud": np.where(col['fonasa'], siete_porciento, np.maximum(siete_porciento, col['plan_isapre'])),
+            "ces": afecto_cesantia * p.tasa_cesantia,
+        }
+
+    def simular_arrays(
+        self, sueldo_base: np.ndarray, col: Dict[str, np.ndarray], p: ParametrosCalculadora
+    ) -> Dict[str, np.ndarray]:
+        """Simulación forward vectorizada; mismas claves que el detalle escalar."""
+        gratificacion = np.minimum(sueldo_base * p.porcentaje_gratificacion, p.tope_gratificacion)
+        imponible = sueldo_base + gratificacion + col['bonos_imp']
+
+        d = self._descuentos(imponible, col, p)
+        base_trib = imponible - d['afp'] - d['salud'] - d['ces']
+        impuesto = self.calcular_impuesto_unico(base_trib, p)
+
+        tot_haberes = imponible + col['movilizacion'] + col['bonos_no_imp']
+        tot_descuentos = d['afp'] + d['salud'] + d['ces'] + impuesto
+        return {
+            "liquido": tot_haberes - tot_descuentos,
+            "grat": gratificacion,
+            "imp": imponible,
+            "afp": d['afp'],
+            "salud": d['salud'],
+            "ces": d['ces'],
+            "tax": impuesto,
+            "hab": tot_haberes,
+            "desc": tot_descuentos,
+            "base_trib": base_trib,
+            "bonos_imp": col['bonos_imp'],
+            "bonos_no_imp": col['bonos_no_imp'],
+        }
+
+    def resolver_base_arrays(
+        self, liquido_objetivo: np.ndarray, col: Dict[str, np.ndarray], p: ParametrosCalculadora
+    ) -> np.ndarray:
+        """
+        Inversa vectorizada (sin redondear), igual que el solver exacto escalar:
+        líquido -> base tributable -> imponible -> sueldo base.
+        """
+        base_trib = self._base_tributable_objetivo(liquido_objetivo, col, p)
+        return self._base_desde_tributable(base_trib, col, p)
+
+    @staticmethod
+    def _base_tributable_objetivo(
+        liquido_objetivo: np.ndarray, col: Dict[str, np.ndarray], p: ParametrosCalculadora
+    ) -> np.ndarray:
+        """Paso 1: líquido -> base tributable (solo depende de líquido, movilización y bonos no imponibles)."""
+        hasta, tasa, rebaja = _tramos(p)
+        fijo = col['movilizacion'] + col['bonos_no_imp']
+        liquido_objetivo, fijo = np.broadcast_arrays(liquido_objetivo, fijo)
+        # Primer tramo cuya inversa no supera su límite
+        candidatos = (
+            (liquido_objetivo - fijo - rebaja[:, None]) / (1 - tasa[:, None])
+        )  # (tramos, n)
+        tramo = np.argmax(candidatos <= hasta[:, None], axis=0)
+        return candidatos[tramo, np.arange(len(liquido_objetivo))]
+
+    def _base_desde_tributable(
+        self, base_trib: np.ndarray, col: Dict[str, np.ndarray], p: ParametrosCalculadora
+    ) -> np.ndarray:
+        """Pasos 2 y 3: base tributable -> imponible -> sueldo base."""
+        n = len(base_trib)
+
+        # 2. Base tributable -> imponible, interpolando entre quiebres por fila
+        piso_isapre = np.where(col['plan_isapre'] > 0, col['plan_isapre'] / p.tasa_salud, 0.0)
+        quiebres = np.sort(np.column_stack([
+            np.zeros(n),
+            np.full(n, p.tope_afp_salud),
+            np.full(n, p.tope_cesantia),
+            piso_isapre,
+        ]), axis=1)
+        ultimo = quiebres[:, -1:] + 1_000_000
+        xs = np.hstack([quiebres, ultimo])  # (n, 5)
+
+        col_rep = {
+            k: np.broadcast_to(np.asarray(v)[:, None] if np.ndim(v) else v, xs.shape)
+            for k, v in col.items()
+        }
+        d = self._descuentos(xs, col_rep, p)
+        ys = xs - d['afp'] - d['salud'] - d['ces']
+
+        # Segmento [k-1, k] con el primer punto que alcanza la base tributable
+        k = np.argmax(ys >= base_trib[:, None], axis=1)
+        k = np.where((ys >= base_trib[:, None]).any(axis=1), k, xs.shape[1] - 1)
+        k = np.maximum(k, 1)
+        filas = np.arange(n)
+        x0, x1 = xs[filas, k - 1], xs[filas, k]
+        y0, y1 = ys[filas, k - 1], ys[filas, k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            imponible = np.where(y1 != y0, x0 + (base_trib - y0) * (x1 - x0) / (y1 - y0), x0)
+
+        # 3. Imponible -> sueldo base (gratificación con tope)
+        porcentaje_grat = p.porcentaje_gratificacion
+        tope_grat = p.tope_gratificacion
+        neto = imponible - col['bonos_imp']
+        limite = (tope_grat / porcentaje_grat) * (1 + porcentaje_grat)
+        base = np.where(neto <= limite, neto / (1 + porcentaje_grat), neto - tope_grat)
+        return np.maximum(base, 0.0)
+
+    def simular_lote(
+        self, requests: List[SimulacionRequest], fecha: Optional[date] = None
+    ) -> List[SimulacionResponse]:
+        """Líquido para cada sueldo base del lote."""
+        if not requests:
+            return []
+        p = obtener_parametros(fecha)
+        col = self._columnas(requests, p)
+        base = np.array([r.sueldo_base for r in requests], dtype=float)
+        r = self.simular_arrays(base, col, p)
+
+        liquidos = np.round(r.pop('liquido')).astype(np.int64).tolist()
+        haberes = np.round(r['hab']).astype(np.int64).tolist()
+        descuentos = np.round(r['desc']).astype(np.int64).tolist()
+        detalle = {k: v.tolist() for k, v in r.items()}
+        claves = list(detalle)
+
+        return [
+            SimulacionResponse(
+                sueldo_base=req.sueldo_base,
+                sueldo_liquido=liquidos[i],
+                total_haberes=haberes[i],
+                total_descuentos=descuentos[i],
+                detalle={k: detalle[k][i] for k in claves}
+            )
+            for i, req in enumerate(requests)
+        ]
+
+    def resolver_lote(
+        self, requests: List[CalculoRequest], fecha: Optional[date] = None
+    ) -> List[CalculoResponse]:
+        """Sueldo base (redondeado a miles hacia arriba) para cada líquido del lote."""
+        if not requests:
+            return []
+        p = obtener_parametros(fecha)
+        col = self._columnas(requests, p)
+        objetivo = np.array([r.sueldo_liquido for r in requests], dtype=float)
+
+        base_exacta = self.resolver_base_arrays(objetivo, col, p)
+        base_redondeada = np.where(base_exacta > 0, np.ceil(base_exacta / 1000) * 1000, 0.0)
+        r = self.simular_arrays(base_redondeada, col, p)
+
+        def enteros(valores: np.ndarray) -> list:
+            return np.round(valores).astype(np.int64).tolist()
+
+        bases = base_redondeada.astype(np.int64).tolist()
+        liquidos = enteros(r['liquido'])
+        grat, imp, hab = enteros(r['grat']), enteros(r['imp']), enteros(r['hab'])
+        afp, salud, ces, tax = enteros(r['afp']), enteros(r['salud']), enteros(r['ces']), enteros(r['tax'])
+        desc = enteros(r['desc'])
+        bonos_imp, bonos_no_imp = enteros(col['bonos_imp']), enteros(col['bonos_no_imp'])
+        diferencia = enteros(r['liquido'] - objetivo)
+        redondeo = enteros(base_redondeada - np.round(base_exacta))
+
+        return [
+            CalculoResponse(
+                sueldo_base=bases[i],
+                sueldo_liquido=liquidos[i],
+                gratificacion=grat[i],
+                bonos_imponibles=bonos_imp[i],
+                bonos_no_imponibles=bonos_no_imp[i],
+                movilizacion=req.movilizacion,
+                imponible=imp[i],
+                total_haberes=hab[i],
+                cotizacion_previsional=afp[i],
+                cotizacion_salud=salud[i],
+                cesantia=ces[i],
+                impuesto=tax[i],
+                total_descuentos=desc[i],
+                diferencia=diferencia[i],
+                redondeo_aplicado=redondeo[i]
+            )
+            for i, req in enumerate(requests)
+        ]
+
+    def curva(self, request: CurvaRequest, fecha: Optional[date] = None) -> CurvaResponse:
+        """
+        Líquido, impuesto y cotizaciones para base_desde..base_hasta cada `paso`.
+
+        La tasa marginal se calcula con una diferencia de $1 en cada punto, así
+        los quiebres (tramos, topes) quedan exactos y no suavizados por el paso.
+        """
+        # Columnas de largo 1: NumPy las replica sobre todos los puntos
+        p = obtener_parametros(fecha)
+        col = self._columnas([request], p)
+        base = np.arange(request.base_desde, request.base_hasta + 1, request.paso, dtype=float)
+        r = self.simular_arrays(base, col, p)
+        siguiente = self.simular_arrays(base + 1, col, p)['liquido']
+
+        def enteros(valores: np.ndarray) -> list:
+            return np.round(valores).astype(np.int64).tolist()
+
+        return CurvaResponse(
+            sueldo_base=base.astype(np.int64).tolist(),
+            sueldo_liquido=enteros(r['liquido']),
+            impuesto=enteros(r['tax']),
+            cotizacion_previsional=enteros(r['afp']),
+            cotizacion_salud=enteros(r['salud']),
+            cesantia=enteros(r['ces']),
+            tasa_marginal=np.round(1 - (siguiente - r['liquido']), 4).tolist()
+        )
+
+    def comparar(self, request: CompararRequest, fecha: Optional[date] = None) -> CompararResponse:
+        """
+        Sueldo base para un mismo líquido en cada combinación AFP x salud.
+
+        La base tributable objetivo no depende de AFP ni salud, así que se
+        calcula una vez; luego cada celda solo invierte cotizaciones y
+        gratificación, todas en una sola pasada vectorizada.
+        """
+        p = obtener_parametros(fecha)
+        afps = request.afps if request.afps is not None else sorted(p.tasas_afp)
+        planes = request.planes_isapre_uf if request.planes_isapre_uf is not None else [p.default_plan_isapre_uf]
+        salud = ([OpcionSalud(sistema="fonasa")] if request.incluir_fonasa else []) + [
+            OpcionSalud(sistema="isapre", plan_uf=uf) for uf in planes
+        ]
+        filas, columnas = len(afps), len(salud)
+
+        bonos_imp = float(sum(b.monto for b in request.bonos if b.imponible))
+        bonos_no_imp = float(sum(b.monto for b in request.bonos if not b.imponible))
+        comunes = {
+            "movilizacion": np.array([float(request.movilizacion)]),
+            "bonos_imp": np.array([bonos_imp]),
+            "bonos_no_imp": np.array([bonos_no_imp]),
+        }
+        base_trib = self._base_tributable_objetivo(np.array([float(request.sueldo_liquido)]), comunes, p)
+
+        # Celdas en orden fila-mayor: celda k = (afp k // columnas, salud k % columnas)
+        n = filas * columnas
+        col = {
+            "movilizacion": np.full(n, float(request.movilizacion)),
+            "bonos_imp": np.full(n, bonos_imp),
+            "bonos_no_imp": np.full(n, bonos_no_imp),
+            "tasa_afp": np.repeat([p.tasa_afp(a) for a in afps], columnas),
+            "fonasa": np.tile([s.sistema == 'fonasa' for s in salud], filas),
+            "plan_isapre": np.tile([s.plan_uf * p.uf if s.sistema == 'isapre' else 0.0 for s in salud], filas),
+        }
+        base_exacta = self._base_desde_tributable(np.full(n, base_trib[0]), col, p)
+        base_redondeada = np.where(base_exacta > 0, np.ceil(base_exacta / 1000) * 1000, 0.0)
+        r = self.simular_arrays(base_redondeada, col, p)
+
+        def matriz(valores: np.ndarray) -> List[List[int]]:
+            return np.round(valores).astype(np.int64).reshape(filas, columnas).tolist()
+
+        return CompararResponse(
+            sueldo_liquido_objetivo=request.sueldo_liquido,
+            afps=afps,
+            salud=salud,
+            sueldo_base=matriz(base_redondeada),
+            sueldo_liquido=matriz(r['liquido']),
+            cotizacion_previsional=matriz(r['afp']),
+            cotizacion_salud=matriz(r['salud']),
+            impuesto=matriz(r['tax'])
+        )
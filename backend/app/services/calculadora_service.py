@@ -3,12 +3,41 @@ Motor de cálculo de sueldos.
 Migrado y adaptado desde SERVICE/engine.py
 """
 import math
-from typing import List, Dict, Tuple
-from app.core.calculadora_data import (
-    VALOR_UF_ACTUAL, SUELDO_MINIMO, TASAS_AFP, PARAMETROS,
-    TOPE_IMPONIBLE_AFP_SALUD, TOPE_IMPONIBLE_CESANTIA, TRAMOS_IMPUESTO
-)
-from app.schemas.calculadora import CalculoRequest, CalculoResponse, SimulacionRequest
+from datetime import date
+from typing import List, Dict, Optional, Tuple
+from app.core.calculadora_parametros import ParametrosCalculadora, obtener_parametros, registro_parametros
+from app.core.config import settings
+from app.core.memo import MemoLRU
+from app.schemas.calculadora import CalculoRequest, CalculoResponse, SimulacionRequest, SimulacionResponse
+from app.core.logging_config import logger
+
+# Resultados por request canónica + versión de parámetros; se vacía al recargar parámetros
+memo_calculadora = MemoLRU(settings.CALCULADORA_MEMO_MAX_ITEMS)
+registro_parametros.al_recargar(memo_calculadora.limpiar)
+
+
+def _datos_trabajador(request) -> dict:
+    return {
+        "movilizacion": request.movilizacion,
+        "afp_nombre": request.afp_nombre,
+        "salud_sistema": request.salud_sistema,
+        "salud_uf": request.salud_uf,
+        "bonos": [b.model_dump() for b in request.bonos]
+    }
+
+
+def _clave_trabajador(request) -> tuple:
+    """
+    Forma canónica de los parámetros del trabajador para el memo.
+    
+    El resultado solo depende de los totales de bonos (no de nombres ni orden)
+    y del plan isapre solo si el sistema es isapre.
+    """
+    bonos_imp = sum(b.monto for b in request.bonos if b.imponible)
+    bonos_no_imp = sum(b.monto for b in request.bonos if not b.imponible)
+    salud_uf = request.salud_uf if request.salud_sistema == 'isapre' else 0.0
+    return (request.movilizacion, request.afp_nombre, request.salud_sistema, salud_uf, bonos_imp, bonos_no_imp)
+
 
 class CalculadoraService:
     
@@ -22,69 +51,57 @@ class CalculadoraService:
     @staticmethod
     def calcular_impuesto_unico(base_tributable: float) -> float:
         """Calcula impuesto de segunda categoría según tramos"""
-        if base_tributable <= 0:
-            return 0.0
-        
-        for tramo in TRAMOS_IMPUESTO:
-            if tramo['desde'] <= base_tributable <= tramo['hasta']:
-                return (base_tributable * tramo['tasa']) - tramo['rebaja']
-        
-        # Tramo final (infinito)
-        ultimo = TRAMOS_IMPUESTO[-1]
-        if base_tributable > ultimo['desde']:
-            return (base_tributable * ultimo['tasa']) - ultimo['rebaja']
-        
-        return 0.0
+        return obtener_parametros().impuesto(base_tributable)
     
-    def simular_liquido(self, sueldo_base: float, datos: dict) -> Tuple[float, dict]:
+    def simular_liquido(
+        self, sueldo_base: float, datos: dict, p: Optional[ParametrosCalculadora] = None
+    ) -> Tuple[float, dict]:
         """
         Simulación forward: dado un sueldo base, calcula el líquido resultante.
+        
+        `p` permite fijar el snapshot de parámetros (por defecto, el vigente).
         """
-        lista_bonos = datos.get('bonos', [])
+        if p is None:
+            p = obtener_parametros()
         movilizacion = datos['movilizacion']
         
-        bonos_imponibles = sum(b['monto'] for b in lista_bonos if b['imponible'])
-        bonos_no_imponibles = sum(b['monto'] for b in lista_bonos if not b['imponible'])
-        
-        # Parámetros
-        uf = VALOR_UF_ACTUAL
-        ingreso_minimo = SUELDO_MINIMO
-        tope_pesos_afp_salud = TOPE_IMPONIBLE_AFP_SALUD * uf
-        tope_pesos_cesantia = TOPE_IMPONIBLE_CESANTIA * uf
+        bonos_imponibles = bonos_no_imponibles = 0
+        for b in datos.get('bonos', ()):
+            if b['imponible']:
+                bonos_imponibles += b['monto']
+            else:
+                bonos_no_imponibles += b['monto']
         
         # Tasas
-        tasa_afp = TASAS_AFP.get(datos['afp_nombre'], 0.1049)
-        tasa_fonasa = PARAMETROS['tasa_salud']
-        tasa_cesantia = PARAMETROS['tasa_cesantia']
+        tasa_afp = p.tasa_afp(datos['afp_nombre'])
         
         # Salud
         usar_fonasa = (datos['salud_sistema'] == 'fonasa')
-        costo_plan_isapre = 0 if usar_fonasa else datos['salud_uf'] * uf
+        costo_plan_isapre = 0 if usar_fonasa else datos['salud_uf'] * p.uf
         
         # A. Gratificación
-        tope_grat = (4.75 * ingreso_minimo) / 12
-        gratificacion = min(sueldo_base * 0.25, tope_grat)
+        gratificacion = min(sueldo_base * p.porcentaje_gratificacion, p.tope_gratificacion)
         
         # B. Total Imponible
         imponible = sueldo_base + gratificacion + bonos_imponibles
         
         # C. Aplicar Topes
-        imp_afecto_afp_salud = min(imponible, tope_pesos_afp_salud)
-        imp_afecto_cesantia = min(imponible, tope_pesos_cesantia)
+        imp_afecto_afp_salud = min(imponible, p.tope_afp_salud)
+        imp_afecto_cesantia = min(imponible, p.tope_cesantia)
         
         # D. Descuentos Previsionales
         val_afp = imp_afecto_afp_salud * tasa_afp
-        val_cesantia = imp_afecto_cesantia * tasa_cesantia
+        val_cesantia = imp_afecto_cesantia * p.tasa_cesantia
         
         if usar_fonasa:
-            val_salud = imp_afecto_afp_salud * tasa_fonasa
+            val_salud = imp_afecto_afp_salud * p.tasa_salud
         else:
-            siete_porciento = imp_afecto_afp_salud * tasa_fonasa
+            siete_porciento = imp_afecto_afp_salud * p.tasa_salud
             val_salud = max(siete_porciento, costo_plan_isapre)
         
         # E. Impuesto
         base_trib = imponible - val_afp - val_salud - val_cesantia
-        val_impuesto = self.calcular_impuesto_unico(base_trib)
+        val_impuesto = p.impuesto(base_trib)
         
         # F. Totales
         tot_haberes = imponible + movilizacion + bonos_no_imponibles
@@ -107,21 +124,78 @@ class CalculadoraService:
         
         return liquido, detalles
     
-    def resolver_sueldo_base(self, request: CalculoRequest) -> CalculoResponse:
+    def _resolver_base_exacta(self, liquido_objetivo: float, datos: dict, p: ParametrosCalculadora) -> float:
         """
-        Algoritmo de búsqueda binaria para encontrar el sueldo base
-        que produce el líquido deseado.
+        Inversa exacta de `simular_liquido`.
+        
+        El líquido es lineal por tramos en el sueldo base, así que se despeja en
+        tres pasos, cada uno sobre una función lineal por segmentos:
+        1. líquido -> base tributable: dentro de un tramo de impuesto
+           líquido = base_trib * (1 - tasa) + rebaja + movilización + bonos no imponibles.
+        2. base tributable -> imponible: quiebres en los topes AFP/salud y
+           cesantía y en el piso del plan isapre.
+        3. imponible -> sueldo base: quiebre en el tope de gratificación.
         """
-        datos = {
-            "movilizacion": request.movilizacion,
-            "afp_nombre": request.afp_nombre,
-            "salud_sistema": request.salud_sistema,
-            "salud_uf": request.salud_uf,
-            "bonos": [b.model_dump() for b in request.bonos]
-        }
+        lista_bonos = datos.get('bonos', [])
+        bonos_imponibles = sum(b['monto'] for b in lista_bonos if b['imponible'])
+        bonos_no_imponibles = sum(b['monto'] for b in lista_bonos if not b['imponible'])
         
-        liquido_objetivo = request.sueldo_liquido
+        tope_pesos_afp_salud = p.tope_afp_salud
+        tope_pesos_cesantia = p.tope_cesantia
+        tasa_afp = p.tasa_afp(datos['afp_nombre'])
+        tasa_salud = p.tasa_salud
+        tasa_cesantia = p.tasa_cesantia
+        usar_fonasa = (datos['salud_sistema'] == 'fonasa')
+        costo_plan_isapre = 0 if usar_fonasa else datos['salud_uf'] * p.uf
+        
+        # 1. Tramo de impuesto: el primero cuya inversa cae bajo su límite superior
+        fijo = datos['movilizacion'] + bonos_no_imponibles
+        base_trib = 0.0
+        for hasta, tasa, rebaja in zip(p.tramos_hasta, p.tramos_tasa, p.tramos_rebaja):
+            base_trib = (liquido_objetivo - fijo - rebaja) / (1 - tasa)
+            if base_trib <= hasta:
+                break
         
+        # 2. Base tributable -> imponible
+        def base_trib_de_imponible(imponible: float) -> float:
+            afecto_afp_salud = min(imponible, tope_pesos_afp_salud)
+            val_salud = afecto_afp_salud * tasa_salud
+            if not usar_fonasa:
+                val_salud = max(val_salud, costo_plan_isapre)
+            return (
+                imponible
+                - afecto_afp_salud * tasa_afp
+                - val_salud
+                - min(imponible, tope_pesos_cesantia) * tasa_cesantia
+            )
+        
+        quiebres = [tope_pesos_afp_salud, tope_pesos_cesantia]
+        if not usar_fonasa and costo_plan_isapre > 0:
+            quiebres.append(costo_plan_isapre / tasa_salud)
+        quiebres = sorted(q for q in quiebres if q > 0)
+        # Después del último quiebre la pendiente es constante
+        quiebres.append(quiebres[-1] + 1_000_000)
+        
+        x0, y0 = 0.0, base_trib_de_imponible(0.0)
+        for x1 in quiebres:
+            y1 = base_trib_de_imponible(x1)
+            if y1 >= base_trib or x1 == quiebres[-1]:
+                break
+            x0, y0 = x1, y1
+        imponible = x0 + (base_trib - y0) * (x1 - x0) / (y1 - y0)
+        
+        # 3. Imponible -> sueldo base (gratificación = min(25% del base, tope))
+        porcentaje_grat = p.porcentaje_gratificacion
+        tope_grat = p.tope_gratificacion
+        neto = imponible - bonos_imponibles
+        if neto <= 0:
+            return 0.0
+        if neto <= (tope_grat / porcentaje_grat) * (1 + porcentaje_grat):
+            return neto / (1 + porcentaje_grat)
+        return neto - tope_grat
+    
+    def _resolver_base_biseccion(self, liquido_objetivo: float, datos: dict, p: ParametrosCalculadora) -> float:
+        """Búsqueda binaria del sueldo base (modo de verificación)."""
         # Configuración búsqueda binaria
         precision = 1.0
         min_base = 0
@@ -129,7 +203,7 @@ class CalculadoraService:
         iteraciones = 0
         
         # Expandir rango si es necesario
-        while self.simular_liquido(max_base, datos)[0] < liquido_objetivo:
+        while self.simular_liquido(max_base, datos, p)[0] < liquido_objetivo:
             max_base *= 2
             if max_base > 100_000_000:
                 break
@@ -138,7 +212,7 @@ class CalculadoraService:
         base_exacta = 0
         while (max_base - min_base) > precision and iteraciones < 100:
             base_exacta = (min_base + max_base) / 2
-            liquido_calc, _ = self.simular_liquido(base_exacta, datos)
+            liquido_calc, _ = self.simular_liquido(base_exacta, datos, p)
             
             if liquido_calc < liquido_objetivo:
                 min_base = base_exacta
@@ -147,11 +221,53 @@ class CalculadoraService:
             
             iteraciones += 1
         
+        return base_exacta
+    
+    def resolver_sueldo_base(
+        self, request: CalculoRequest, metodo: str = "exacto", fecha: Optional[date] = None
+    ) -> CalculoResponse:
+        """
+        Encuentra el sueldo base que produce el líquido deseado.
+        
+        Args:
+            request: Líquido objetivo y parámetros del trabajador
+            metodo: "exacto" (solver por tramos lineales), "biseccion" (búsqueda
+                    binaria original) o "verificar" (ambos, registra diferencias
+                    y retorna el exacto)
+            fecha: Fecha para elegir los parámetros vigentes (hoy por defecto)
+        """
+        version, p = registro_parametros.obtener_con_version(fecha)
+        if metodo == "verificar":
+            return self._resolver_sueldo_base(request, metodo, p)
+        
+        clave = ("calcular", metodo, request.sueldo_liquido, _clave_trabajador(request), version, p.vigente_desde)
+        return memo_calculadora.obtener_o_calcular(
+            clave, lambda: self._resolver_sueldo_base(request, metodo, p)
+        )
+    
+    def _resolver_sueldo_base(
+        self, request: CalculoRequest, metodo: str, p: ParametrosCalculadora
+    ) -> CalculoResponse:
+        datos = _datos_trabajador(request)
+        liquido_objetivo = request.sueldo_liquido
+        
+        if metodo == "biseccion":
+            base_exacta = self._resolver_base_biseccion(liquido_objetivo, datos, p)
+        else:
+            base_exacta = self._resolver_base_exacta(liquido_objetivo, datos, p)
+            if metodo == "verificar":
+                base_biseccion = self._resolver_base_biseccion(liquido_objetivo, datos, p)
+                if abs(base_exacta - base_biseccion) > 1.0:
+                    logger.warning(
+                        f"Solver exacto difiere de bisección: {base_exacta:.2f} vs {base_biseccion:.2f} "
+                        f"(líquido objetivo {liquido_objetivo})"
+                    )
+        
         # Redondear a miles
         sueldo_base_redondeado = self.redondear_a_miles_arriba(base_exacta)
         
         # Recalcular con sueldo redondeado
-        liquido_real, d = self.simular_liquido(sueldo_base_redondeado, datos)
+        liquido_real, d = self.simular_liquido(sueldo_base_redondeado, datos, p)
         
         bonos_imponibles = sum(b.monto for b in request.bonos if b.imponible)
         bonos_no_imponibles = sum(b.monto for b in request.bonos if not b.imponible)
@@ -172,4 +288,21 @@ class CalculadoraService:
             total_descuentos=round(d['desc']),
             diferencia=round(liquido_real - liquido_objetivo),
             redondeo_aplicado=sueldo_base_redondeado - round(base_exacta)
-        )
\ No newline at end of file
+        )
+    
+    def simular(self, request: SimulacionRequest, fecha: Optional[date] = None) -> SimulacionResponse:
+        """Simulación forward de una request, con memo por request canónica."""
+        version, p = registro_parametros.obtener_con_version(fecha)
+        clave = ("simular", request.sueldo_base, _clave_trabajador(request), version, p.vigente_desde)
+        
+        def calcular() -> SimulacionResponse:
+            liquido, detalles = self.simular_liquido(request.sueldo_base, _datos_trabajador(request), p)
+            return SimulacionResponse(
+                sueldo_base=request.sueldo_base,
+                sueldo_liquido=round(liquido),
+                total_haberes=round(detalles['hab']),
+                total_descuentos=round(detalles['desc']),
+                detalle=detalles
+            )
+        
+        return memo_calculadora.obtener_o_calcular(clave, calcular)
@@ -0,0 +1,393 @@
+"""
+Cálculo de finiquitos en el backend, para uno o muchos trabajadores.
+
+Aplica las mismas reglas que la pantalla CrearFiniquito:
+- Promedio variable: por cada concepto variable de los últimos 5 periodos se
+  promedian sus montos y se suman los promedios.
+- Gratificación: 25% de (sueldo base + promedio variable), con tope de
+  4,75 sueldos mínimos al año. El sueldo mínimo sale de los parámetros de la
+  calculadora vigentes a la fecha de término; la pantalla los pide al mismo
+  endpoint (/calculadora/parametros), así ambos usan el mismo valor.
+- Indemnización por años de servicio: total haberes por años a indemnizar
+  (0 bajo 1 año, la duración real entre 1 y 1,5 años y sobre eso los años
+  completos, sumando uno si la fracción es de 6 meses o más).
+- Mes de aviso: un total haberes si no se dio aviso con 30 días.
+- Vacaciones proporcionales: (sueldo base + promedio variable) / 30 por los
+  días corridos que cubren los días hábiles pendientes desde la fecha de término.
+
+Los datos del lote se pasan a arreglos NumPy (una fila por trabajador) y todas
+las fórmulas se evalúan de una vez sobre el lote completo.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.calculadora_parametros import ParametrosCalculadora, obtener_parametros
+from app.core.concurrency import run_sync
+from app.core.config import settings
+from app.core.exceptions import BukNoDisponibleError, TrabajadorNoEncontradoError
+from app.core.logging_config import logger
+from app.repositories.finiquitos_repository import FiniquitosRepository
+from app.schemas.finiquitos import (
+    FiniquitoEscenario,
+    FiniquitoCalculoRequest,
+    FiniquitoCalculoLoteRequest,
+    FiniquitoCalculoResultado,
+    FiniquitoCalculoLoteResponse
+)
+from app.services.finiquitos_service import FiniquitosService
+
+# Items de liquidación que entran al promedio variable
+INCOME_TYPES_VARIABLES = ("remuneracion_variable", "remuneracion_ocasional")
+OCASIONALES_EXCLUIDOS = frozenset({"Bono Empresa", "Bono Navidad", "Bono Fiestas Patrias"})
+CONCEPTOS_VARIABLES_FIJOS = frozenset({"Bono Supervisores Noche"})
+# Respaldo del sueldo base si BUK no lo informa
+CONCEPTO_SUELDO_BASE = "Sueldo Base"
+
+CAUSALES_CON_INDEMNIZACION = ("necesidades_empresa", "mutuo_acuerdo")
+
+DIAS_POR_ANIO = 365.25
+
+
+def es_item_variable(income_type: Optional[str], concepto: Optional[str]) -> bool:
+    if income_type == "remuneracion_variable":
+        return True
+    if income_type == "remuneracion_ocasional":
+        return concepto not in OCASIONALES_EXCLUIDOS
+    return concepto in CONCEPTOS_VARIABLES_FIJOS
+
+
+def _redondear(valores: np.ndarray) -> np.ndarray:
+    """Redondeo con .5 hacia arriba, igual que Math.round en el frontend."""
+    return np.floor(valores + 0.5)
+
+
+def promedio_variable(
+    trabajador: np.ndarray, concepto: np.ndarray, monto: np.ndarray, n: int
+) -> np.ndarray:
+    """
+    Suma por trabajador de los promedios de cada concepto variable.
+
+    `trabajador` y `concepto` son índices enteros por item; cada par
+    (trabajador, concepto) se promedia y luego se suma por trabajador.
+    """
+    if len(monto) == 0:
+        return np.zeros(n)
+    n_conceptos = int(concepto.max()) + 1
+    claves, grupo = np.unique(trabajador * n_conceptos + concepto, return_inverse=True)
+    promedios = np.bincount(grupo, weights=monto) / np.bincount(grupo)
+    return _redondear(np.bincount(claves // n_conceptos, weights=promedios, minlength=n))
+
+
+def dias_corridos(fecha_termino: np.datetime64, dias_habiles: np.ndarray) -> np.ndarray:
+    """
+    Días corridos que cubren los días hábiles de vacaciones pendientes.
+
+    Se cuenta desde el día siguiente al término: los días inhábiles antes del
+    primer día hábil, los días calendario hasta completar la parte entera en
+    días hábiles (lunes a viernes), y si la fracción supera 0,2 y el día
+    siguiente es inhábil, los días inhábiles hasta el próximo hábil. La
+    fracción se suma al final.
+    """
+    enteros = np.floor(dias_habiles).astype(np.int64)
+    decimal = dias_habiles - enteros
+    inicio = np.full(len(dias_habiles), fecha_termino + np.timedelta64(1, "D"))
+    primero = np.busday_offset(inicio, 0, roll="forward")
+    ultimo = np.busday_offset(primero, np.maximum(enteros - 1, 0), roll="forward")
+    siguiente = ultimo + np.timedelta64(1, "D")
+    extra = np.where(
+        decimal > 0.2,
+        (np.busday_offset(siguiente, 0, roll="forward") - siguiente).astype(np.int64),
+        0
+    )
+    total = (
+        (primero - inicio).astype(np.int64)
+        + (ultimo - primero).astype(np.int64) + 1
+        + extra
+        + decimal
+    )
+    total = np.where(enteros == 0, decimal, total)
+    return np.where(dias_habiles <= 0, 0.0, total)
+
+
+def anios_indemnizacion(anios: np.ndarray) -> np.ndarray:
+    completos = np.floor(anios)
+    redondeados = np.where(anios - completos >= 0.5, completos + 1, completos)
+    return np.where(anios < 1, 0.0, np.where(anios < 1.5, anios, redondeados))
+
+
+def calcular_finiquitos(
+    fecha_ingreso: np.ndarray,
+    sueldo_base: np.ndarray,
+    variable: np.ndarray,
+    dias_vacaciones: np.ndarray,
+    descuentos: np.ndarray,
+    escenario: FiniquitoEscenario,
+    p: ParametrosCalculadora
+) -> Dict[str, np.ndarray]:
+    """
+    Evalúa el finiquito de todas las filas con un mismo escenario.
+
+    `fecha_ingreso` es un arreglo datetime64[D]; el resto, arreglos float
+    del mismo largo.
+    """
+    termino = np.datetime64(escenario.fecha_termino, "D")
+    anios = np.maximum((termino - fecha_ingreso).astype(np.int64), 0) / DIAS_POR_ANIO
+    anios_indem = anios_indemnizacion(anios)
+
+    base_variable = sueldo_base + variable
+    gratificacion = np.minimum(base_variable * p.porcentaje_gratificacion, p.tope_gratificacion)
+    total_haberes = base_variable + gratificacion + escenario.movilizacion
+
+    con_indemnizacion = escenario.causal in CAUSALES_CON_INDEMNIZACION
+    indemnizacion = np.where(anios >= 1, anios_indem * total_haberes, 0.0) if con_indemnizacion else np.zeros(len(anios))
+    mes_aviso = total_haberes if con_indemnizacion and not escenario.aviso_dado else np.zeros(len(anios))
+
+    corridos = dias_corridos(termino, dias_vacaciones)
+    vacaciones = _redondear(base_variable / 30 * corridos)
+
+    return {
+        "gratificacion": gratificacion,
+        "total_haberes": total_haberes,
+        "anios_servicio": anios,
+        "anios_indemnizacion": anios_indem,
+        "dias_corridos": corridos,
+        "indemnizacion_anios": indemnizacion,
+        "mes_aviso": mes_aviso,
+        "vacaciones_proporcionales": vacaciones,
+        "total_finiquito": mes_aviso + indemnizacion + vacaciones - descuentos,
+    }
+
+
+class FiniquitoCalculoService:
+    def __init__(self, db: Session):
+        self.repository = FiniquitosRepository(db)
+        self.finiquitos = FiniquitosService(db)
+
+    async def calcular(self, request: FiniquitoCalculoRequest) -> FiniquitoCalculoResultado:
+        """Finiquito de un trabajador; 404 si no está activo en la BD."""
+        rut = request.rut.strip()
+        resultados, _ = await self._calcular([rut], None, request)
+        if not resultados:
+            raise TrabajadorNoEncontradoError(rut)
+        return resultados[0]
+
+    async def contar_lote(self, request: FiniquitoCalculoLoteRequest) -> int:
+        """Trabajadores que calcularía el lote (con cod_area, los activos del área según la BD)."""
+        if request.cod_area is not None:
+            return await run_sync(self.repository.count_activos_by_area, request.cod_area)
+        return len(request.ruts)
+
+    async def calcular_lote(self, request: FiniquitoCalculoLoteRequest) -> FiniquitoCalculoLoteResponse:
+        """
+        Finiquitos de una lista de RUTs o de todos los activos de un área.
+
+        Un RUT sin datos o con BUK caído no aborta el lote: su resultado
+        viene con ok=False y el error.
+        """
+        inicio = time.perf_counter()
+        ruts = list(dict.fromkeys(r.strip() for r in request.ruts if r and r.strip()))
+        logger.info(
+            f"Cálculo masivo de finiquitos: {len(ruts) or 'área ' + str(request.cod_area)} "
+            f"({request.causal}, término {request.fecha_termino})"
+        )
+        resultados, duracion_calculo_ms = await self._calcular(ruts, request.cod_area, request)
+
+        encontrados = {r.rut for r in resultados}
+        resultados += [
+            FiniquitoCalculoResultado(rut=rut, ok=False, error="Trabajador no encontrado o no activo")
+            for rut in ruts if rut not in encontrados
+        ]
+        exitosos = [r for r in resultados if r.ok]
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        logger.info(f"Cálculo masivo de finiquitos terminado: {len(exitosos)}/{len(resultados)} en {duracion_ms:.0f} ms")
+
+        return FiniquitoCalculoLoteResponse(
+            total=len(resultados),
+            exitosos=len(exitosos),
+            fallidos=len(resultados) - len(exitosos),
+            total_finiquitos=sum(r.total_finiquito for r in exitosos),
+            duracion_ms=round(duracion_ms, 1),
+            duracion_calculo_ms=round(duracion_calculo_ms, 1),
+            resultados=resultados
+        )
+
+    @staticmethod
+    def _agrupar(filas: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, np.ndarray]]:
+        """
+        Pasa las filas del repositorio a una entrada por trabajador y a las
+        columnas de items variables (índice de trabajador, concepto, monto).
+        """
+        trabajadores: List[Dict[str, Any]] = []
+        indices: Dict[str, int] = {}
+        conceptos: Dict[str, int] = {}
+        item_trabajador: List[int] = []
+        item_concepto: List[int] = []
+        item_monto: List[float] = []
+
+        for fila in filas:
+            rut = fila["rut_trabajador"]
+            i = indices.get(rut)
+            if i is None:
+                i = indices[rut] = len(trabajadores)
+                trabajadores.append({
+                    "rut": rut,
+                    "nombre_trabajador": fila["nombre_trabajador"],
+                    "fecha_ingreso": fila["fecha_ingreso"],
+                    "cod_area": fila["cod_area"],
+                    "nombre_area": fila["nombre_area"],
+                    "sueldo_liquidacion": None,
+                })
+            concepto = fila["concepto"]
+            if concepto is None or fila["monto"] is None:
+                continue
+            if concepto == CONCEPTO_SUELDO_BASE:
+                # Filas ordenadas por periodo: el primero es el más reciente
+                if trabajadores[i]["sueldo_liquidacion"] is None:
+                    trabajadores[i]["sueldo_liquidacion"] = float(fila["monto"])
+            elif es_item_variable(fila["income_type"], concepto):
+                item_trabajador.append(i)
+                item_concepto.append(conceptos.setdefault(concepto, len(conceptos)))
+                item_monto.append(float(fila["monto"]))
+
+        items = {
+            "trabajador": np.array(item_trabajador, dtype=np.int64),
+            "concepto": np.array(item_concepto, dtype=np.int64),
+            "monto": np.array(item_monto, dtype=float),
+        }
+        return trabajadores, items
+
+    async def _consultar_buk(
+        self, ruts: List[str], escenario: FiniquitoEscenario
+    ) -> List[Dict[str, Tuple[Any, Optional[str]]]]:
+        """
+        Sueldo base, vacaciones a la fecha de término y descuentos de cada RUT.
+
+        El presupuesto por segundo lo aplica buk_client para todo el proceso;
+        aquí solo se limita la concurrencia del lote.
+        """
+        semaforo = asyncio.Semaphore(settings.BUK_MAX_CONCURRENCY)
+        fecha = escenario.fecha_termino.isoformat()
+
+        async def consultar(tarea: Awaitable[Any]) -> Tuple[Any, Optional[str]]:
+            async with semaforo:
+                try:
+                    return await tarea, None
+                except Exception as e:
+                    return None, (e.detail if isinstance(e, BukNoDisponibleError) else str(e))
+
+        async def vacio() -> List[Any]:
+            return []
+
+        async def por_rut(rut: str) -> Dict[str, Tuple[Any, Optional[str]]]:
+            rut_buk = rut.replace(".", "").strip()
+            sueldo, vacaciones, descuentos = await asyncio.gather(
+                consultar(self.finiquitos.get_sueldo_base(rut_buk)),
+                consultar(self.finiquitos.get_vacaciones_disponibles(rut_buk, fecha)),
+                consultar(self.finiquitos.get_descuentos_by_rut_finiquito(rut_buk))
+                if escenario.incluir_descuentos else vacio(),
+            )
+            return {"sueldo": sueldo, "vacaciones": vacaciones, "descuentos": descuentos}
+
+        return await asyncio.gather(*(por_rut(rut) for rut in ruts))
+
+    async def _calcular(
+        self, ruts: List[str], cod_area: Optional[int], escenario: FiniquitoEscenario
+    ) -> Tuple[List[FiniquitoCalculoResultado], float]:
+        filas = await run_sync(
+            self.repository.get_datos_calculo_finiquito,
+            ruts, cod_area,
+            list(INCOME_TYPES_VARIABLES),
+            sorted(CONCEPTOS_VARIABLES_FIJOS | {CONCEPTO_SUELDO_BASE})
+        )
+        trabajadores, items = self._agrupar(filas)
+        if not trabajadores:
+            return [], 0.0
+        buk = await self._consultar_buk([t["rut"] for t in trabajadores], escenario)
+
+        t0 = time.perf_counter()
+        n = len(trabajadores)
+        sueldo_base = np.zeros(n)
+        dias_vacaciones = np.zeros(n)
+        descuentos = np.zeros(n)
+        fuentes: List[Optional[str]] = [None] * n
+        errores: List[Optional[str]] = [None] * n
+        advertencias: List[List[str]] = [[] for _ in range(n)]
+
+        for i, (t, datos) in enumerate(zip(trabajadores, buk)):
+            sueldo, error_sueldo = datos["sueldo"]
+            if sueldo is not None and sueldo.base_wage:
+                sueldo_base[i] = sueldo.base_wage
+                fuentes[i] = "buk"
+            elif t["sueldo_liquidacion"]:
+                sueldo_base[i] = t["sueldo_liquidacion"]
+                fuentes[i] = "liquidacion"
+                advertencias[i].append(
+                    f"Sueldo base tomado de la última liquidación ({error_sueldo or 'BUK no informa base_wage'})"
+                )
+            else:
+                errores[i] = f"Sin sueldo base: {error_sueldo or 'BUK no informa base_wage'}"
+
+            vacaciones, error_vacaciones = datos["vacaciones"]
+            if vacaciones is not None:
+                dias_vacaciones[i] = vacaciones.total_dias_disponibles
+            elif errores[i] is None:
+                errores[i] = f"Sin vacaciones disponibles: {error_vacaciones}"
+
+            lista_descuentos, error_descuentos = datos["descuentos"]
+            if lista_descuentos is not None:
+                descuentos[i] = sum(d.monto or 0 for d in lista_descuentos)
+            else:
+                advertencias[i].append(f"Descuentos no disponibles: {error_descuentos}")
+
+        fecha_ingreso = np.array(
+            [t["fecha_ingreso"] or escenario.fecha_termino for t in trabajadores], dtype="datetime64[D]"
+        )
+        variable = promedio_variable(items["trabajador"], items["concepto"], items["monto"], n)
+        p = obtener_parametros(escenario.fecha_termino)
+        r = calcular_finiquitos(fecha_ingreso, sueldo_base, variable, dias_vacaciones, descuentos, escenario, p)
+        duracion_calculo_ms = (time.perf_counter() - t0) * 1000
+
+        def enteros(clave: str) -> List[int]:
+            return _redondear(r[clave]).astype(np.int64).tolist()
+
+        columnas = {c: enteros(c) for c in (
+            "gratificacion", "total_haberes", "indemnizacion_anios", "mes_aviso",
+            "vacaciones_proporcionales", "total_finiquito"
+        )}
+        anios = np.round(r["anios_servicio"], 4).tolist()
+        anios_indem = np.round(r["anios_indemnizacion"], 4).tolist()
+        corridos = np.round(r["dias_corridos"], 2).tolist()
+
+        resultados = []
+        for i, t in enumerate(trabajadores):
+            base = {
+                "rut": t["rut"],
+                "nombre_trabajador": t["nombre_trabajador"],
+                "fecha_ingreso": t["fecha_ingreso"],
+                "cod_area": t["cod_area"],
+                "nombre_area": t["nombre_area"],
+                "advertencias": advertencias[i],
+            }
+            if t["fecha_ingreso"] is None and errores[i] is None:
+                errores[i] = "Sin fecha de ingreso"
+            if errores[i] is not None:
+                resultados.append(FiniquitoCalculoResultado(ok=False, error=errores[i], **base))
+                continue
+            resultados.append(FiniquitoCalculoResultado(
+                ok=True,
+                sueldo_base=int(sueldo_base[i]),
+                fuente_sueldo=fuentes[i],
+                promedio_variable=int(variable[i]),
+                anios_servicio=anios[i],
+                anios_indemnizacion=anios_indem[i],
+                dias_vacaciones=float(dias_vacaciones[i]),
+                dias_corridos=corridos[i],
+                descuentos=int(_redondear(descuentos[i])),
+                **{c: columnas[c][i] for c in columnas},
+                **base
+            ))
+        return resultados, duracion_calculo_ms
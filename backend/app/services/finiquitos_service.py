@@ -1,5 +1,13 @@
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Awaitable, Tuple, Iterator
+from itertools import groupby
+from datetime import date as date_type
+from decimal import Decimal
+import asyncio
+import csv
+import io
+import json
+import time
 import httpx
 
 from app.repositories.finiquitos_repository import FiniquitosRepository
@@ -10,11 +18,17 @@ from app.schemas.finiquitos import (
     EmployeeVacationsResponse,
     EmployeeSueldoResponse,
     VacacionesDisponiblesResponse,
-    VacationItem
+    VacacionesLoteItem,
+    VacacionesLoteResponse,
+    VacationItem,
+    FuenteEstado,
+    FiniquitoCompletoResponse
 )
-from app.core.exceptions import FiniquitoNotFoundError
+from app.core.exceptions import FiniquitoNotFoundError, BukNoDisponibleError, ServicioSaturadoError
 from app.core.logging_config import logger
 from app.core.config import settings
+from app.core.buk_client import buk_client
+from app.core.concurrency import run_sync
 
 
 class FiniquitosService:
@@ -33,6 +47,87 @@ class FiniquitosService:
     #     logger.info(f"Obteniendo items variables por rut: {rut}, variable: {variable}")
     #     return self.repository.get_item_variable_by_rut(rut, variable)
 
+    def get_items_cinco_meses(self, formato: str = "ndjson", empleados_por_bloque: int = 50) -> Iterator[str]:
+        """
+        Reporte masivo de los últimos 5 periodos de liquidación de los trabajadores activos.
+        
+        Genera el reporte por bloques de texto a medida que se leen las filas,
+        agrupadas por trabajador, sin mantener todo el historial en memoria.
+        
+        Args:
+            formato: "ndjson" (un objeto JSON por trabajador con sus periodos e items)
+                     o "csv" (una fila por item, ordenada por trabajador y periodo)
+            empleados_por_bloque: Trabajadores acumulados antes de emitir un bloque
+        """
+        logger.info(f"Generando reporte de últimos 5 periodos en formato {formato}")
+        filas = self.repository.iter_items_cinco_meses()
+        if formato == "csv":
+            yield from self._items_a_csv(filas, empleados_por_bloque)
+        else:
+            yield from self._items_a_ndjson(filas, empleados_por_bloque)
+
+    @staticmethod
+    def _valor_serializable(valor: Any) -> Any:
+        if isinstance(valor, Decimal):
+            return float(valor)
+        if isinstance(valor, date_type):
+            return valor.isoformat()
+        return valor
+
+    def _items_a_ndjson(self, filas: Iterator[Dict[str, Any]], empleados_por_bloque: int) -> Iterator[str]:
+        campos_trabajador = (
+            "rut_trabajador", "nombre_trabajador", "cargo", "fecha_ingreso",
+            "status", "cod_area", "nombre_empresa", "nombre_area"
+        )
+        bloque: List[str] = []
+        for rut, filas_trabajador in groupby(filas, key=lambda f: f["rut_trabajador"]):
+            trabajador: Dict[str, Any] = {}
+            periodos: List[Dict[str, Any]] = []
+            for periodo, filas_periodo in groupby(filas_trabajador, key=lambda f: f["periodo"]):
+                filas_periodo = list(filas_periodo)
+                if not trabajador:
+                    trabajador = {c: self._valor_serializable(filas_periodo[0][c]) for c in campos_trabajador}
+                if periodo is None:
+                    continue
+                periodos.append({
+                    "periodo": periodo,
+                    "liquidacion_id": filas_periodo[0]["liquidacion_id"],
+                    "items": [
+                        {
+                            "concepto": f["concepto"],
+                            "income_type": f["income_type"],
+                            "monto": self._valor_serializable(f["monto"])
+                        }
+                        for f in filas_periodo if f["concepto"] is not None
+                    ]
+                })
+            trabajador["periodos"] = periodos
+            bloque.append(json.dumps(trabajador, ensure_ascii=False))
+            if len(bloque) >= empleados_por_bloque:
+                yield "\n".join(bloque) + "\n"
+                bloque = []
+        if bloque:
+            yield "\n".join(bloque) + "\n"
+
+    def _items_a_csv(self, filas: Iterator[Dict[str, Any]], empleados_por_bloque: int) -> Iterator[str]:
+        columnas = [
+            "rut_trabajador", "nombre_trabajador", "cargo", "fecha_ingreso", "status",
+            "cod_area", "nombre_empresa", "nombre_area", "periodo", "liquidacion_id",
+            "income_type", "concepto", "monto"
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columnas)
+        for i, (_, filas_trabajador) in enumerate(groupby(filas, key=lambda f: f["rut_trabajador"]), start=1):
+            for fila in filas_trabajador:
+                writer.writerow([self._valor_serializable(fila[c]) for c in columnas])
+            if i % empleados_por_bloque == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.getvalue():
+            yield buffer.getvalue()
+
     def get_descuentos_finiquitos_by_rut(self, rut: str) -> List[FiniquitoItemResponse]:
         """Obtiene los descuentos de finiquito por RUT, filtrando por conceptos específicos"""
         logger.info(f"Obteniendo descuentos de finiquito por rut: {rut}")
@@ -62,38 +157,31 @@ class FiniquitosService:
         if not settings.BUK_API_KEY:
             logger.error("CRITICAL: BUK_API_KEY no está configurada o está vacía.")
 
-        # Construir URL con parámetro de fecha si está disponible
-        url = f"{settings.BUK_API_BASE_URL}/employees/{rut}/vacations_available"
-        if date:
-            url += f"?date={date}"
-            
-        headers = {
-            "auth_token": settings.BUK_API_KEY,
-            "Content-Type": "application/json"
-        }
+        # Agregar parámetro de fecha si está disponible
+        params = {"date": date} if date else None
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
-                
-                # Parsear respuesta de la API externa
-                employee_response = EmployeeVacationsResponse(**data)
-                
-                # Calcular total de días disponibles sumando todas las vacaciones
-                total_dias = sum(vacation.stock for vacation in employee_response.vacations)
-                
-                # Retornar respuesta simplificada para el frontend
-                return VacacionesDisponiblesResponse(
-                    employee_id=employee_response.employee_id,
-                    full_name=employee_response.full_name,
-                    vacations=employee_response.vacations,
-                    total_dias_disponibles=total_dias
-                )
+            data = await buk_client.get_json(
+                "vacations_available", f"/employees/{rut}/vacations_available", params
+            )
+            logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
+            
+            # Parsear respuesta de la API externa
+            employee_response = EmployeeVacationsResponse(**data)
+            
+            # Calcular total de días disponibles sumando todas las vacaciones
+            total_dias = sum(vacation.stock for vacation in employee_response.vacations)
+            
+            # Retornar respuesta simplificada para el frontend
+            return VacacionesDisponiblesResponse(
+                employee_id=employee_response.employee_id,
+                full_name=employee_response.full_name,
+                vacations=employee_response.vacations,
+                total_dias_disponibles=total_dias
+            )
                 
+        except BukNoDisponibleError:
+            raise
         except httpx.HTTPStatusError as e:
             logger.error(f"Error HTTP al consultar vacaciones para rut {rut}: {e.response.status_code}")
             raise Exception(f"Error al consultar API de vacaciones: {e.response.status_code}")
@@ -104,6 +192,53 @@ class FiniquitosService:
             logger.error(f"Error inesperado al consultar vacaciones para rut {rut}: {str(e)}")
             raise Exception(f"Error inesperado: {str(e)}")
     
+    async def get_vacaciones_disponibles_lote(
+        self, 
+        ruts: List[str], 
+        date: Optional[str] = None
+    ) -> VacacionesLoteResponse:
+        """
+        Consulta las vacaciones disponibles de muchos trabajadores en paralelo.
+        
+        Las llamadas a BUK usan el cliente compartido, que aplica el presupuesto
+        de llamadas por segundo de todo el proceso (BUK_RATE_LIMIT_PER_SECOND);
+        aquí solo se limita la concurrencia del lote con un semáforo
+        (BUK_MAX_CONCURRENCY). Un error en un RUT no aborta el lote:
+        se informa en su resultado individual.
+        
+        Args:
+            ruts: Lista de RUTs (con o sin puntos). Los duplicados se consultan una vez.
+            date: Fecha opcional para proyección de vacaciones (formato YYYY-MM-DD)
+        """
+        inicio = time.perf_counter()
+        ruts_limpios = list(dict.fromkeys(r.replace(".", "").strip() for r in ruts if r and r.strip()))
+        logger.info(f"Consulta masiva de vacaciones para {len(ruts_limpios)} ruts, fecha: {date}")
+        
+        semaforo = asyncio.Semaphore(settings.BUK_MAX_CONCURRENCY)
+        
+        async def consultar(rut: str) -> VacacionesLoteItem:
+            async with semaforo:
+                try:
+                    data = await self.get_vacaciones_disponibles(rut, date)
+                    return VacacionesLoteItem(rut=rut, ok=True, data=data)
+                except Exception as e:
+                    detalle = e.detail if isinstance(e, BukNoDisponibleError) else str(e)
+                    return VacacionesLoteItem(rut=rut, ok=False, error=detalle)
+        
+        resultados = await asyncio.gather(*(consultar(rut) for rut in ruts_limpios))
+        
+        exitosos = sum(1 for r in resultados if r.ok)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        logger.info(f"Consulta masiva de vacaciones terminada: {exitosos}/{len(resultados)} en {duracion_ms:.0f} ms")
+        
+        return VacacionesLoteResponse(
+            total=len(resultados),
+            exitosos=exitosos,
+            fallidos=len(resultados) - exitosos,
+            duracion_ms=round(duracion_ms, 1),
+            resultados=resultados
+        )
+    
     async def get_sueldo_base(self, rut: str) -> EmployeeSueldoResponse:
         """
         Obtiene el sueldo base de un trabajador desde la API externa de BUK.
@@ -123,38 +258,30 @@ class FiniquitosService:
         if not settings.BUK_API_KEY:
             logger.error("CRITICAL: BUK_API_KEY no está configurada o está vacía.")
 
-        url = f"{settings.BUK_API_BASE_URL}/employees/{rut}"
-        headers = {
-            "auth_token": settings.BUK_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
-                
-                # Parsear respuesta de la API externa
-                # La API de empleados devuelve los datos envueltos en "data"
-                employee_data = data.get("data", data)
-                
-                employee_response = EmployeeSueldoResponse(**employee_data)
-                
-                # Extraer sueldo base desde current_job si existe
-                base_wage = None
-                if "current_job" in employee_data and employee_data["current_job"]:
-                    base_wage = employee_data["current_job"].get("base_wage")
-                
-                # Retornar respuesta simplificada para el frontend
-                return EmployeeSueldoResponse(
-                    person_id=employee_response.person_id,
-                    full_name=employee_response.full_name,
-                    base_wage=base_wage
-                )
-                
+            data = await buk_client.get_json("employee", f"/employees/{rut}")
+            logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
+            
+            # Parsear respuesta de la API externa
+            # La API de empleados devuelve los datos envueltos en "data"
+            employee_data = data.get("data", data)
+            
+            employee_response = EmployeeSueldoResponse(**employee_data)
+            
+            # Extraer sueldo base desde current_job si existe
+            base_wage = None
+            if "current_job" in employee_data and employee_data["current_job"]:
+                base_wage = employee_data["current_job"].get("base_wage")
+            
+            # Retornar respuesta simplificada para el frontend
+            return EmployeeSueldoResponse(
+                person_id=employee_response.person_id,
+                full_name=employee_response.full_name,
+                base_wage=base_wage
+            )
+            
+        except BukNoDisponibleError:
+            raise
         except httpx.HTTPStatusError as e:
             logger.error(f"Error HTTP al consultar sueldo base para rut {rut}: {e.response.status_code}")
             raise Exception(f"Error al consultar API de sueldo base: {e.response.status_code}")
@@ -187,66 +314,58 @@ class FiniquitosService:
         if not settings.BUK_API_KEY:
             logger.error("CRITICAL: BUK_API_KEY no está configurada o está vacía.")
 
-        url = f"{settings.BUK_API_BASE_URL}/employees/{rut}/payroll_detail"
-        headers = {
-            "auth_token": settings.BUK_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
-                
-                # Parsear respuesta de la API externa
-                # La API de empleados devuelve los datos envueltos en "data"
-                employee_data = data.get("data", data)
-                
-                # Si employee_data es una lista (posiblemente múltiples liquidaciones), tomamos la primera
-                if isinstance(employee_data, list):
-                    if employee_data:
-                        employee_data = employee_data[0]
-                    else:
-                        logger.warning(f"No se encontraron datos de liquidación para rut: {rut}")
-                        return []
-                
-                # Buscar en lines_settlement
-                lines = employee_data.get("lines_settlement", [])
-                descuentos_encontrados = []
-                
-                logger.info(f"Procesando {len(lines)} líneas de liquidación para encontrar descuentos")
-                
-                target_discounts = ["Descuento Por Planilla", "Prestamo Interno"]
+            data = await buk_client.get_json("payroll_detail", f"/employees/{rut}/payroll_detail")
+            logger.info(f"Respuesta exitosa de API BUK para rut: {rut}")
+            
+            # Parsear respuesta de la API externa
+            # La API de empleados devuelve los datos envueltos en "data"
+            employee_data = data.get("data", data)
+            
+            # Si employee_data es una lista (posiblemente múltiples liquidaciones), tomamos la primera
+            if isinstance(employee_data, list):
+                if employee_data:
+                    employee_data = employee_data[0]
+                else:
+                    logger.warning(f"No se encontraron datos de liquidación para rut: {rut}")
+                    return []
+            
+            # Buscar en lines_settlement
+            lines = employee_data.get("lines_settlement", [])
+            descuentos_encontrados = []
+            
+            logger.info(f"Procesando {len(lines)} líneas de liquidación para encontrar descuentos")
+            
+            target_discounts = ["Descuento Por Planilla", "Prestamo Interno"]
+            
+            for line in lines:
+                line_name = line.get("name", "")
+                # Verificar si es uno de los descuentos buscados
+                # Usamos coincidencia exacta o "contains" según sea más robusto. 
+                # El usuario pidió buscar "exacto" o muy específico, pero un contains es más seguro ante variaciones.
+                # Sin embargo, el requerimiento dice: buscar "name": "Descuento Por Planilla"
                 
-                for line in lines:
-                    line_name = line.get("name", "")
-                    # Verificar si es uno de los descuentos buscados
-                    # Usamos coincidencia exacta o "contains" según sea más robusto. 
-                    # El usuario pidió buscar "exacto" o muy específico, pero un contains es más seguro ante variaciones.
-                    # Sin embargo, el requerimiento dice: buscar "name": "Descuento Por Planilla"
+                if line_name in target_discounts:
+                    amount = line.get("amount", 0)
+                    description = line.get("description", "") or line_name
                     
-                    if line_name in target_discounts:
-                        amount = line.get("amount", 0)
-                        description = line.get("description", "") or line_name
-                        
-                        logger.info(f"Descuento encontrado: {line_name}, Monto: {amount}")
-                        
-                        # Mapear a FiniquitoItemResponse
-                        item = FiniquitoItemResponse(
-                            rut_trabajador=rut,
-                            concepto=line_name,  # Usamos el nombre como concepto/descripción principal
-                            detalle=description, # Descripción detallada (e.g. "Cuota 1/3")
-                            monto=amount,
-                            income_type="descuento", # Marcamos como descuento
-                            periodo="Actual" # Indica que viene de la liquidación actual
-                        )
-                        descuentos_encontrados.append(item)
-                
-                return descuentos_encontrados
-                
+                    logger.info(f"Descuento encontrado: {line_name}, Monto: {amount}")
+                    
+                    # Mapear a FiniquitoItemResponse
+                    item = FiniquitoItemResponse(
+                        rut_trabajador=rut,
+                        concepto=line_name,  # Usamos el nombre como concepto/descripción principal
+                        detalle=description, # Descripción detallada (e.g. "Cuota 1/3")
+                        monto=amount,
+                        income_type="descuento", # Marcamos como descuento
+                        periodo="Actual" # Indica que viene de la liquidación actual
+                    )
+                    descuentos_encontrados.append(item)
+            
+            return descuentos_encontrados
+            
+        except BukNoDisponibleError:
+            raise
         except httpx.HTTPStatusError as e:
             logger.error(f"Error HTTP al consultar descuentos para rut {rut}: {e.response.status_code}")
             raise Exception(f"Error al consultar API de descuentos: {e.response.status_code}")
@@ -255,4 +374,51 @@ class FiniquitosService:
             raise Exception(f"Error de conexión con API de descuentos: {str(e)}")
         except Exception as e:
             logger.error(f"Error inesperado al consultar descuentos para rut {rut}: {str(e)}")
-            raise Exception(f"Error inesperado: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error inesperado: {str(e)}")
+    
+    async def get_finiquito_completo(self, rut: str, date: Optional[str] = None) -> FiniquitoCompletoResponse:
+        """
+        Reúne en una sola respuesta los datos para armar un finiquito.
+        
+        La consulta a BD (items de sueldo) corre en un hilo de trabajo y las tres
+        consultas a BUK (sueldo base, vacaciones y descuentos) en paralelo, por lo
+        que la latencia total es la de la fuente más lenta. Si una fuente falla,
+        el resto se retorna igual y el error queda informado en `fuentes`.
+        
+        Args:
+            rut: RUT del trabajador
+            date: Fecha opcional para proyección de vacaciones (formato YYYY-MM-DD)
+        """
+        logger.info(f"Consultando datos completos de finiquito para rut: {rut}")
+        inicio = time.perf_counter()
+        rut_buk = rut.replace(".", "").strip()
+        
+        async def medir(fuente: str, tarea: Awaitable[Any]) -> Tuple[str, Any, FuenteEstado]:
+            t0 = time.perf_counter()
+            try:
+                resultado = await tarea
+                estado = FuenteEstado(ok=True, duracion_ms=round((time.perf_counter() - t0) * 1000, 1))
+                return fuente, resultado, estado
+            except Exception as e:
+                detalle = e.detail if isinstance(e, (BukNoDisponibleError, ServicioSaturadoError)) else str(e)
+                logger.error(f"Fuente '{fuente}' falló para rut {rut}: {detalle}")
+                estado = FuenteEstado(ok=False, duracion_ms=round((time.perf_counter() - t0) * 1000, 1), error=detalle)
+                return fuente, None, estado
+        
+        resultados = await asyncio.gather(
+            medir("items", run_sync(self.get_item_by_rut, rut)),
+            medir("sueldo", self.get_sueldo_base(rut_buk)),
+            medir("vacaciones", self.get_vacaciones_disponibles(rut_buk, date)),
+            medir("descuentos", self.get_descuentos_by_rut_finiquito(rut_buk)),
+        )
+        datos = {fuente: resultado for fuente, resultado, _ in resultados}
+        
+        return FiniquitoCompletoResponse(
+            rut=rut,
+            items=datos["items"] or [],
+            sueldo=datos["sueldo"],
+            vacaciones=datos["vacaciones"],
+            descuentos=datos["descuentos"] or [],
+            fuentes={fuente: estado for fuente, _, estado in resultados},
+            duracion_total_ms=round((time.perf_counter() - inicio) * 1000, 1)
+        )
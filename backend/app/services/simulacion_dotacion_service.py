@@ -0,0 +1,383 @@
+"""
+Simulación de remuneraciones de toda la dotación activa (trabajo en segundo plano).
+
+Para cada trabajador vigente (`get_trabajadores_general`) se consulta el
+sueldo base en BUK y se proyecta el líquido y el costo empleador con la
+calculadora, bajo un escenario what-if de UF y sueldo mínimo.
+
+Flujo:
+- Los trabajadores se procesan en bloques. Mientras un bloque se simula en el
+  pool de procesos, ya se están consultando en BUK los sueldos del siguiente.
+- Los resultados se escriben a un CSV local a medida que avanzan; al terminar
+  se renombra de `.parcial` a `.csv` y queda disponible para descarga.
+- El progreso se consulta por id y la simulación se puede cancelar entre bloques.
+- Las simulaciones terminadas y sus CSV se borran al cumplir
+  SIMULACION_DOTACION_RETENCION_HORAS, o antes si hay más de
+  SIMULACION_DOTACION_MAX_TERMINADAS (primero las más antiguas). También se
+  borran los CSV viejos que quedaron de procesos anteriores.
+- El archivo se abre, escribe, cierra y renombra con asyncio.to_thread: la
+  escritura no ocupa el bulkhead de Licencias (run_sync), que queda para la BD.
+
+El registro de simulaciones vive en la memoria del proceso: solo sirve con un
+worker de uvicorn. Con varios, el progreso, la cancelación y la descarga
+responden 404 si el request cae en un worker distinto del que la lanzó.
+"""
+import asyncio
+import csv
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.calculadora_parametros import compilar_desde_datos, registro_parametros
+from app.core.concurrency import run_in_process, run_sync
+from app.core.config import settings
+from app.core.exceptions import SimulacionNoEncontradaError
+from app.core.logging_config import logger
+from app.db.session import SessionLocal
+from app.schemas.calculadora import SimulacionDotacionEstado, SimulacionDotacionRequest
+from app.services.calculadora_lote_service import CalculadoraLoteService
+from app.services.finiquitos_service import FiniquitosService
+
+DIRECTORIO_POR_DEFECTO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "simulaciones"
+)
+
+COLUMNAS_CSV = [
+    "rut", "nombre", "cargo", "sueldo_base", "movilizacion", "bonos_imponibles",
+    "gratificacion", "imponible", "cotizacion_previsional", "cotizacion_salud", "cesantia",
+    "impuesto", "sueldo_liquido", "aporte_cesantia_empleador", "sis", "mutual", "costo_empleador",
+    "error",
+]
+
+
+def simular_bloque(
+    sueldos: List[float],
+    movilizaciones: List[float],
+    bonos: List[float],
+    datos_parametros: Dict[str, Any],
+    afp_nombre: str,
+    salud_sistema: str,
+    salud_uf: float,
+) -> Dict[str, List[int]]:
+    """
+    Simula un bloque de trabajadores (se ejecuta en el pool de procesos).
+
+    Recibe y retorna solo listas y dicts para que viajen con pickle; los
+    parámetros se compilan dentro del proceso.
+    """
+    p = compilar_desde_datos(datos_parametros)
+    n = len(sueldos)
+    col = {
+        "movilizacion": np.asarray(movilizaciones, dtype=float),
+        "tasa_afp": np.full(n, p.tasa_afp(afp_nombre)),
+        "fonasa": np.full(n, salud_sistema == 'fonasa'),
+        "plan_isapre": np.full(n, 0.0 if salud_sistema == 'fonasa' else salud_uf * p.uf),
+        "bonos_imp": np.asarray(bonos, dtype=float),
+        "bonos_no_imp": np.zeros(n),
+    }
+    r = CalculadoraLoteService().simular_arrays(np.asarray(sueldos, dtype=float), col, p)
+
+    # Aportes del empleador sobre el imponible con sus topes
+    afecto_afp = np.minimum(r['imp'], p.tope_afp_salud)
+    afecto_cesantia = np.minimum(r['imp'], p.tope_cesantia)
+    aporte_cesantia = afecto_cesantia * p.tasa_cesantia_empleador
+    sis = afecto_afp * p.tasa_sis
+    mutual = afecto_afp * p.tasa_mutual
+    costo = r['hab'] + aporte_cesantia + sis + mutual
+
+    def enteros(valores: np.ndarray) -> List[int]:
+        return np.round(valores).astype(np.int64).tolist()
+
+    return {
+        "gratificacion": enteros(r['grat']),
+        "imponible": enteros(r['imp']),
+        "cotizacion_previsional": enteros(r['afp']),
+        "cotizacion_salud": enteros(r['salud']),
+        "cesantia": enteros(r['ces']),
+        "impuesto": enteros(r['tax']),
+        "sueldo_liquido": enteros(r['liquido']),
+        "aporte_cesantia_empleador": enteros(aporte_cesantia),
+        "sis": enteros(sis),
+        "mutual": enteros(mutual),
+        "costo_empleador": enteros(costo),
+    }
+
+
+class TrabajoSimulacion:
+    """Estado en memoria de una simulación."""
+
+    def __init__(self, escenario: SimulacionDotacionRequest):
+        self.id = uuid.uuid4().hex
+        self.escenario = escenario
+        self.estado = "pendiente"
+        self.fase: Optional[str] = None
+        self.total = 0
+        self.procesados = 0
+        self.errores = 0
+        self.creada = datetime.now()
+        self.terminada: Optional[datetime] = None
+        self.archivo: Optional[str] = None
+        self.resumen: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.cancelar = asyncio.Event()
+        self.tarea: Optional[asyncio.Task] = None
+
+    @property
+    def activa(self) -> bool:
+        return self.estado in ("pendiente", "ejecutando")
+
+    def a_estado(self) -> SimulacionDotacionEstado:
+        return SimulacionDotacionEstado(
+            id=self.id,
+            estado=self.estado,
+            fase=self.fase,
+            total=self.total,
+            procesados=self.procesados,
+            errores=self.errores,
+            porcentaje=round(100 * (self.procesados + self.errores) / self.total, 1) if self.total else 0.0,
+            creada=self.creada,
+            terminada=self.terminada,
+            escenario=self.escenario,
+            resumen=self.resumen,
+            error=self.error
+        )
+
+
+class SimulacionDotacionService:
+    """Registro de simulaciones del proceso y su ejecución."""
+
+    def __init__(self):
+        self.trabajos: Dict[str, TrabajoSimulacion] = {}
+
+    @staticmethod
+    def _directorio() -> str:
+        return settings.SIMULACION_DOTACION_DIR or DIRECTORIO_POR_DEFECTO
+
+    def _purgar(self) -> None:
+        """Borra las simulaciones terminadas vencidas o que exceden el máximo, con sus archivos."""
+        retencion = timedelta(hours=settings.SIMULACION_DOTACION_RETENCION_HORAS)
+        limite = datetime.now() - retencion
+        terminadas = sorted(
+            (t for t in self.trabajos.values() if not t.activa and t.terminada is not None),
+            key=lambda t: t.terminada,
+            reverse=True
+        )
+        for i, trabajo in enumerate(terminadas):
+            if trabajo.terminada < limite or i >= settings.SIMULACION_DOTACION_MAX_TERMINADAS:
+                del self.trabajos[trabajo.id]
+                if trabajo.archivo is not None:
+                    self._borrar_archivo(trabajo.archivo)
+
+        # CSV de procesos anteriores (el registro vive en memoria y no los conoce)
+        conocidos = {t.archivo for t in self.trabajos.values()}
+        corte = time.time() - retencion.total_seconds()
+        for ruta in glob.glob(os.path.join(self._directorio(), "simulacion_*.csv")):
+            try:
+                vencido = os.path.getmtime(ruta) < corte
+            except OSError:
+                continue
+            if vencido and ruta not in conocidos:
+                self._borrar_archivo(ruta)
+
+    @staticmethod
+    def _borrar_archivo(ruta: str) -> None:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"No se pudo borrar el resultado de simulación {ruta}: {e}")
+
+    def iniciar(self, escenario: SimulacionDotacionRequest) -> TrabajoSimulacion:
+        """Valida el escenario y lanza la simulación en segundo plano."""
+        self._purgar()
+        activas = sum(1 for t in self.trabajos.values() if t.activa)
+        if activas >= settings.SIMULACION_DOTACION_MAX_ACTIVAS:
+            raise ValueError(f"Ya hay {activas} simulaciones en ejecución")
+
+        # Se compila acá para rechazar escenarios inválidos antes de encolar
+        datos_parametros = registro_parametros.datos_version(escenario.fecha)
+        if escenario.valor_uf is not None:
+            datos_parametros["valor_uf"] = escenario.valor_uf
+        if escenario.sueldo_minimo is not None:
+            datos_parametros["sueldo_minimo"] = escenario.sueldo_minimo
+        compilar_desde_datos(datos_parametros)
+
+        trabajo = TrabajoSimulacion(escenario)
+        self.trabajos[trabajo.id] = trabajo
+        trabajo.tarea = asyncio.create_task(self._ejecutar(trabajo, datos_parametros))
+        return trabajo
+
+    def obtener(self, simulacion_id: str) -> TrabajoSimulacion:
+        trabajo = self.trabajos.get(simulacion_id)
+        if trabajo is None:
+            raise SimulacionNoEncontradaError(simulacion_id)
+        return trabajo
+
+    def listar(self) -> List[TrabajoSimulacion]:
+        self._purgar()
+        return sorted(self.trabajos.values(), key=lambda t: t.creada, reverse=True)
+
+    def cancelar(self, simulacion_id: str) -> TrabajoSimulacion:
+        """Pide la cancelación; se hace efectiva al terminar el bloque en curso."""
+        trabajo = self.obtener(simulacion_id)
+        if trabajo.activa:
+            trabajo.cancelar.set()
+        return trabajo
+
+    async def cancelar_todas(self) -> None:
+        """Cancela las simulaciones en curso y espera a que terminen (al apagar el worker)."""
+        activos = [t for t in self.trabajos.values() if t.tarea is not None and not t.tarea.done()]
+        for trabajo in activos:
+            trabajo.cancelar.set()
+            trabajo.tarea.cancel()
+        await asyncio.gather(*(t.tarea for t in activos), return_exceptions=True)
+
+    @staticmethod
+    def _cargar_trabajadores() -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return FiniquitosService(db).get_trabajadores_general()
+        finally:
+            db.close()
+
+    async def _consultar_sueldos(
+        self, bloque: List[Dict[str, Any]], semaforo: asyncio.Semaphore
+    ) -> List[Tuple[Optional[float], Optional[str]]]:
+        """(sueldo_base, error) por trabajador, consultando BUK en paralelo (buk_client aplica el presupuesto por segundo)."""
+        finiquitos = FiniquitosService(None)  # get_sueldo_base solo usa BUK, no la BD
+
+        async def consultar(trabajador: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+            rut = str(trabajador["rut_trabajador"]).replace(".", "").strip()
+            async with semaforo:
+                try:
+                    respuesta = await finiquitos.get_sueldo_base(rut)
+                except Exception as e:
+                    return None, getattr(e, "detail", None) or str(e)
+            if not respuesta.base_wage:
+                return None, "Sin sueldo base en BUK"
+            return float(respuesta.base_wage), None
+
+        return await asyncio.gather(*(consultar(t) for t in bloque))
+
+    async def _ejecutar(self, trabajo: TrabajoSimulacion, datos_parametros: Dict[str, Any]) -> None:
+        escenario = trabajo.escenario
+        await asyncio.to_thread(os.makedirs, self._directorio(), exist_ok=True)
+        ruta_parcial = os.path.join(self._directorio(), f"simulacion_{trabajo.id}.parcial")
+        ruta_final = os.path.join(self._directorio(), f"simulacion_{trabajo.id}.csv")
+        archivo = None
+        pendiente: Optional[Tuple[List[Dict[str, Any]], list, asyncio.Future]] = None
+        totales = {"sueldo_base": 0, "sueldo_liquido": 0, "costo_empleador": 0}
+
+        def escribir(filas: List[List[Any]]) -> None:
+            csv.writer(archivo).writerows(filas)
+            archivo.flush()
+
+        async def volcar(bloque, sueldos, futuro) -> None:
+            """Espera la simulación del bloque y escribe sus filas."""
+            resultado = await futuro
+            filas, j, errores = [], 0, 0
+            for trabajador, (sueldo, error) in zip(bloque, sueldos):
+                base = [trabajador.get("rut_trabajador"), trabajador.get("nombre_trabajador"), trabajador.get("cargo")]
+                if error is not None:
+                    filas.append(base + [""] * (len(COLUMNAS_CSV) - 4) + [error])
+                    errores += 1
+                    continue
+                valores = {k: v[j] for k, v in resultado.items()}
+                j += 1
+                filas.append(base + [
+                    round(sueldo), round(trabajador.get("movilizacion") or 0),
+                    round(trabajador.get("bonificaciones_mensuales") or 0),
+                ] + [valores[c] for c in COLUMNAS_CSV[6:-1]] + [""])
+                totales["sueldo_base"] += round(sueldo)
+                totales["sueldo_liquido"] += valores["sueldo_liquido"]
+                totales["costo_empleador"] += valores["costo_empleador"]
+            await asyncio.to_thread(escribir, filas)
+            trabajo.procesados += len(bloque) - errores
+            trabajo.errores += errores
+
+        try:
+            trabajo.estado = "ejecutando"
+            trabajo.fase = "cargando_trabajadores"
+            trabajadores = await run_sync(self._cargar_trabajadores)
+            trabajo.total = len(trabajadores)
+            logger.info(f"Simulación de dotación {trabajo.id}: {trabajo.total} trabajadores")
+
+            archivo = await asyncio.to_thread(open, ruta_parcial, "w", newline="", encoding="utf-8")
+            await asyncio.to_thread(escribir, [COLUMNAS_CSV])
+
+            trabajo.fase = "simulando"
+            semaforo = asyncio.Semaphore(settings.BUK_MAX_CONCURRENCY)
+            tamano = max(1, settings.SIMULACION_DOTACION_TAMANO_BLOQUE)
+
+            for inicio in range(0, len(trabajadores), tamano):
+                if trabajo.cancelar.is_set():
+                    break
+                bloque = trabajadores[inicio:inicio + tamano]
+                sueldos = await self._consultar_sueldos(bloque, semaforo)
+                validos = [(t, s) for t, (s, e) in zip(bloque, sueldos) if e is None]
+
+                # Se escribe el bloque anterior recién ahora: su simulación corrió
+                # en paralelo con las consultas a BUK de este bloque
+                if pendiente is not None:
+                    await volcar(*pendiente)
+
+                futuro = asyncio.ensure_future(run_in_process(
+                    simular_bloque,
+                    [s for _, s in validos],
+                    [float(t.get("movilizacion") or 0) for t, _ in validos],
+                    [float(t.get("bonificaciones_mensuales") or 0) for t, _ in validos],
+                    datos_parametros,
+                    escenario.afp_nombre,
+                    escenario.salud_sistema,
+                    escenario.salud_uf,
+                ))
+                pendiente = (bloque, sueldos, futuro)
+
+            if pendiente is not None:
+                if trabajo.cancelar.is_set():
+                    pendiente[2].cancel()
+                else:
+                    await volcar(*pendiente)
+                pendiente = None
+
+            await asyncio.to_thread(archivo.close)
+            if trabajo.cancelar.is_set():
+                await asyncio.to_thread(os.remove, ruta_parcial)
+                trabajo.estado = "cancelada"
+                logger.info(
+                    f"Simulación de dotación {trabajo.id} cancelada en "
+                    f"{trabajo.procesados + trabajo.errores}/{trabajo.total}"
+                )
+            else:
+                await asyncio.to_thread(os.replace, ruta_parcial, ruta_final)
+                trabajo.archivo = ruta_final
+                trabajo.resumen = {**totales, "trabajadores_simulados": trabajo.procesados}
+                trabajo.estado = "completada"
+                logger.info(f"Simulación de dotación {trabajo.id} completada: {trabajo.resumen}")
+        except asyncio.CancelledError:
+            trabajo.estado = "cancelada"
+            raise
+        except Exception as e:
+            logger.error(f"Error en simulación de dotación {trabajo.id}: {e}")
+            trabajo.estado = "error"
+            trabajo.error = str(e)
+        finally:
+            if pendiente is not None:
+                pendiente[2].cancel()
+            if archivo is not None and not archivo.closed:
+                archivo.close()
+            if trabajo.estado != "completada" and os.path.exists(ruta_parcial):
+                os.remove(ruta_parcial)
+            trabajo.fase = None
+            trabajo.terminada = datetime.now()
+
+
+# Instancia compartida por el proceso (las simulaciones viven en memoria: un solo worker)
+simulacion_dotacion_service = SimulacionDotacionService()
@@ -0,0 +1,268 @@
+"""
+Importación masiva de usuarios (alta de un área completa desde CSV o JSON).
+
+Crear usuarios de a uno por /admin/users hashea y hace commit por cada uno.
+Aquí el lote se valida contra roles y módulos cargados una sola vez, la
+existencia de los usernames se consulta con IN por lotes, los passwords se
+hashean en paralelo en el pool de procesos y todas las filas válidas se
+guardan en una sola transacción con inserts/updates en lote.
+
+Cada fila vuelve con su estado (creado, actualizado o error); una fila
+inválida no impide importar las demás.
+"""
+import csv
+import io
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.concurrency import get_process_pool
+from app.core.config import settings
+from app.core.logging_config import logger
+from app.core.permisos import registro_permisos
+from app.core.principal import cache_principales
+from app.core.revocacion import lista_revocacion
+from app.core.security import get_password_hash
+from app.models.auth import Role, Modulo
+from app.repositories.auth_repository import AuthRepository
+from app.schemas.auth import (
+    UsuarioImportacionFila,
+    UsuarioImportacionResultado,
+    UsuarioImportacionResponse
+)
+
+SEPARADOR_MODULOS = "|"
+_VERDADERO = {"1", "true", "t", "si", "sí", "s", "x", "activo"}
+_FALSO = {"0", "false", "f", "no", "n", "inactivo"}
+
+
+def _leer_booleano(valor: str) -> Optional[bool]:
+    valor = valor.strip().lower()
+    if not valor:
+        return None
+    if valor in _VERDADERO:
+        return True
+    if valor in _FALSO:
+        return False
+    raise ValueError(f"Valor de 'activo' no reconocido: '{valor}'")
+
+
+def leer_csv_usuarios(contenido: bytes) -> Tuple[List[Optional[UsuarioImportacionFila]], Dict[int, str]]:
+    """
+    Lee un CSV de usuarios (separado por ',' o ';', con encabezado).
+
+    Columnas: username, password, email, nombre_completo, rol, modulos
+    (códigos separados por '|') y activo. Las celdas vacías quedan en None.
+
+    Returns:
+        (filas, errores): una fila por registro del CSV (None si no se pudo
+        leer) y el error de cada fila ilegible, por posición.
+
+    Raises:
+        ValueError: Si el archivo no es UTF-8 o no tiene columna username
+    """
+    try:
+        texto = contenido.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("El archivo debe estar codificado en UTF-8")
+
+    encabezado = texto.split("\n", 1)[0]
+    delimitador = ";" if encabezado.count(";") > encabezado.count(",") else ","
+    lector = csv.DictReader(io.StringIO(texto), delimiter=delimitador)
+    if "username" not in [(c or "").strip().lower() for c in lector.fieldnames or []]:
+        raise ValueError("El CSV debe tener encabezado con la columna 'username'")
+
+    filas: List[Optional[UsuarioImportacionFila]] = []
+    errores: Dict[int, str] = {}
+    for i, registro in enumerate(lector):
+        datos = {k.strip().lower(): (v or "").strip() for k, v in registro.items() if isinstance(k, str)}
+        try:
+            filas.append(UsuarioImportacionFila(
+                username=datos.get("username", ""),
+                password=datos.get("password") or None,
+                email=datos.get("email") or None,
+                nombre_completo=datos.get("nombre_completo") or None,
+                rol=datos.get("rol") or None,
+                modulos=[c.strip() for c in datos["modulos"].split(SEPARADOR_MODULOS) if c.strip()]
+                if datos.get("modulos") else None,
+                activo=_leer_booleano(datos.get("activo", "")),
+            ))
+        except (ValueError, ValidationError) as e:
+            filas.append(None)
+            errores[i] = str(e)
+    return filas, errores
+
+
+def leer_json_usuarios(contenido: bytes) -> Tuple[List[Optional[UsuarioImportacionFila]], Dict[int, str]]:
+    """
+    Lee un JSON de usuarios: lista de objetos con los campos de
+    UsuarioImportacionFila, o {"usuarios": [...]}. Retorna lo mismo que
+    leer_csv_usuarios.
+
+    Raises:
+        ValueError: Si el archivo no es JSON válido
+    """
+    datos = json.loads(contenido.decode("utf-8-sig"))
+    if isinstance(datos, dict):
+        datos = datos.get("usuarios", [])
+    if not isinstance(datos, list):
+        raise ValueError("El JSON debe ser una lista de usuarios o {\"usuarios\": [...]}")
+
+    filas: List[Optional[UsuarioImportacionFila]] = []
+    errores: Dict[int, str] = {}
+    for i, item in enumerate(datos):
+        try:
+            filas.append(UsuarioImportacionFila.model_validate(item))
+        except ValidationError as e:
+            filas.append(None)
+            errores[i] = str(e)
+    return filas, errores
+
+
+def hashear_passwords(passwords: List[str]) -> List[str]:
+    """bcrypt de cada password, repartidos en el pool de procesos."""
+    if len(passwords) <= 1:
+        return [get_password_hash(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (settings.PROCESS_POOL_MAX_WORKERS * 4))
+    return list(get_process_pool().map(get_password_hash, passwords, chunksize=chunksize))
+
+
+class UsuarioImportacionService:
+    """Alta y actualización de usuarios en lote."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.repository = AuthRepository(db)
+
+    def importar(
+        self,
+        filas: List[Optional[UsuarioImportacionFila]],
+        actualizar_existentes: bool = True,
+        errores_previos: Optional[Dict[int, str]] = None
+    ) -> UsuarioImportacionResponse:
+        """
+        Crea los usuarios nuevos y actualiza los existentes (si se permite).
+
+        Args:
+            filas: Filas a importar; None para las que no se pudieron leer
+            actualizar_existentes: Si es False, un username existente es error
+            errores_previos: Errores de lectura por posición (ej: del CSV)
+        """
+        inicio = time.perf_counter()
+        errores: Dict[int, str] = dict(errores_previos or {})
+        roles = {nombre: rol_id for rol_id, nombre in self.db.query(Role.id, Role.nombre)}
+        modulos = {codigo: modulo_id for modulo_id, codigo in self.db.query(Modulo.id, Modulo.codigo)}
+
+        # Validación contra el propio lote, roles y módulos
+        validas: List[Tuple[int, str, UsuarioImportacionFila]] = []
+        vistos = set()
+        for i, fila in enumerate(filas):
+            if fila is None or i in errores:
+                errores.setdefault(i, "Fila ilegible")
+                continue
+            username = fila.username.strip()
+            if not username:
+                errores[i] = "username vacío"
+            elif username in vistos:
+                errores[i] = f"username '{username}' repetido en la importación"
+            elif fila.rol is not None and fila.rol not in roles:
+                errores[i] = f"Rol '{fila.rol}' no existe"
+            elif any(c not in modulos for c in fila.modulos or []):
+                desconocidos = sorted({c for c in fila.modulos if c not in modulos})
+                errores[i] = f"Módulos no existen: {', '.join(desconocidos)}"
+            else:
+                validas.append((i, username, fila))
+            vistos.add(username)
+
+        existentes = self.repository.get_user_ids_by_usernames(u for _, u, _ in validas)
+        nuevas: List[Tuple[int, str, UsuarioImportacionFila]] = []
+        actualizaciones: List[Tuple[int, str, UsuarioImportacionFila]] = []
+        for i, username, fila in validas:
+            if username in existentes:
+                if actualizar_existentes:
+                    actualizaciones.append((i, username, fila))
+                else:
+                    errores[i] = f"El usuario '{username}' ya existe"
+            elif fila.password is None:
+                errores[i] = "password es obligatorio para usuarios nuevos"
+            elif fila.rol is None:
+                errores[i] = "rol es obligatorio para usuarios nuevos"
+            else:
+                nuevas.append((i, username, fila))
+
+        con_password = [(i, fila.password) for i, _, fila in nuevas + actualizaciones if fila.password]
+        hashes = dict(zip((i for i, _ in con_password), hashear_passwords([p for _, p in con_password])))
+
+        filas_insert = [
+            {
+                "username": username,
+                "password_hash": hashes[i],
+                "email": fila.email,
+                "nombre_completo": fila.nombre_completo,
+                "rol_id": roles[fila.rol],
+                "activo": fila.activo if fila.activo is not None else True,
+            }
+            for i, username, fila in nuevas
+        ]
+        filas_update = []
+        for i, username, fila in actualizaciones:
+            cambios = {
+                campo: valor for campo, valor in (
+                    ("email", fila.email),
+                    ("nombre_completo", fila.nombre_completo),
+                    ("rol_id", roles[fila.rol] if fila.rol is not None else None),
+                    ("activo", fila.activo),
+                    ("password_hash", hashes.get(i)),
+                ) if valor is not None
+            }
+            if cambios:
+                filas_update.append({"id": existentes[username], **cambios})
+
+        try:
+            ids = self.repository.bulk_insert_users(filas_insert)
+            ids.update(existentes)
+            self.repository.bulk_update_users(filas_update)
+            modulos_por_usuario = {
+                ids[username]: [modulos[c] for c in fila.modulos]
+                for _, username, fila in nuevas + actualizaciones if fila.modulos is not None
+            }
+            self.repository.replace_users_modules(modulos_por_usuario)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        for _, username, fila in actualizaciones:
+            cache_principales.invalidar_usuario(username)
+            if fila.activo is False:
+                lista_revocacion.revocar_usuario(username)
+        if modulos_por_usuario:
+            registro_permisos.reconstruir(self.db)
+
+        estados = {i: "creado" for i, _, _ in nuevas}
+        estados.update((i, "actualizado") for i, _, _ in actualizaciones)
+        resultados = [
+            UsuarioImportacionResultado(
+                fila=i + 1,
+                username=fila.username.strip() if fila is not None else None,
+                estado="error" if i in errores else estados[i],
+                error=errores.get(i),
+            )
+            for i, fila in enumerate(filas)
+        ]
+
+        logger.info(
+            f"Importación de usuarios: {len(nuevas)} creados, {len(actualizaciones)} actualizados, "
+            f"{len(errores)} con error"
+        )
+        return UsuarioImportacionResponse(
+            total=len(filas),
+            creados=len(nuevas),
+            actualizados=len(actualizaciones),
+            errores=len(errores),
+            duracion_ms=round((time.perf_counter() - inicio) * 1000, 1),
+            resultados=resultados,
+        )
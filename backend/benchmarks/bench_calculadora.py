@@ -0,0 +1,296 @@
+"""
+Suite de benchmarks de la calculadora de sueldos, con salida JSON.
+
+Grupos:
+- micro: calcular_impuesto_unico, simular_liquido y resolver_sueldo_base
+  (solver exacto, bisección y la llamada pública con memo frío/caliente).
+- macro: POST /api/v1/calculadora/calcular completo (validación pydantic,
+  serialización, TestClient) sobre una app mínima que monta solo el router
+  de la calculadora.
+- tramos: barrido de líquidos objetivo alrededor de cada límite de tramo de
+  impuesto, para varios perfiles de trabajador.
+
+Antes de medir se verifica que el sueldo base resuelto reproduzca el líquido
+objetivo (solver exacto y bisección) en todo el barrido; si alguna
+verificación falla el script termina con código 1 sin escribir resultados.
+
+Uso:
+    cd backend
+    python benchmarks/bench_calculadora.py --salida bench.json
+    python benchmarks/bench_calculadora.py --comparar bench.json --umbral 0.15
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.calculadora_parametros import registro_parametros
+from app.schemas.calculadora import CalculoRequest
+from app.services.calculadora_service import CalculadoraService, memo_calculadora
+
+# Tolerancias de la verificación (pesos)
+TOL_EXACTO = 0.01
+TOL_BISECCION = 1.0
+
+PERFILES = {
+    "fonasa": {"movilizacion": 40000, "afp_nombre": "Habitat", "salud_sistema": "fonasa", "salud_uf": 0.0, "bonos": []},
+    "isapre": {"movilizacion": 40000, "afp_nombre": "Capital", "salud_sistema": "isapre", "salud_uf": 4.2, "bonos": []},
+    "bonos": {
+        "movilizacion": 60000, "afp_nombre": "Uno", "salud_sistema": "isapre", "salud_uf": 2.5,
+        "bonos": [
+            {"nombre": "Turno", "monto": 85000, "imponible": True},
+            {"nombre": "Colación", "monto": 50000, "imponible": False},
+        ],
+    },
+}
+
+
+def ns_por_llamada(func, args_list, repeticiones: int) -> float:
+    n = len(args_list)
+
+    def correr():
+        for args in args_list:
+            func(*args)
+
+    mejor = min(timeit.repeat(correr, number=1, repeat=repeticiones))
+    return mejor / n * 1e9
+
+
+def resultado(grupo: str, nombre: str, ns: float, n: int, **extra) -> dict:
+    return {"grupo": grupo, "nombre": nombre, "ns_por_llamada": round(ns, 1), "n": n, **extra}
+
+
+def liquidos_en_limites(p, datos: dict) -> list:
+    """
+    Líquidos objetivo justo en, bajo y sobre cada límite de tramo.
+
+    Dentro de un tramo líquido = base_trib * (1 - tasa) + rebaja + fijo, y la
+    función es continua en los límites, así que el líquido del límite sale
+    directo de los parámetros.
+    """
+    fijo = datos["movilizacion"] + sum(b["monto"] for b in datos["bonos"] if not b["imponible"])
+    objetivos = []
+    for hasta, tasa, rebaja in zip(p.tramos_hasta, p.tramos_tasa, p.tramos_rebaja):
+        if hasta == float("inf"):
+            continue
+        liquido_limite = hasta * (1 - tasa) + rebaja + fijo
+        for delta in (-1000, -10, -1, 0, 1, 10, 1000):
+            if liquido_limite + delta > fijo:
+                objetivos.append(liquido_limite + delta)
+    return objetivos
+
+
+def verificar(service: CalculadoraService, p) -> dict:
+    """Comprueba que ambos solvers reproducen el líquido objetivo en el barrido."""
+    errores = []
+    max_exacto = max_biseccion = 0.0
+    casos = 0
+    for nombre, datos in PERFILES.items():
+        for objetivo in liquidos_en_limites(p, datos):
+            casos += 1
+            base_exacta = service._resolver_base_exacta(objetivo, datos, p)
+            base_biseccion = service._resolver_base_biseccion(objetivo, datos, p)
+            err_exacto = abs(service.simular_liquido(base_exacta, datos, p)[0] - objetivo)
+            err_biseccion = abs(service.simular_liquido(base_biseccion, datos, p)[0] - objetivo)
+            max_exacto = max(max_exacto, err_exacto)
+            max_biseccion = max(max_biseccion, err_biseccion)
+            if err_exacto > TOL_EXACTO or err_biseccion > TOL_BISECCION:
+                errores.append({
+                    "perfil": nombre, "liquido_objetivo": objetivo,
+                    "error_exacto": err_exacto, "error_biseccion": err_biseccion,
+                })
+
+            # El resultado redondeado a miles nunca queda bajo el objetivo
+            req = CalculoRequest(sueldo_liquido=int(objetivo), **datos)
+            resp = service._resolver_sueldo_base(req, "exacto", p)
+            if not (0 <= resp.diferencia < 1000):
+                errores.append({"perfil": nombre, "liquido_objetivo": objetivo, "diferencia": resp.diferencia})
+
+    return {
+        "casos": casos,
+        "max_error_exacto": max_exacto,
+        "max_error_biseccion": max_biseccion,
+        "errores": errores,
+    }
+
+
+def bench_micro(service: CalculadoraService, p, n: int, repeticiones: int) -> list:
+    rnd = random.Random(0)
+    bases = [rnd.uniform(0, 25_000_000) for _ in range(n)]
+    liquidos = [rnd.uniform(400_000, 15_000_000) for _ in range(n)]
+    datos = PERFILES["isapre"]
+    filas = [
+        resultado("micro", "calcular_impuesto_unico", ns_por_llamada(service.calcular_impuesto_unico, [(b,) for b in bases], repeticiones), n),
+        resultado("micro", "snapshot.impuesto", ns_por_llamada(p.impuesto, [(b,) for b in bases], repeticiones), n),
+        resultado("micro", "simular_liquido", ns_por_llamada(service.simular_liquido, [(b, datos, p) for b in bases], repeticiones), n),
+        resultado("micro", "resolver / exacto", ns_por_llamada(service._resolver_base_exacta, [(l, datos, p) for l in liquidos], repeticiones), n),
+    ]
+    # La bisección es ~50 simulaciones por llamada: con una fracción basta
+    n_bis = max(1, n // 20)
+    filas.append(resultado(
+        "micro", "resolver / biseccion",
+        ns_por_llamada(service._resolver_base_biseccion, [(l, datos, p) for l in liquidos[:n_bis]], repeticiones), n_bis
+    ))
+
+    # Llamada pública: incluye armado de CalculoResponse y memo
+    requests = [CalculoRequest(sueldo_liquido=int(l), **datos) for l in liquidos[:n_bis]]
+
+    def frio(req):
+        memo_calculadora.limpiar()
+        service.resolver_sueldo_base(req)
+
+    filas.append(resultado("micro", "resolver_sueldo_base / memo frio", ns_por_llamada(frio, [(r,) for r in requests], repeticiones), n_bis))
+    for r in requests:
+        service.resolver_sueldo_base(r)
+    filas.append(resultado(
+        "micro", "resolver_sueldo_base / memo caliente",
+        ns_por_llamada(service.resolver_sueldo_base, [(r,) for r in requests], repeticiones), n_bis
+    ))
+    memo_calculadora.limpiar()
+    return filas
+
+
+def bench_macro(n: int) -> list:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.v1.endpoints import calculadora
+
+    # httpx registra cada request en INFO; ensucia la salida y el tiempo medido
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    app = FastAPI()
+    app.include_router(calculadora.router, prefix="/api/v1/calculadora")
+    client = TestClient(app)
+    rnd = random.Random(1)
+    payloads = [{"sueldo_liquido": int(rnd.uniform(400_000, 15_000_000)), **PERFILES["bonos"]} for _ in range(n)]
+
+    def medir(nombre: str, limpiar_memo: bool) -> dict:
+        for payload in payloads[:20]:  # calentamiento
+            client.post("/api/v1/calculadora/calcular", json=payload)
+        latencias = []
+        for payload in payloads:
+            if limpiar_memo:
+                memo_calculadora.limpiar()
+            t0 = time.perf_counter_ns()
+            resp = client.post("/api/v1/calculadora/calcular", json=payload)
+            latencias.append(time.perf_counter_ns() - t0)
+            if resp.status_code != 200:
+                raise RuntimeError(f"/calcular respondió {resp.status_code}: {resp.text}")
+        latencias.sort()
+        return resultado(
+            "macro", nombre, statistics.mean(latencias), n,
+            p50_ns=latencias[len(latencias) // 2],
+            p95_ns=latencias[int(len(latencias) * 0.95) - 1],
+        )
+
+    filas = [medir("POST /calcular / memo frio", True), medir("POST /calcular / memo caliente", False)]
+    memo_calculadora.limpiar()
+    return filas
+
+
+def bench_tramos(service: CalculadoraService, p, repeticiones: int) -> list:
+    filas = []
+    for nombre, datos in PERFILES.items():
+        objetivos = liquidos_en_limites(p, datos)
+        args = [(l, datos, p) for l in objetivos]
+        filas.append(resultado("tramos", f"exacto / {nombre}", ns_por_llamada(service._resolver_base_exacta, args, repeticiones), len(args)))
+        filas.append(resultado("tramos", f"biseccion / {nombre}", ns_por_llamada(service._resolver_base_biseccion, args, repeticiones), len(args)))
+    return filas
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual: list, anterior_path: str, umbral: float) -> bool:
+    """Imprime la razón actual/anterior por caso; True si alguno empeora más que el umbral."""
+    with open(anterior_path, encoding="utf-8") as f:
+        anterior = {(r["grupo"], r["nombre"]): r["ns_por_llamada"] for r in json.load(f)["resultados"]}
+    regresion = False
+    print(f"\n{'caso':<48}{'antes':>12}{'ahora':>12}{'razón':>8}")
+    for r in actual:
+        previo = anterior.get((r["grupo"], r["nombre"]))
+        if not previo:
+            continue
+        razon = r["ns_por_llamada"] / previo
+        marca = "  <-- regresión" if razon > 1 + umbral else ""
+        regresion = regresion or bool(marca)
+        print(f"{r['grupo'] + ' / ' + r['nombre']:<48}{previo:>12.0f}{r['ns_por_llamada']:>12.0f}{razon:>8.2f}{marca}")
+    return regresion
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20_000, help="Llamadas por medición micro")
+    parser.add_argument("--n-http", type=int, default=500, help="Requests por medición macro")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--grupos", default="micro,macro,tramos")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (stdout si se omite)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--umbral", type=float, default=0.15, help="Empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args()
+
+    grupos = set(args.grupos.split(","))
+    service = CalculadoraService()
+    version, p = registro_parametros.obtener_con_version()
+
+    verificacion = verificar(service, p)
+    if verificacion["errores"]:
+        print(json.dumps(verificacion, indent=2, ensure_ascii=False), file=sys.stderr)
+        print(f"Verificación falló en {len(verificacion['errores'])} casos", file=sys.stderr)
+        sys.exit(1)
+
+    resultados = []
+    if "micro" in grupos:
+        resultados += bench_micro(service, p, args.n, args.repeat)
+    if "macro" in grupos:
+        resultados += bench_macro(args.n_http)
+    if "tramos" in grupos:
+        resultados += bench_tramos(service, p, args.repeat)
+
+    informe = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros_version": version,
+            "parametros_vigente_desde": str(p.vigente_desde),
+            "n": args.n,
+            "n_http": args.n_http,
+            "repeat": args.repeat,
+        },
+        "verificacion": verificacion,
+        "resultados": resultados,
+    }
+
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"{'caso':<48}{'ns/llamada':>14}")
+        for r in resultados:
+            print(f"{r['grupo'] + ' / ' + r['nombre']:<48}{r['ns_por_llamada']:>14.0f}")
+    else:
+        print(texto)
+
+    if args.comparar and comparar(resultados, args.comparar, args.umbral):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de bloqueo del event loop bajo carga mixta.
+
+Compara la latencia de un endpoint liviano (/ping) mientras llegan requests
+concurrentes que verifican passwords con bcrypt:
+- "bloqueante": verify_password se llama directo en el endpoint async.
+- "offload": verify_password se ejecuta con run_sync (pool de hilos).
+- "acotado": verify_password_async (pool de bcrypt con cola acotada); los
+  logins que no caben se rechazan con 503 y se informan aparte.
+
+Uso:
+    cd backend
+    python benchmarks/bench_event_loop.py --logins 20 --pings 200
+    python benchmarks/bench_event_loop.py --logins 200 --workers 4 --cola 16
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.concurrency import BoundedExecutor, run_sync
+from app.core.security import get_password_hash, verify_password
+
+PASSWORD = "benchmark-password"
+HASH = get_password_hash(PASSWORD)
+
+
+def crear_app(pool_bcrypt: BoundedExecutor) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/bloqueante")
+    async def login_bloqueante():
+        return {"ok": verify_password(PASSWORD, HASH)}
+
+    @app.post("/offload")
+    async def login_offload():
+        return {"ok": await run_sync(verify_password, PASSWORD, HASH)}
+
+    @app.post("/acotado")
+    async def login_acotado():
+        return {"ok": await pool_bcrypt.run(verify_password, PASSWORD, HASH)}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def escenario(app: FastAPI, ruta_login: str, logins: int, pings: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencias_ping = []
+        latencias_login = []
+        rechazados = []
+        # Las latencias se miden desde el instante en que cada request "llega"
+        # (inicio + desfase), no desde que el event loop logra atenderla.
+        inicio = time.perf_counter()
+
+        async def login():
+            resp = await client.post(ruta_login)
+            (latencias_login if resp.status_code == 200 else rechazados).append(time.perf_counter() - inicio)
+
+        async def ping(i):
+            # Los pings se reparten en el tiempo mientras corren los logins
+            llegada = i * 0.005
+            await asyncio.sleep(llegada)
+            await client.get("/ping")
+            latencias_ping.append(time.perf_counter() - inicio - llegada)
+
+        await asyncio.gather(*(login() for _ in range(logins)), *(ping(i) for i in range(pings)))
+
+    def ms(v):
+        return round(v * 1000, 2)
+
+    return {
+        "ping_p50_ms": ms(statistics.median(latencias_ping)),
+        "ping_p99_ms": ms(percentil(latencias_ping, 99)),
+        "login_p50_ms": ms(statistics.median(latencias_login)),
+        "login_p99_ms": ms(percentil(latencias_login, 99)),
+        "login_503": len(rechazados),
+        "rechazo_p99_ms": ms(percentil(rechazados, 99)) if rechazados else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--pings", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4, help="Hilos del pool acotado de bcrypt")
+    parser.add_argument("--cola", type=int, default=32, help="Verificaciones en cola antes de responder 503")
+    args = parser.parse_args()
+
+    app = crear_app(BoundedExecutor(args.workers, args.cola, "bench-bcrypt"))
+    for nombre, ruta in (("bloqueante", "/bloqueante"), ("offload", "/offload"), ("acotado", "/acotado")):
+        resultado = await escenario(app, ruta, args.logins, args.pings)
+        print(f"{nombre:>11}: " + "  ".join(f"{k}={v}" for k, v in resultado.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
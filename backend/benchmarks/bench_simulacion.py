@@ -0,0 +1,108 @@
+"""
+Microbenchmark de la simulación forward de la calculadora.
+
+Mide nanosegundos por llamada de:
+- impuesto único: recorrido lineal de TRAMOS_IMPUESTO (referencia) vs
+  bisect sobre el snapshot compilado.
+- simular_liquido: versión con lookups en dicts (referencia) vs la del
+  servicio, que usa el snapshot de parámetros.
+
+Uso:
+    cd backend
+    python benchmarks/bench_simulacion.py --n 200000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.calculadora_data import (
+    VALOR_UF_ACTUAL, SUELDO_MINIMO, TASAS_AFP, PARAMETROS,
+    TOPE_IMPONIBLE_AFP_SALUD, TOPE_IMPONIBLE_CESANTIA, TRAMOS_IMPUESTO
+)
+from app.core.calculadora_parametros import obtener_parametros
+from app.services.calculadora_service import CalculadoraService
+
+
+def impuesto_referencia(base_tributable: float) -> float:
+    """Implementación original: recorre los tramos con dos comparaciones c/u."""
+    if base_tributable <= 0:
+        return 0.0
+    for tramo in TRAMOS_IMPUESTO:
+        if tramo['desde'] <= base_tributable <= tramo['hasta']:
+            return (base_tributable * tramo['tasa']) - tramo['rebaja']
+    ultimo = TRAMOS_IMPUESTO[-1]
+    if base_tributable > ultimo['desde']:
+        return (base_tributable * ultimo['tasa']) - ultimo['rebaja']
+    return 0.0
+
+
+def simular_referencia(sueldo_base: float, datos: dict) -> float:
+    """Implementación original: lee dicts y recalcula topes en cada llamada."""
+    lista_bonos = datos.get('bonos', [])
+    bonos_imponibles = sum(b['monto'] for b in lista_bonos if b['imponible'])
+    bonos_no_imponibles = sum(b['monto'] for b in lista_bonos if not b['imponible'])
+    uf = VALOR_UF_ACTUAL
+    tope_pesos_afp_salud = TOPE_IMPONIBLE_AFP_SALUD * uf
+    tope_pesos_cesantia = TOPE_IMPONIBLE_CESANTIA * uf
+    tasa_afp = TASAS_AFP.get(datos['afp_nombre'], 0.1049)
+    usar_fonasa = (datos['salud_sistema'] == 'fonasa')
+    costo_plan_isapre = 0 if usar_fonasa else datos['salud_uf'] * uf
+    gratificacion = min(sueldo_base * 0.25, (4.75 * SUELDO_MINIMO) / 12)
+    imponible = sueldo_base + gratificacion + bonos_imponibles
+    afecto = min(imponible, tope_pesos_afp_salud)
+    val_afp = afecto * tasa_afp
+    val_ces = min(imponible, tope_pesos_cesantia) * PARAMETROS['tasa_cesantia']
+    val_salud = afecto * PARAMETROS['tasa_salud']
+    if not usar_fonasa:
+        val_salud = max(val_salud, costo_plan_isapre)
+    base_trib = imponible - val_afp - val_salud - val_ces
+    val_impuesto = impuesto_referencia(base_trib)
+    return imponible + datos['movilizacion'] + bonos_no_imponibles - (val_afp + val_salud + val_ces + val_impuesto)
+
+
+def ns_por_llamada(func, args_list, repeticiones: int) -> float:
+    n = len(args_list)
+
+    def correr():
+        for args in args_list:
+            func(*args)
+
+    mejor = min(timeit.repeat(correr, number=1, repeat=repeticiones))
+    return mejor / n * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000, help="Llamadas por medición")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    bases = [random.uniform(0, 25_000_000) for _ in range(args.n)]
+    datos = {"movilizacion": 40000, "afp_nombre": "Habitat", "salud_sistema": "isapre", "salud_uf": 3.5, "bonos": []}
+
+    p = obtener_parametros()
+    service = CalculadoraService()
+
+    # Ambas versiones deben dar lo mismo antes de comparar tiempos
+    for b in bases[:1000]:
+        assert abs(impuesto_referencia(b) - p.impuesto(b)) < 1e-6
+        assert abs(simular_referencia(b, datos) - service.simular_liquido(b, datos)[0]) < 1e-6
+
+    filas = [
+        ("impuesto / lineal", ns_por_llamada(impuesto_referencia, [(b,) for b in bases], args.repeat)),
+        ("impuesto / bisect", ns_por_llamada(p.impuesto, [(b,) for b in bases], args.repeat)),
+        ("simular / dicts", ns_por_llamada(simular_referencia, [(b, datos) for b in bases], args.repeat)),
+        ("simular / snapshot", ns_por_llamada(service.simular_liquido, [(b, datos, p) for b in bases], args.repeat)),
+    ]
+    print(f"{'caso':<22}{'ns/llamada':>12}")
+    for nombre, ns in filas:
+        print(f"{nombre:<22}{ns:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Servidor BUK falso para probar la capa de resiliencia en local.
+
+Expone los mismos endpoints que usa FiniquitosService y permite inyectar
+latencia y errores en caliente.
+
+Uso:
+    cd backend
+    uvicorn fake_buk_server:app --port 8765
+
+    # En el .env del backend:
+    BUK_API_BASE_URL=http://127.0.0.1:8765
+
+    # Inyectar 2 s de latencia (+/- 500 ms) y 20% de errores 503:
+    curl -X POST "http://127.0.0.1:8765/_control?delay_ms=2000&jitter_ms=500&error_rate=0.2"
+
+    # Volver a la normalidad:
+    curl -X POST "http://127.0.0.1:8765/_control"
+"""
+import asyncio
+import random
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI(title="BUK falso")
+
+control = {"delay_ms": 0, "jitter_ms": 0, "error_rate": 0.0, "error_status": 503}
+contadores = {"requests": 0, "errores": 0}
+
+
+async def simular_condiciones():
+    contadores["requests"] += 1
+    delay = control["delay_ms"] + random.uniform(-control["jitter_ms"], control["jitter_ms"])
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < control["error_rate"]:
+        contadores["errores"] += 1
+        raise HTTPException(status_code=control["error_status"], detail="Error inyectado")
+
+
+@app.post("/_control")
+def configurar(delay_ms: int = 0, jitter_ms: int = 0, error_rate: float = 0.0, error_status: int = 503):
+    """Configura la latencia y tasa de errores de las respuestas."""
+    control.update(delay_ms=delay_ms, jitter_ms=jitter_ms, error_rate=error_rate, error_status=error_status)
+    return {"control": control, "contadores": contadores}
+
+
+@app.get("/_control")
+def ver_control():
+    return {"control": control, "contadores": contadores}
+
+
+@app.get("/employees/{rut}")
+async def employee(rut: str):
+    await simular_condiciones()
+    return {
+        "data": {
+            "person_id": abs(hash(rut)) % 100000,
+            "full_name": f"Trabajador {rut}",
+            "current_job": {"base_wage": 900000 + abs(hash(rut)) % 1000000},
+        }
+    }
+
+
+@app.get("/employees/{rut}/vacations_available")
+async def vacations_available(rut: str, date: Optional[str] = None):
+    await simular_condiciones()
+    return {
+        "employee_id": abs(hash(rut)) % 100000,
+        "full_name": f"Trabajador {rut}",
+        "vacations": [{"name": "Vacaciones legales", "stock": 12.5}],
+    }
+
+
+@app.get("/employees/{rut}/payroll_detail")
+async def payroll_detail(rut: str):
+    await simular_condiciones()
+    return {
+        "data": [{
+            "lines_settlement": [
+                {"name": "Sueldo Base", "amount": 900000, "description": None},
+                {"name": "Prestamo Interno", "amount": 2.5, "description": "Cuota 1/3"},
+            ]
+        }]
+    }
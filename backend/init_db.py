@@ -49,16 +49,13 @@ def seed_roles(db):
         {"nombre": "usuario", "descripcion": "Usuario básico con acceso limitado"},
     ]
     
-    created = 0
-    for role_data in roles_data:
-        existing = db.query(Role).filter(Role.nombre == role_data["nombre"]).first()
-        if not existing:
-            role = Role(**role_data)
-            db.add(role)
-            created += 1
+    # Una sola query para saber cuáles ya existen
+    existing = {nombre for (nombre,) in db.query(Role.nombre).filter(Role.nombre.in_([r["nombre"] for r in roles_data]))}
+    new_roles = [Role(**r) for r in roles_data if r["nombre"] not in existing]
+    db.add_all(new_roles)
     
     db.commit()
-    print(f"✓ Roles: {created} creados, {len(roles_data) - created} ya existían")
+    print(f"✓ Roles: {len(new_roles)} creados, {len(roles_data) - len(new_roles)} ya existían")
     
     return db.query(Role).all()
 
@@ -95,16 +92,13 @@ def seed_modules(db):
         },
     ]
     
-    created = 0
-    for mod_data in modules_data:
-        existing = db.query(Modulo).filter(Modulo.codigo == mod_data["codigo"]).first()
-        if not existing:
-            module = Modulo(**mod_data)
-            db.add(module)
-            created += 1
+    # Una sola query para saber cuáles ya existen
+    existing = {codigo for (codigo,) in db.query(Modulo.codigo).filter(Modulo.codigo.in_([m["codigo"] for m in modules_data]))}
+    new_modules = [Modulo(**m) for m in modules_data if m["codigo"] not in existing]
+    db.add_all(new_modules)
     
     db.commit()
-    print(f"✓ Módulos: {created} creados, {len(modules_data) - created} ya existían")
+    print(f"✓ Módulos: {len(new_modules)} creados, {len(modules_data) - len(new_modules)} ya existían")
     
     return db.query(Modulo).all()
 
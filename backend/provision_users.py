@@ -0,0 +1,67 @@
+"""
+Script para crear o actualizar usuarios en lote desde un CSV o JSON.
+
+El CSV lleva encabezado con las columnas username, password, email,
+nombre_completo, rol, modulos (códigos separados por '|') y activo.
+El JSON es una lista de objetos con esos mismos campos (o {"usuarios": [...]}).
+
+Uso:
+    cd backend
+    python provision_users.py usuarios.csv
+    python provision_users.py usuarios.json --solo-nuevos
+"""
+import argparse
+import sys
+import os
+
+# Agregar el directorio padre al path para imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.concurrency import shutdown_process_pool
+from app.db.session import SessionLocal
+from app.services.usuario_importacion_service import (
+    UsuarioImportacionService,
+    leer_csv_usuarios,
+    leer_json_usuarios
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva de usuarios")
+    parser.add_argument("archivo", help="CSV o JSON con los usuarios")
+    parser.add_argument("--solo-nuevos", action="store_true",
+                        help="No actualizar usuarios existentes (se informan como error)")
+    args = parser.parse_args()
+
+    with open(args.archivo, "rb") as f:
+        contenido = f.read()
+
+    try:
+        if args.archivo.lower().endswith(".json"):
+            filas, errores = leer_json_usuarios(contenido)
+        else:
+            filas, errores = leer_csv_usuarios(contenido)
+    except ValueError as e:
+        print(f"✗ No se pudo leer {args.archivo}: {e}")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        resultado = UsuarioImportacionService(db).importar(filas, not args.solo_nuevos, errores)
+    finally:
+        db.close()
+        shutdown_process_pool()
+
+    for fila in resultado.resultados:
+        if fila.estado == "error":
+            print(f"✗ Fila {fila.fila} ({fila.username or '-'}): {fila.error}")
+
+    print(
+        f"✓ {resultado.total} filas: {resultado.creados} creados, {resultado.actualizados} actualizados, "
+        f"{resultado.errores} con error ({resultado.duracion_ms:.0f} ms)"
+    )
+    sys.exit(1 if resultado.errores else 0)
+
+
+if __name__ == "__main__":
+    main()
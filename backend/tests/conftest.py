@@ -0,0 +1,48 @@
+"""
+Configuración mínima para importar la app en los tests sin un .env real.
+
+Las variables obligatorias de Settings se completan con valores de prueba
+(solo si no vienen del entorno); los tests no abren conexiones a BD ni a BUK.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for variable in (
+    "DB_SERVER", "DB_USER", "DB_PASSWORD", "DB_NAME",
+    "MARCAS_DB_SERVER", "MARCAS_DB_USER", "MARCAS_DB_PASSWORD", "MARCAS_DB_NAME",
+    "BUK_API_KEY",
+):
+    os.environ.setdefault(variable, "test")
+os.environ.setdefault("BUK_API_BASE_URL", "http://buk.invalid")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def sesiones_auth():
+    """
+    Fábrica de sesiones sobre SQLite en memoria con las tablas de auth.
+
+    Las tablas viven en el esquema 'App' (SQL Server); en SQLite se emula con
+    una BD adjunta con ese nombre.
+    """
+    from app.db.base import Base
+    from app.models import auth
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _adjuntar_esquema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH ':memory:' AS App")
+
+    Base.metadata.create_all(engine, tables=[
+        auth.Role.__table__, auth.Modulo.__table__, auth.Usuario.__table__,
+        auth.rol_modulos, auth.usuario_modulos,
+    ])
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
@@ -0,0 +1,68 @@
+"""Login async: bcrypt corre en su propio compartimento y lo rechaza con 503 si está lleno."""
+import asyncio
+import threading
+
+import pytest
+
+from app.core import security
+from app.core.concurrency import BoundedExecutor
+from app.core.exceptions import ServicioSaturadoError
+from app.core.security import get_password_hash
+from app.models.auth import Role, Usuario
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def db(sesiones_auth):
+    db = sesiones_auth()
+    db.add(Role(nombre="usuario"))
+    db.flush()
+    db.add(Usuario(username="ana", password_hash=get_password_hash("secreta"), rol_id=1, activo=True))
+    db.commit()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def bcrypt_lento(monkeypatch):
+    """Compartimento de bcrypt de un solo cupo cuya verificación espera a `liberar`."""
+    liberar = threading.Event()
+    verificar = security.verify_password
+
+    def verify_password(plain, hashed):
+        liberar.wait(5)
+        return verificar(plain, hashed)
+
+    monkeypatch.setattr(security, "bcrypt_executor", BoundedExecutor(1, 0, "bcrypt-prueba"))
+    monkeypatch.setattr(security, "verify_password", verify_password)
+    yield liberar
+    liberar.set()
+
+
+def test_login_con_bcrypt_saturado_responde_503_sin_esperar(db, bcrypt_lento):
+    service = AuthService(db)
+
+    async def dos_logins():
+        primero = asyncio.create_task(service.authenticate_async("ana", "secreta"))
+        while security.bcrypt_executor.estado()["pendientes"] == 0:
+            await asyncio.sleep(0.01)
+        with pytest.raises(ServicioSaturadoError) as error:
+            await service.authenticate_async("ana", "secreta")
+        bcrypt_lento.set()
+        return error.value, await primero
+
+    error, user = asyncio.run(dos_logins())
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert user is not None and user.username == "ana"
+    assert security.bcrypt_executor.estado()["rechazados"] == 1
+
+
+def test_cupo_de_bcrypt_se_libera_tras_el_login(db, bcrypt_lento):
+    bcrypt_lento.set()
+    service = AuthService(db)
+
+    assert asyncio.run(service.authenticate_async("ana", "otra")) is None
+    assert asyncio.run(service.authenticate_async("ana", "secreta")) is not None
+    assert security.bcrypt_executor.estado()["pendientes"] == 0
@@ -0,0 +1,96 @@
+"""Listado de usuarios paginado por keyset (GET /admin/users)."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.exceptions import CursorInvalidoError
+from app.models.auth import Role, Usuario
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def db(sesiones_auth):
+    db = sesiones_auth()
+    rol = Role(nombre="usuario")
+    db.add(rol)
+    db.flush()
+    base = datetime(2025, 1, 1)
+    for i in range(11):
+        # Tres usuarios sin created_at, intercalados con el resto
+        creado = None if i % 4 == 1 else base + timedelta(days=i % 3)
+        usuario = Usuario(username=f"u{i:02d}", password_hash="x", rol_id=rol.id, activo=i % 5 != 0)
+        db.add(usuario)
+        db.flush()
+        usuario.created_at = creado
+    db.commit()
+    yield db
+    db.close()
+
+
+def _recorrer(service, orden, limite, cursor=None, **filtros):
+    vistos, paginas = [], 0
+    while True:
+        usuarios, cursor = service.list_users_page(orden=orden, cursor=cursor, limite=limite, **filtros)
+        vistos += [u.username for u in usuarios]
+        paginas += 1
+        if cursor is None:
+            return vistos, paginas
+
+
+@pytest.mark.parametrize("orden", ["username", "-username", "id", "-id", "created_at", "-created_at"])
+@pytest.mark.parametrize("limite", [1, 2, 4])
+def test_recorrido_completo_sin_repetir_ni_perder_usuarios(db, orden, limite):
+    service = AuthService(db)
+    completo, _ = service.list_users_page(orden=orden)
+
+    vistos, paginas = _recorrer(service, orden, limite)
+
+    assert vistos == [u.username for u in completo]
+    assert len(vistos) == 11
+    assert paginas >= 11 // limite
+
+
+def test_created_at_nulo_ordena_primero_y_no_corta_el_recorrido(db):
+    service = AuthService(db)
+    vistos, _ = _recorrer(service, "created_at", 2)
+    sin_fecha = {u.username for u in db.query(Usuario).filter(Usuario.created_at.is_(None))}
+
+    assert len(sin_fecha) == 3
+    assert set(vistos[:3]) == sin_fecha
+    assert len(vistos) == 11
+
+
+def test_filtro_activo_se_respeta_entre_paginas(db):
+    service = AuthService(db)
+    vistos, _ = _recorrer(service, "username", 3, activo=True)
+    assert vistos == [f"u{i:02d}" for i in range(11) if i % 5 != 0]
+
+
+def test_cursor_de_otro_orden_es_invalido(db):
+    service = AuthService(db)
+    _, cursor = service.list_users_page(orden="username", limite=2)
+    with pytest.raises(CursorInvalidoError):
+        service.list_users_page(orden="id", cursor=cursor, limite=2)
+
+
+def test_busqueda_se_respeta_entre_paginas(db):
+    service = AuthService(db)
+    vistos, paginas = _recorrer(service, "-username", 1, busqueda="U0")
+    assert vistos == [f"u{i:02d}" for i in range(9, -1, -1)]
+    assert paginas == 10
+
+
+def test_usuario_creado_entre_paginas_no_desordena_el_recorrido(db):
+    service = AuthService(db)
+    primera, cursor = service.list_users_page(orden="username", limite=4)
+    # Uno antes del cursor (no aparece) y otro después (sí aparece)
+    db.add_all([
+        Usuario(username="u00a", password_hash="x", rol_id=1, activo=True),
+        Usuario(username="u99", password_hash="x", rol_id=1, activo=True),
+    ])
+    db.commit()
+
+    resto, _ = _recorrer(service, "username", 4, cursor)
+
+    vistos = [u.username for u in primera] + resto
+    assert vistos == [f"u{i:02d}" for i in range(11)] + ["u99"]
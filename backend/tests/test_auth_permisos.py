@@ -0,0 +1,104 @@
+"""Matriz de permisos y módulos que ve el usuario (login, /me, require_module)."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.permisos import registro_permisos
+from app.core.principal import Principal
+from app.core.security import require_module
+from app.models.auth import Modulo, Role, Usuario
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def db(sesiones_auth):
+    db = sesiones_auth()
+    dashboard = Modulo(codigo="dashboard", nombre="Dashboard", orden=1, activo=True)
+    finiquitos = Modulo(codigo="finiquitos", nombre="Finiquitos", orden=2, activo=True)
+    admin = Modulo(codigo="admin", nombre="Administración", orden=99, activo=True)
+    rol = Role(nombre="usuario", modulos=[dashboard])
+    db.add_all([dashboard, finiquitos, admin, rol])
+    db.flush()
+    db.add_all([
+        Usuario(username="ana", password_hash="x", rol_id=rol.id, activo=True, modulos=[finiquitos]),
+        Usuario(username="beto", password_hash="x", rol_id=rol.id, activo=True),
+        Usuario(username="sinrol", password_hash="x", rol_id=None, activo=True, modulos=[finiquitos]),
+    ])
+    db.commit()
+    registro_permisos.reconstruir(db)
+    yield db
+    db.close()
+
+
+def _permitido(db, user: Usuario, codigo: str) -> bool:
+    checker = require_module(codigo)
+    try:
+        asyncio.run(checker(current_user=Principal.desde_usuario(user), db=db))
+        return True
+    except HTTPException as e:
+        # 404 si el módulo está inactivo, 403 si el usuario no lo tiene
+        assert e.status_code in (403, 404)
+        return False
+
+
+def _usuario(db, username):
+    return db.query(Usuario).filter(Usuario.username == username).one()
+
+
+@pytest.mark.parametrize("username", ["ana", "beto", "sinrol"])
+def test_modulos_de_login_coinciden_con_require_module(db, username):
+    service = AuthService(db)
+    user = _usuario(db, username)
+
+    visibles = {m.codigo for m in service.get_user_modules(user)}
+    permitidos = {c for c in ("dashboard", "finiquitos", "admin") if _permitido(db, user, c)}
+
+    assert visibles == permitidos
+
+
+def test_modulos_directos_se_incluyen_en_orden(db):
+    modulos = AuthService(db).get_user_modules(_usuario(db, "ana"))
+    assert [m.codigo for m in modulos] == ["dashboard", "finiquitos"]
+
+
+def test_toggle_module_reconstruye_la_matriz(db):
+    service = AuthService(db)
+    ana = _usuario(db, "ana")
+    finiquitos = db.query(Modulo).filter(Modulo.codigo == "finiquitos").one()
+    reconstrucciones = registro_permisos.reconstrucciones
+
+    service.toggle_module(finiquitos.id, False)
+
+    assert registro_permisos.reconstrucciones == reconstrucciones + 1
+    assert "finiquitos" not in registro_permisos.actual().modulos_activos
+    assert not _permitido(db, ana, "finiquitos")
+    assert [m.codigo for m in service.get_user_modules(ana)] == ["dashboard"]
+
+    service.toggle_module(finiquitos.id, True)
+
+    assert _permitido(db, ana, "finiquitos")
+    assert not _permitido(db, _usuario(db, "beto"), "finiquitos")
+
+
+def test_asignar_modulos_a_usuario_reconstruye_la_matriz(db):
+    service = AuthService(db)
+    beto = _usuario(db, "beto")
+    admin = db.query(Modulo).filter(Modulo.codigo == "admin").one()
+
+    service.update_user(beto.id, modulo_ids=[admin.id])
+
+    assert _permitido(db, beto, "admin")
+    assert "admin" in {m.codigo for m in service.get_user_modules(beto)}
+
+
+def test_crear_usuario_con_modulos_reconstruye_la_matriz(db):
+    service = AuthService(db)
+    admin = db.query(Modulo).filter(Modulo.codigo == "admin").one()
+    rol = db.query(Role).filter(Role.nombre == "usuario").one()
+
+    nuevo = service.create_user("carla", "secreta", rol_id=rol.id, modulo_ids=[admin.id])
+
+    assert _permitido(db, nuevo, "admin")
+    assert _permitido(db, nuevo, "dashboard")
+    assert not _permitido(db, nuevo, "finiquitos")
@@ -0,0 +1,148 @@
+"""Circuit breaker de BUK: la llamada de prueba en half_open siempre se libera."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.buk_client import BukClient, CircuitBreaker
+from app.core.exceptions import BukNoDisponibleError, BukSaturadoError
+
+
+def _cliente_en_half_open() -> BukClient:
+    cliente = BukClient()
+    cliente.breaker.state = CircuitBreaker.OPEN
+    cliente.breaker._opened_at = time.monotonic() - cliente.breaker.reset_timeout - 1
+    return cliente
+
+
+def _respuesta_ok(cliente: BukClient) -> None:
+    async def _send_hedged(endpoint, path, params):
+        return httpx.Response(200, request=httpx.Request("GET", "http://buk.invalid" + path))
+    cliente._send_hedged = _send_hedged
+
+
+def test_prueba_rechazada_por_bulkhead_lleno_no_bloquea_el_circuito():
+    cliente = _cliente_en_half_open()
+    cliente.bulkhead.capacidad = 0  # compartimento lleno: la prueba se rechaza localmente
+
+    with pytest.raises(BukSaturadoError):
+        asyncio.run(cliente.get("empleado", "/employees"))
+    assert cliente.breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Con cupo de nuevo, la siguiente llamada puede hacer de prueba y cierra el circuito
+    cliente.bulkhead.capacidad = 1
+    _respuesta_ok(cliente)
+    asyncio.run(cliente.get("empleado", "/employees"))
+    assert cliente.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_prueba_cancelada_no_bloquea_el_circuito():
+    cliente = _cliente_en_half_open()
+
+    async def _colgada(endpoint, path, params):
+        await asyncio.sleep(60)
+    cliente._send_hedged = _colgada
+
+    async def _cancelar_prueba():
+        tarea = asyncio.create_task(cliente.get("empleado", "/employees"))
+        await asyncio.sleep(0.01)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+    asyncio.run(_cancelar_prueba())
+    _respuesta_ok(cliente)
+    asyncio.run(cliente.get("empleado", "/employees"))
+    assert cliente.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_deja_pasar_una_sola_prueba():
+    cliente = _cliente_en_half_open()
+    assert cliente.breaker.allow_request()
+    with pytest.raises(BukNoDisponibleError):
+        asyncio.run(cliente.get("empleado", "/employees"))
+
+
+def test_presupuesto_por_segundo_es_de_todo_el_proceso():
+    from app.core.rate_limit import AsyncRateLimiter
+
+    cliente = BukClient()
+    cliente.rate_limiter = AsyncRateLimiter(20, burst=2)
+    transporte = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+
+    async def lote(n: int) -> None:
+        for _ in range(n):
+            await cliente.get("empleado", "/employees")
+
+    async def dos_lotes_a_la_vez() -> float:
+        cliente._client = httpx.AsyncClient(transport=transporte, base_url="http://buk.invalid")
+        cliente._client_loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        await asyncio.gather(lote(10), lote(10))
+        return time.perf_counter() - inicio
+
+    # 20 llamadas con ráfaga de 2 a 20/s: al menos 0,9 s, aunque vengan de dos lotes
+    assert asyncio.run(dos_lotes_a_la_vez()) >= 0.85
+
+
+def test_espera_de_presupuesto_no_retiene_cupo_del_bulkhead():
+    from app.core.rate_limit import AsyncRateLimiter
+
+    cliente = BukClient()
+    cliente.rate_limiter = AsyncRateLimiter(2, burst=1)
+    _respuesta_ok(cliente)
+
+    async def escenario():
+        await cliente.get("empleado", "/employees")  # agota la ráfaga
+        tarea = asyncio.create_task(cliente.get("empleado", "/employees"))
+        await asyncio.sleep(0.1)
+        en_bulkhead = cliente.bulkhead.estado()["pendientes"]
+        await tarea
+        return en_bulkhead
+
+    assert asyncio.run(escenario()) == 0
+
+
+def test_limitador_no_duerme_reteniendo_a_los_demas():
+    from app.core.rate_limit import AsyncRateLimiter
+
+    limitador = AsyncRateLimiter(10, burst=1)
+
+    async def esperas():
+        limitador.intentar()
+        inicio = time.perf_counter()
+        tareas = [asyncio.create_task(limitador.acquire()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        # Mientras duermen, otra corrutina obtiene su resultado sin esperar a nadie
+        assert not limitador.intentar()
+        tareas[-1].cancel()  # su reserva se devuelve al que venga después
+        await asyncio.sleep(0)
+        await limitador.acquire()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        return time.perf_counter() - inicio
+
+    # Tres reservas a 10/s, la última cancelada: la nueva sale a ~0,3 s y no a 0,4 s
+    assert asyncio.run(esperas()) < 0.37
+    # Un event loop nuevo (otro asyncio.run) usa el mismo limitador sin problemas
+    asyncio.run(esperas())
+
+
+def test_hedge_sin_presupuesto_no_lanza_segunda_peticion():
+    from app.core.rate_limit import AsyncRateLimiter
+
+    cliente = BukClient()
+    cliente.rate_limiter = AsyncRateLimiter(1, burst=1)
+    tracker = cliente._tracker("empleado")
+    for _ in range(50):
+        tracker.record(0.001)
+    envios = []
+
+    async def _send(endpoint, path, params):
+        envios.append(path)
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, request=httpx.Request("GET", "http://buk.invalid" + path))
+    cliente._send = _send
+
+    asyncio.run(cliente.get("empleado", "/employees"))
+    assert envios == ["/employees"]
@@ -0,0 +1,222 @@
+"""Calculadora de sueldos: solver exacto, lotes NumPy, curva, parámetros y memo."""
+import random
+
+import pytest
+
+from app.core.calculadora_parametros import obtener_parametros
+from app.schemas.calculadora import BonoInput, CalculoRequest, CompararRequest, CurvaRequest, SimulacionRequest
+from app.services.calculadora_lote_service import CalculadoraLoteService
+from app.services.calculadora_service import CalculadoraService, _datos_trabajador
+
+
+def _requests(cantidad: int, semilla: int):
+    """Trabajadores al azar que cruzan tramos de impuesto, topes y planes isapre."""
+    azar = random.Random(semilla)
+    afps = sorted(obtener_parametros().tasas_afp)
+    requests = []
+    for _ in range(cantidad):
+        isapre = azar.random() < 0.4
+        bonos = [
+            BonoInput(nombre=f"bono{j}", monto=azar.randrange(1000, 300_000), imponible=azar.random() < 0.6)
+            for j in range(azar.randrange(0, 3))
+        ]
+        requests.append(CalculoRequest(
+            sueldo_liquido=azar.randrange(450_000, 9_000_000),
+            movilizacion=azar.choice([0, 40_000, 80_000]),
+            afp_nombre=azar.choice(afps),
+            salud_sistema="isapre" if isapre else "fonasa",
+            salud_uf=round(azar.uniform(0, 12), 2) if isapre else 0.0,
+            bonos=bonos,
+        ))
+    return requests
+
+
+def test_solver_exacto_reproduce_el_liquido_y_coincide_con_biseccion():
+    service = CalculadoraService()
+    p = obtener_parametros()
+    for request in _requests(500, semilla=31):
+        datos = _datos_trabajador(request)
+        exacta = service._resolver_base_exacta(request.sueldo_liquido, datos, p)
+        if exacta <= 0:
+            continue
+        liquido, _ = service.simular_liquido(exacta, datos, p)
+        assert liquido == pytest.approx(request.sueldo_liquido, abs=0.01)
+        biseccion = service._resolver_base_biseccion(request.sueldo_liquido, datos, p)
+        assert exacta == pytest.approx(biseccion, abs=1.0)
+
+
+def test_metodos_dan_la_misma_respuesta_redondeada():
+    service = CalculadoraService()
+    for request in _requests(50, semilla=310):
+        exacto = service.resolver_sueldo_base(request, metodo="exacto")
+        biseccion = service.resolver_sueldo_base(request, metodo="biseccion")
+        assert exacto.sueldo_base == biseccion.sueldo_base
+        assert exacto.sueldo_liquido >= request.sueldo_liquido
+
+
+def _simulaciones(requests):
+    return [
+        SimulacionRequest(sueldo_base=r.sueldo_liquido, **r.model_dump(exclude={"sueldo_liquido"}))
+        for r in requests
+    ]
+
+
+def test_lote_de_calculo_igual_al_escalar():
+    service, lote = CalculadoraService(), CalculadoraLoteService()
+    p = obtener_parametros()
+    requests = _requests(1000, semilla=32)
+
+    escalares = [service._resolver_sueldo_base(r, "exacto", p) for r in requests]
+
+    assert lote.resolver_lote(requests) == escalares
+
+
+def test_lote_de_simulacion_igual_al_escalar():
+    service, lote = CalculadoraService(), CalculadoraLoteService()
+    requests = _simulaciones(_requests(1000, semilla=320))
+
+    escalares = [service.simular(r) for r in requests]
+    por_lote = lote.simular_lote(requests)
+
+    for escalar, vectorial in zip(escalares, por_lote):
+        assert vectorial.model_dump(exclude={"detalle"}) == escalar.model_dump(exclude={"detalle"})
+        assert vectorial.detalle == pytest.approx(escalar.detalle, abs=1e-6)
+
+
+def test_curva_cubre_el_rango_y_coincide_con_simular():
+    service, lote = CalculadoraService(), CalculadoraLoteService()
+    request = CurvaRequest(base_desde=300_000, base_hasta=6_005_000, paso=10_000, afp_nombre="Uno")
+
+    curva = lote.curva(request)
+
+    assert curva.sueldo_base[0] == 300_000
+    assert curva.sueldo_base[-1] == 6_000_000  # el último punto no pasa de base_hasta
+    assert len(set(map(len, curva.model_dump().values()))) == 1
+    assert all(a <= b for a, b in zip(curva.sueldo_liquido, curva.sueldo_liquido[1:]))
+    # Bajo el tope de gratificación $1 de base suma $1,25 de imponible: la tasa puede ser negativa
+    assert all(-0.25 <= t < 1 for t in curva.tasa_marginal)
+    assert min(curva.tasa_marginal) < 0 < max(curva.tasa_marginal)
+    for i in (0, 100, len(curva.sueldo_base) - 1):
+        simulado = service.simular(SimulacionRequest(sueldo_base=curva.sueldo_base[i], afp_nombre="Uno"))
+        assert curva.sueldo_liquido[i] == simulado.sueldo_liquido
+
+
+def test_curva_de_un_punto():
+    curva = CalculadoraLoteService().curva(CurvaRequest(base_desde=500_000, base_hasta=500_000))
+    assert curva.sueldo_base == [500_000]
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"base_desde": 2_000_000, "base_hasta": 1_000_000},
+    {"base_desde": 0, "base_hasta": 10_000_000, "paso": 1},
+])
+def test_curva_fuera_de_limites_responde_400(cuerpo):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    assert TestClient(app).post("/api/v1/calculadora/curva", json=cuerpo).status_code == 400
+
+
+def _impuesto_por_recorrido(p, base):
+    """Referencia: recorre los tramos en orden (como antes del bisect)."""
+    if base <= 0:
+        return 0.0
+    for hasta, tasa, rebaja in zip(p.tramos_hasta, p.tramos_tasa, p.tramos_rebaja):
+        if base <= hasta:
+            return base * tasa - rebaja
+    return base * p.tramos_tasa[-1] - p.tramos_rebaja[-1]
+
+
+def test_tramo_de_impuesto_en_los_limites():
+    import numpy as np
+
+    p = obtener_parametros()
+    limites = [h for h in p.tramos_hasta if h != float("inf")]
+    bases = [-1.0, 0.0, 0.01, 1e12]
+    for h in limites:
+        bases += [h - 0.01, h, h + 0.01]
+
+    for base in bases:
+        assert p.impuesto(base) == pytest.approx(_impuesto_por_recorrido(p, base), abs=1e-9), base
+    vectorial = CalculadoraLoteService.calcular_impuesto_unico(np.array(bases), p)
+    assert vectorial.tolist() == pytest.approx([p.impuesto(b) for b in bases], abs=1e-9)
+    # Los tramos son continuos: cruzar un límite no salta el impuesto
+    for h in limites:
+        assert abs(p.impuesto(h + 0.01) - p.impuesto(h)) < 1
+
+
+@pytest.fixture
+def registro_restaurado():
+    """Deja el registro global de parámetros como estaba al terminar el test."""
+    from app.core.calculadora_parametros import registro_parametros
+
+    estado, ruta, firma = registro_parametros._estado, registro_parametros._ruta, registro_parametros._firma_archivo
+    yield registro_parametros
+    registro_parametros._estado, registro_parametros._ruta = estado, ruta
+    registro_parametros._firma_archivo = firma
+
+
+def test_memo_se_vacia_al_recargar_parametros(tmp_path, registro_restaurado):
+    import json
+
+    from app.services.calculadora_service import memo_calculadora
+
+    service = CalculadoraService()
+    request = SimulacionRequest(sueldo_base=1_500_000, salud_sistema="isapre", salud_uf=8)
+    antes = service.simular(request)
+    aciertos = memo_calculadora.aciertos
+    assert service.simular(request) == antes
+    assert memo_calculadora.aciertos == aciertos + 1
+
+    # Una sola versión con UF más alta: el plan isapre cuesta más
+    datos = registro_restaurado.datos_version()
+    datos.update(vigente_desde="2000-01-01", valor_uf=datos["valor_uf"] * 1.5)
+    ruta = tmp_path / "parametros.json"
+    ruta.write_text(json.dumps({"versiones": [datos]}), encoding="utf-8")
+    invalidaciones = memo_calculadora.invalidaciones
+    registro_restaurado.cargar(str(ruta))
+
+    assert memo_calculadora.invalidaciones == invalidaciones + 1
+    assert memo_calculadora.estadisticas()["items"] == 0
+    despues = service.simular(request)
+    assert despues.sueldo_liquido < antes.sueldo_liquido
+
+
+def test_memo_distingue_requests_equivalentes_solo_por_lo_que_importa():
+    from app.services.calculadora_service import memo_calculadora
+
+    service = CalculadoraService()
+    base = dict(sueldo_base=987_000, movilizacion=12_345)
+    con_bonos = SimulacionRequest(**base, bonos=[
+        BonoInput(nombre="a", monto=1000), BonoInput(nombre="b", monto=2000, imponible=False),
+    ])
+    reordenados = SimulacionRequest(**base, bonos=[
+        BonoInput(nombre="x", monto=2000, imponible=False), BonoInput(nombre="y", monto=1000),
+    ])
+
+    service.simular(con_bonos)
+    aciertos = memo_calculadora.aciertos
+    assert service.simular(reordenados).sueldo_liquido == service.simular(con_bonos).sueldo_liquido
+    assert memo_calculadora.aciertos == aciertos + 2
+
+
+@pytest.mark.parametrize("liquido", [500_000, 1_800_000, 4_500_000, 12_000_000])
+def test_matriz_de_comparacion_igual_al_calculo_por_celda(liquido):
+    service = CalculadoraService()
+    bonos = [BonoInput(nombre="turno", monto=50_000), BonoInput(nombre="colación", monto=30_000, imponible=False)]
+    request = CompararRequest(sueldo_liquido=liquido, movilizacion=40_000, bonos=bonos, planes_isapre_uf=[2.5, 6, 15])
+
+    matriz = CalculadoraLoteService().comparar(request)
+
+    assert len(matriz.sueldo_base) == len(matriz.afps)
+    assert all(len(fila) == len(matriz.salud) == 4 for fila in matriz.sueldo_base)
+    for i, afp in enumerate(matriz.afps):
+        for j, salud in enumerate(matriz.salud):
+            celda = service.resolver_sueldo_base(CalculoRequest(
+                sueldo_liquido=liquido, movilizacion=40_000, bonos=bonos, afp_nombre=afp,
+                salud_sistema=salud.sistema, salud_uf=salud.plan_uf,
+            ))
+            assert matriz.sueldo_base[i][j] == celda.sueldo_base, (afp, salud)
+            assert matriz.sueldo_liquido[i][j] == celda.sueldo_liquido
+            assert matriz.cotizacion_salud[i][j] == celda.cotizacion_salud
+            assert matriz.impuesto[i][j] == celda.impuesto
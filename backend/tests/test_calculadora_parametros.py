@@ -0,0 +1,69 @@
+"""Parámetros de la calculadora versionados por fecha, con recarga en caliente."""
+import json
+import os
+from datetime import date
+
+import pytest
+
+from app.core.calculadora_parametros import RegistroParametros
+from app.core.exceptions import ParametrosNoVigentesError
+
+
+def _version(vigente_desde: str, uf: float) -> dict:
+    datos = RegistroParametros().datos_version()
+    datos.update(vigente_desde=vigente_desde, valor_uf=uf)
+    return datos
+
+
+def _escribir(ruta, *versiones) -> None:
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"versiones": list(versiones)}, f)
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = tmp_path / "parametros.json"
+    # Desordenadas a propósito: el registro las ordena por vigencia
+    _escribir(ruta, _version("2025-07-01", 39_000), _version("2025-01-01", 38_000))
+    return str(ruta)
+
+
+def test_elige_la_version_vigente_a_la_fecha(ruta):
+    registro = RegistroParametros()
+    registro.cargar(ruta)
+
+    assert registro.obtener(date(2025, 1, 1)).uf == 38_000
+    assert registro.obtener(date(2025, 6, 30)).uf == 38_000
+    assert registro.obtener(date(2025, 7, 1)).uf == 39_000
+    assert registro.obtener(date(2030, 1, 1)).uf == 39_000
+    with pytest.raises(ParametrosNoVigentesError):
+        registro.obtener(date(2024, 12, 31))
+
+
+def test_recarga_avisa_y_cambia_la_version(ruta):
+    registro = RegistroParametros()
+    registro.cargar(ruta)
+    avisos = []
+    registro.al_recargar(lambda: avisos.append(registro.version))
+    version = registro.version
+
+    assert not registro.recargar_si_cambio()
+    _escribir(ruta, _version("2025-01-01", 38_500))
+    os.utime(ruta, ns=(0, 10**18))  # otra firma aunque el mtime no alcance a cambiar
+
+    assert registro.recargar_si_cambio()
+    assert avisos == [version + 1]
+    assert registro.obtener(date(2025, 8, 1)).uf == 38_500
+
+
+def test_archivo_invalido_mantiene_los_parametros(ruta):
+    registro = RegistroParametros()
+    registro.cargar(ruta)
+    avisos = []
+    registro.al_recargar(lambda: avisos.append(True))
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write('{"versiones": [{"vigente_desde": "2025-01-01"}]}')
+
+    assert not registro.recargar_si_cambio()
+    assert avisos == []
+    assert registro.obtener(date(2025, 8, 1)).uf == 39_000
@@ -0,0 +1,59 @@
+"""Compartimentos (bulkheads) para código bloqueante."""
+import asyncio
+import threading
+
+import pytest
+
+from app.core.concurrency import BoundedExecutor, iterar_sync
+from app.core.exceptions import ServicioSaturadoError
+
+
+def test_iterar_sync_lee_cada_elemento_en_el_compartimento():
+    executor = BoundedExecutor(1, 0, "prueba-iter")
+    hilos, cerrado = [], []
+
+    def filas():
+        for i in range(3):
+            hilos.append(threading.current_thread().name)
+            yield i
+
+    async def recorrer():
+        return [f async for f in iterar_sync(filas(), lambda: cerrado.append(True), executor)]
+
+    assert asyncio.run(recorrer()) == [0, 1, 2]
+    assert all(h.startswith("prueba-iter") for h in hilos)
+    assert cerrado == [True]
+
+
+def test_iterar_sync_cierra_si_el_cliente_corta():
+    executor = BoundedExecutor(1, 0, "prueba-iter")
+    cerrado = []
+
+    def filas():
+        try:
+            yield from range(100)
+        finally:
+            cerrado.append(threading.current_thread().name)
+
+    async def leer_dos():
+        iterador = filas()
+        stream = iterar_sync(iterador, iterador.close, executor)
+        leidos = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return leidos
+
+    assert asyncio.run(leer_dos()) == [0, 1]
+    assert len(cerrado) == 1 and cerrado[0].startswith("prueba-iter")
+
+
+def test_iterar_sync_con_compartimento_saturado_rechaza_y_cierra():
+    executor = BoundedExecutor(1, 0, "prueba-iter")
+    executor.capacidad = 0
+    cerrado = []
+
+    async def primera():
+        return await iterar_sync(iter([1]), lambda: cerrado.append(True), executor).__anext__()
+
+    with pytest.raises(ServicioSaturadoError):
+        asyncio.run(primera())
+    assert cerrado == [True]
@@ -0,0 +1,138 @@
+"""Fórmulas vectorizadas del finiquito contra casos calculados a mano."""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.calculadora_parametros import RegistroParametros
+from app.schemas.finiquitos import FiniquitoEscenario
+from app.services.finiquito_calculo_service import (
+    anios_indemnizacion,
+    calcular_finiquitos,
+    dias_corridos,
+    es_item_variable,
+    promedio_variable,
+)
+
+# Enero 2025: el 3 es viernes, el 4 sábado, el 5 domingo y el 6 lunes
+JUEVES = np.datetime64("2025-01-02")
+VIERNES = np.datetime64("2025-01-03")
+SABADO = np.datetime64("2025-01-04")
+DOMINGO = np.datetime64("2025-01-05")
+MIERCOLES = np.datetime64("2025-01-01")
+
+
+@pytest.mark.parametrize("termino, habiles, esperado", [
+    # Desde el lunes 6 al viernes 10, más el fin de semana previo
+    (VIERNES, 5, 7),
+    # La fracción sobre 0,2 cae en sábado: se suma el fin de semana siguiente
+    (VIERNES, 5.5, 9.5),
+    # Fracción de 0,2 o menos: no se agrega el fin de semana
+    (VIERNES, 5.1, 7.1),
+    # Jueves, viernes y lunes
+    (MIERCOLES, 3, 5),
+    # Solo el viernes, y la fracción arrastra el fin de semana
+    (JUEVES, 1.5, 3.5),
+    # Término en sábado: el domingo cuenta antes del lunes
+    (SABADO, 1, 2),
+    (DOMINGO, 1, 1),
+    # Sin días enteros queda solo la fracción
+    (VIERNES, 0.5, 0.5),
+    (VIERNES, 0, 0),
+    (VIERNES, -2, 0),
+])
+def test_dias_corridos_alrededor_del_fin_de_semana(termino, habiles, esperado):
+    resultado = dias_corridos(termino, np.array([habiles], dtype=float))
+    assert resultado[0] == pytest.approx(esperado)
+
+
+def test_dias_corridos_evalua_el_lote_completo():
+    habiles = np.array([5, 5.5, 0.5, 0, 10])
+    # 10 hábiles desde el viernes: lunes 6 a viernes 17, más el primer fin de semana
+    assert dias_corridos(VIERNES, habiles) == pytest.approx([7, 9.5, 0.5, 0, 14])
+
+
+@pytest.mark.parametrize("anios, esperado", [
+    (0, 0), (0.99, 0),
+    (1, 1), (1.2, 1.2), (1.49, 1.49),
+    (1.5, 2), (2.49, 2), (2.5, 3), (10.7, 11),
+])
+def test_anios_indemnizacion(anios, esperado):
+    assert anios_indemnizacion(np.array([anios]))[0] == pytest.approx(esperado)
+
+
+def test_es_item_variable():
+    assert es_item_variable("remuneracion_variable", "Comisión")
+    assert es_item_variable("remuneracion_ocasional", "Bono Producción")
+    assert not es_item_variable("remuneracion_ocasional", "Bono Navidad")
+    assert es_item_variable("haber_fijo", "Bono Supervisores Noche")
+    assert not es_item_variable("haber_fijo", "Sueldo Base")
+    assert not es_item_variable(None, None)
+
+
+def test_promedio_variable_promedia_por_concepto_y_suma_por_trabajador():
+    trabajador = np.array([0, 0, 0, 1, 1])
+    concepto = np.array([0, 0, 1, 0, 0])
+    monto = np.array([100.0, 200.0, 50.0, 100.0, 101.0])
+
+    # Trabajador 0: 150 + 50; trabajador 1: 100,5 redondeado hacia arriba; el 2 no tiene items
+    assert promedio_variable(trabajador, concepto, monto, 3).tolist() == [200, 101, 0]
+    assert promedio_variable(np.array([]), np.array([]), np.array([]), 2).tolist() == [0, 0]
+
+
+def _finiquito_a_mano(ingreso: date, sueldo: float, variable: float, habiles: float,
+                      descuentos: float, escenario: FiniquitoEscenario, p) -> dict:
+    """Mismo cálculo que la pantalla, un trabajador a la vez."""
+    anios = max((escenario.fecha_termino - ingreso).days, 0) / 365.25
+    if anios < 1:
+        anios_indem = 0.0
+    elif anios < 1.5:
+        anios_indem = anios
+    else:
+        anios_indem = int(anios) + (1 if anios - int(anios) >= 0.5 else 0)
+    base = sueldo + variable
+    total_haberes = base + min(base * p.porcentaje_gratificacion, p.tope_gratificacion) + escenario.movilizacion
+    con_indemnizacion = escenario.causal in ("necesidades_empresa", "mutuo_acuerdo")
+    indemnizacion = anios_indem * total_haberes if con_indemnizacion else 0
+    mes_aviso = total_haberes if con_indemnizacion and not escenario.aviso_dado else 0
+    corridos = dias_corridos(np.datetime64(escenario.fecha_termino, "D"), np.array([habiles]))[0]
+    vacaciones = np.floor(base / 30 * corridos + 0.5)
+    return {
+        "total_haberes": total_haberes,
+        "indemnizacion_anios": indemnizacion,
+        "mes_aviso": mes_aviso,
+        "vacaciones_proporcionales": vacaciones,
+        "total_finiquito": mes_aviso + indemnizacion + vacaciones - descuentos,
+    }
+
+
+@pytest.mark.parametrize("causal, aviso_dado", [
+    ("necesidades_empresa", False),
+    ("mutuo_acuerdo", True),
+    ("renuncia", False),
+])
+def test_calcular_finiquitos_igual_al_calculo_por_trabajador(causal, aviso_dado):
+    p = RegistroParametros().obtener()
+    escenario = FiniquitoEscenario(fecha_termino=date(2025, 1, 3), causal=causal, aviso_dado=aviso_dado)
+    filas = [
+        # (ingreso, sueldo base, variable, días hábiles, descuentos)
+        (date(2024, 6, 1), 600_000, 0, 7.5, 0),           # menos de un año
+        (date(2023, 9, 1), 900_000, 150_000, 12, 50_000),  # entre 1 y 1,5 años
+        (date(2019, 2, 1), 2_500_000, 400_000, 3.25, 0),   # tope de gratificación
+        (date(2025, 2, 1), 550_000, 0, 0, 0),              # ingreso posterior al término
+    ]
+
+    resultado = calcular_finiquitos(
+        np.array([f[0] for f in filas], dtype="datetime64[D]"),
+        np.array([f[1] for f in filas], dtype=float),
+        np.array([f[2] for f in filas], dtype=float),
+        np.array([f[3] for f in filas], dtype=float),
+        np.array([f[4] for f in filas], dtype=float),
+        escenario,
+        p,
+    )
+
+    for i, fila in enumerate(filas):
+        esperado = _finiquito_a_mano(*fila, escenario, p)
+        for campo, valor in esperado.items():
+            assert resultado[campo][i] == pytest.approx(valor), (i, campo)
@@ -0,0 +1,63 @@
+"""Endpoints de /health: la prueba de vida es pública, el detalle es solo para admin."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.principal import cache_principales
+from app.db.deps import get_db
+from app.main import app
+from app.models.auth import Role, Usuario
+from app.services.auth_service import AuthService
+
+DETALLE = [
+    "/api/v1/health/auth",
+    "/api/v1/health/pools",
+    "/api/v1/health/bulkheads",
+    "/api/v1/health/arranque",
+    "/api/v1/health/buk",
+    "/api/v1/health/calculadora",
+]
+
+
+@pytest.fixture
+def client(sesiones_auth):
+    db = sesiones_auth()
+    admin, rrhh = Role(nombre="admin"), Role(nombre="rrhh")
+    db.add_all([admin, rrhh])
+    db.flush()
+    db.add_all([
+        Usuario(username="admin", password_hash="x", rol_id=admin.id, activo=True),
+        Usuario(username="rrhh", password_hash="x", rol_id=rrhh.id, activo=True),
+    ])
+    db.commit()
+
+    def _get_db():
+        sesion = sesiones_auth()
+        try:
+            yield sesion
+        finally:
+            sesion.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    cache_principales.invalidar_usuario("admin")
+    cache_principales.invalidar_usuario("rrhh")
+    tokens = {
+        u.username: AuthService(db).create_token_for_user(u)
+        for u in db.query(Usuario)
+    }
+    db.close()
+    yield TestClient(app), tokens
+    app.dependency_overrides.pop(get_db, None)
+
+
+def test_prueba_de_vida_es_publica(client):
+    http, _ = client
+    respuesta = http.get("/api/v1/health")
+    assert respuesta.status_code == 200 and respuesta.json() == {"status": "ok"}
+
+
+@pytest.mark.parametrize("ruta", DETALLE)
+def test_detalle_requiere_admin(client, ruta):
+    http, tokens = client
+    assert http.get(ruta).status_code == 401
+    assert http.get(ruta, headers={"Authorization": f"Bearer {tokens['rrhh']}"}).status_code == 403
+    assert http.get(ruta, headers={"Authorization": f"Bearer {tokens['admin']}"}).status_code == 200
@@ -0,0 +1,45 @@
+"""Arranque y apagado de la aplicación (lifespan)."""
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.core.calculadora_parametros import registro_parametros
+from app.db import session, session_marcas
+from app.main import app
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lifespan_arranca_y_apaga_sin_bd():
+    with TestClient(app) as client:
+        assert client.get("/").status_code == 200
+        perfil = app.state.perfil_arranque
+        assert perfil["startup_ms"] >= 0 and perfil["import_ms"] > 0
+        assert registro_parametros._hilo is not None
+
+    assert registro_parametros._hilo is None
+
+
+def test_importar_la_app_no_crea_engines():
+    # En un proceso limpio: en este, otros tests pueden haber creado los engines
+    codigo = (
+        "import app.main\n"
+        "from app.db import session, session_marcas\n"
+        "assert not session.engine_creado()\n"
+        "assert not session_marcas.engine_creado()\n"
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=BACKEND, env=os.environ.copy(),
+        capture_output=True, text=True, timeout=60
+    )
+    assert resultado.returncode == 0, resultado.stderr
+
+
+def test_arranque_sin_requests_no_abre_la_bd():
+    with TestClient(app) as client:
+        client.get("/")
+        client.get("/health")
+    assert not session.engine_creado()
+    assert not session_marcas.engine_creado()
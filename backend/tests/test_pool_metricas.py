@@ -0,0 +1,98 @@
+"""Métricas de los pools de conexiones (/health/pools)."""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db import pool_metricas
+from app.db.pool_metricas import MetricasPool, PoolInstrumentado, estado_pools, instrumentar
+
+
+@pytest.fixture(autouse=True)
+def pools_registrados(monkeypatch):
+    monkeypatch.setattr(pool_metricas, "_pools", {})
+
+
+def _engine(tmp_path, pool_size, max_overflow, pool_timeout=1):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'db.sqlite'}",
+        poolclass=PoolInstrumentado,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+    )
+    return instrumentar(engine, "prueba")
+
+
+def test_cuenta_checkouts_conexiones_y_maximo_en_uso(tmp_path):
+    engine = _engine(tmp_path, pool_size=2, max_overflow=1)
+
+    conexiones = [engine.connect() for _ in range(3)]
+    for conexion in conexiones:
+        conexion.execute(text("select 1"))
+        conexion.close()
+    with engine.connect() as conexion:
+        conexion.execute(text("select 1"))
+
+    metricas = engine.pool.metricas.snapshot()
+    assert metricas["checkouts"] == 4
+    assert metricas["max_en_uso"] == 3
+    assert metricas["max_overflow_usado"] == 1
+    # La de overflow se cierra al devolverla; el cuarto checkout reusa una del pool
+    assert metricas["conexiones_abiertas"] == 3
+    assert metricas["timeouts"] == 0
+    assert sum(metricas["histograma_espera"].values()) == 4
+
+
+def test_timeout_se_cuenta_aparte_de_los_checkouts(tmp_path):
+    engine = _engine(tmp_path, pool_size=1, max_overflow=0, pool_timeout=0.1)
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    metricas = engine.pool.metricas.snapshot()
+    assert metricas["timeouts"] == 1
+    assert metricas["checkouts"] == 1
+
+
+def test_invalidacion_y_dispose_conservan_las_metricas(tmp_path):
+    engine = _engine(tmp_path, pool_size=1, max_overflow=0)
+    metricas = engine.pool.metricas
+
+    with engine.connect() as conexion:
+        conexion.invalidate()
+    engine.dispose()
+    with engine.connect() as conexion:
+        conexion.execute(text("select 1"))
+
+    assert engine.pool.metricas is metricas
+    snapshot = metricas.snapshot()
+    assert snapshot["invalidaciones"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["conexiones_abiertas"] == 2
+
+
+def test_histograma_y_percentiles_por_balde():
+    metricas = MetricasPool()
+    for segundos in [0.0005] * 90 + [0.02] * 5 + [0.3] * 4 + [20]:
+        metricas.registrar_espera(segundos, en_uso=1, overflow=0)
+
+    snapshot = metricas.snapshot()
+    assert snapshot["histograma_espera"]["<=1ms"] == 90
+    assert snapshot["histograma_espera"]["<=25ms"] == 5
+    assert snapshot["histograma_espera"]["<=500ms"] == 4
+    assert snapshot["histograma_espera"][">10000ms"] == 1
+    assert snapshot["espera_p50_ms"] == 1
+    assert snapshot["espera_p95_ms"] == 25
+    assert snapshot["espera_p99_ms"] == 500
+    assert snapshot["espera_max_ms"] == 20000.0
+    assert MetricasPool().snapshot()["espera_p50_ms"] is None
+
+
+def test_estado_pools_incluye_configuracion_y_uso(tmp_path):
+    engine = _engine(tmp_path, pool_size=2, max_overflow=3)
+
+    with engine.connect():
+        estado = estado_pools()["prueba"]
+
+    assert (estado["pool_size"], estado["max_overflow"], estado["en_uso"]) == (2, 3, 1)
+    assert estado["checkouts"] == 1
@@ -0,0 +1,92 @@
+"""Cache de principales: las escrituras de AuthService se ven en el request siguiente."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.principal import CachePrincipales
+from app.core.revocacion import ListaRevocacion
+from app.core.security import create_access_token, get_current_principal
+from app.models.auth import Role, Usuario
+from app.services import auth_service
+from app.services.auth_service import AuthService
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = CachePrincipales(ttl_seconds=3600, max_items=100)
+    revocacion = ListaRevocacion(str(tmp_path / "revocaciones.json"), recarga_seconds=3600, vida_token_seconds=3600)
+    for modulo in (security, auth_service):
+        monkeypatch.setattr(modulo, "cache_principales", cache)
+        monkeypatch.setattr(modulo, "lista_revocacion", revocacion)
+    return cache
+
+
+@pytest.fixture
+def db(sesiones_auth):
+    db = sesiones_auth()
+    db.add_all([Role(nombre="usuario"), Role(nombre="admin")])
+    db.flush()
+    db.add(Usuario(username="ana", password_hash="x", rol_id=1, activo=True))
+    db.commit()
+    yield db
+    db.close()
+
+
+def _principal(db, token: str):
+    return asyncio.run(get_current_principal(token=token, db=db))
+
+
+def test_principal_se_sirve_desde_cache(db, cache):
+    token = create_access_token({"sub": "ana"})
+
+    assert _principal(db, token).rol == "usuario"
+    assert _principal(db, token).rol == "usuario"
+    assert cache.estadisticas()["aciertos"] == 1
+    assert cache.estadisticas()["fallos"] == 1
+
+
+def test_cambio_de_rol_invalida_la_entrada(db, cache):
+    token = create_access_token({"sub": "ana"})
+    assert _principal(db, token).rol == "usuario"
+
+    admin = db.query(Role).filter(Role.nombre == "admin").one()
+    AuthService(db).update_user(1, rol_id=admin.id)
+    db.expire_all()
+
+    assert _principal(db, token).rol == "admin"
+    assert cache.estadisticas()["invalidaciones"] == 1
+
+
+def test_usuario_desactivado_no_sigue_autenticado_desde_cache(db, cache):
+    token = create_access_token({"sub": "ana"})
+    assert _principal(db, token).activo
+
+    # Sin pasar por la lista de revocación: solo la cache puede rechazarlo
+    AuthService(db).update_user(1, activo=False)
+    db.expire_all()
+
+    with pytest.raises(HTTPException) as error:
+        _principal(db, token)
+    assert error.value.detail == "Usuario desactivado"
+
+
+def test_deactivate_user_invalida_la_entrada(db, cache):
+    token = create_access_token({"sub": "ana"})
+    _principal(db, token)
+    assert cache.obtener("ana") is not None
+
+    AuthService(db).deactivate_user(1)
+
+    assert cache.obtener("ana") is None
+
+
+def test_carga_concurrente_con_invalidacion_no_queda_en_cache(cache):
+    def cargar():
+        # Un update del usuario llega mientras se lee la foto anterior
+        cache.invalidar_usuario("ana")
+        return object()
+
+    assert cache.cargar("ana", cargar) is not None
+    assert cache.obtener("ana") is None
@@ -0,0 +1,78 @@
+"""Lista de revocación compartida entre workers por archivo."""
+import multiprocessing
+import time
+
+from app.core.revocacion import ListaRevocacion
+
+
+def _worker(ruta: str) -> ListaRevocacion:
+    # Recarga lenta: cada worker escribe sin haber visto los cambios de los demás
+    return ListaRevocacion(ruta, recarga_seconds=3600, vida_token_seconds=3600)
+
+
+def test_escritura_de_un_worker_no_pisa_la_de_otro(tmp_path):
+    ruta = str(tmp_path / "revocaciones.json")
+    a, b = _worker(ruta), _worker(ruta)
+    exp = time.time() + 600
+
+    a.revocar_token("jti-a", exp)
+    b.revocar_token("jti-b", exp)
+    a.revocar_usuario("ana")
+
+    nuevo = _worker(ruta)
+    nuevo.cargar()
+    assert nuevo.revocado({"jti": "jti-a"})
+    assert nuevo.revocado({"jti": "jti-b"})
+    assert nuevo.revocado({"sub": "ana", "iat": time.time() - 1})
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def _revocar_muchos(ruta: str, prefijo: str, cantidad: int) -> None:
+    lista = ListaRevocacion(ruta, recarga_seconds=3600, vida_token_seconds=3600)
+    for i in range(cantidad):
+        lista.revocar_token(f"{prefijo}-{i}", time.time() + 600)
+
+
+def test_procesos_concurrentes_no_pierden_revocaciones(tmp_path):
+    ruta = str(tmp_path / "revocaciones.json")
+    procesos = [
+        multiprocessing.Process(target=_revocar_muchos, args=(ruta, f"p{n}", 25))
+        for n in range(4)
+    ]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join(timeout=30)
+        assert p.exitcode == 0
+
+    lista = ListaRevocacion(ruta, recarga_seconds=3600, vida_token_seconds=3600)
+    lista.cargar()
+    assert lista.estado()["tokens_revocados"] == 100
+
+
+def test_consulta_no_toca_el_archivo(tmp_path, monkeypatch):
+    lista = _worker(str(tmp_path / "revocaciones.json"))
+    lista.revocar_token("jti-a", time.time() + 600)
+
+    def sin_disco(*args, **kwargs):
+        raise AssertionError("revocado() no debe leer el disco")
+    monkeypatch.setattr("app.core.revocacion.os.stat", sin_disco)
+    monkeypatch.setattr("builtins.open", sin_disco)
+
+    assert lista.revocado({"jti": "jti-a"})
+    assert not lista.revocado({"jti": "jti-b", "sub": "ana", "iat": time.time()})
+
+
+def test_hilo_de_recarga_ve_lo_revocado_por_otro_worker(tmp_path):
+    ruta = str(tmp_path / "revocaciones.json")
+    lector = ListaRevocacion(ruta, recarga_seconds=0.05, vida_token_seconds=3600)
+    lector.iniciar_recarga()
+    try:
+        _worker(ruta).revocar_usuario("ana")
+        limite = time.time() + 2
+        while not lector.revocado({"sub": "ana", "iat": 0}) and time.time() < limite:
+            time.sleep(0.02)
+        assert lector.revocado({"sub": "ana", "iat": 0})
+    finally:
+        lector.detener_recarga()
+    assert lector._hilo is None
@@ -0,0 +1,116 @@
+"""Validación de conexiones en segundo plano: nunca deja a un request esperando por el ping."""
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.db.pool_metricas import PoolInstrumentado, instrumentar
+from app.db.salud_conexiones import ValidadorConexiones, validar_pool
+
+
+def _engine(tmp_path, pool_size, max_overflow, validador=None, **kwargs):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'db.sqlite'}",
+        poolclass=PoolInstrumentado,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=1,
+        **kwargs
+    )
+    instrumentar(engine, "test")
+    if validador is not None:
+        validador.registrar(engine, "test")
+        validador.detener()
+    conexiones = [engine.connect() for _ in range(pool_size)]
+    for conexion in conexiones:
+        conexion.close()
+    return engine
+
+
+def _ping_lento(engine, segundos):
+    original = engine.dialect.do_ping
+
+    def do_ping(dbapi_connection):
+        time.sleep(segundos)
+        return original(dbapi_connection)
+    engine.dialect.do_ping = do_ping
+
+
+def _checkout_durante_validacion(engine):
+    validador = threading.Thread(target=validar_pool, args=(engine, 0))
+    validador.start()
+    time.sleep(0.1)
+    inicio = time.perf_counter()
+    with engine.connect() as conexion:
+        conexion.execute(text("select 1"))
+    espera = time.perf_counter() - inicio
+    validador.join()
+    return espera
+
+
+def test_pool_sin_reserva_no_se_valida(tmp_path):
+    engine = _engine(tmp_path, pool_size=1, max_overflow=0)
+    _ping_lento(engine, 3)
+
+    assert _checkout_durante_validacion(engine) < 0.5
+    assert validar_pool(engine, 0)["omitidas"] == 1
+
+
+def test_validacion_deja_conexiones_libres(tmp_path):
+    engine = _engine(tmp_path, pool_size=3, max_overflow=0)
+    _ping_lento(engine, 0.5)
+
+    assert _checkout_durante_validacion(engine) < 0.3
+    resultado = validar_pool(engine, 0)
+    assert resultado["validadas"] == 3 and resultado["omitidas"] == 0
+
+
+def test_validacion_pasa_por_checkouts_del_pool(tmp_path):
+    engine = _engine(tmp_path, pool_size=3, max_overflow=0)
+    checkouts = engine.pool.metricas.checkouts
+
+    validar_pool(engine, 0)
+
+    assert engine.pool.metricas.checkouts == checkouts + 3
+    assert engine.pool.checkedin() == 3 and engine.pool.checkedout() == 0
+
+
+def test_ping_fallido_invalida_y_la_pasada_siguiente_reabre(tmp_path):
+    validador = ValidadorConexiones(intervalo_seconds=60, inactividad_seconds=0)
+    engine = _engine(tmp_path, pool_size=3, max_overflow=0, validador=validador)
+
+    def do_ping(dbapi_connection):
+        raise RuntimeError("conexión caída")
+    engine.dialect.do_ping = do_ping
+
+    validador.validar()
+
+    metricas = engine.pool.metricas
+    assert metricas.validaciones_fallidas == 3 and metricas.invalidaciones == 3
+    assert validador._despertar.is_set()
+
+    del engine.dialect.do_ping
+    abiertas = metricas.conexiones_abiertas
+    resultado = validar_pool(engine, 0)
+    assert resultado["recicladas"] == 3
+    assert metricas.conexiones_abiertas == abiertas + 3
+
+
+def test_pool_recycle_reabre_en_el_checkout_del_validador(tmp_path):
+    validador = ValidadorConexiones(intervalo_seconds=60, inactividad_seconds=3600)
+    engine = _engine(tmp_path, pool_size=2, max_overflow=0, validador=validador, pool_recycle=1)
+    time.sleep(1.1)
+
+    resultado = validar_pool(engine, 3600)
+
+    assert resultado["recicladas"] == 2 and resultado["validadas"] == 0
+
+
+def test_checkin_del_validador_no_cuenta_como_uso(tmp_path):
+    validador = ValidadorConexiones(intervalo_seconds=60, inactividad_seconds=0.2)
+    engine = _engine(tmp_path, pool_size=2, max_overflow=0, validador=validador)
+    time.sleep(0.3)
+
+    # Una pasada que no hace ping (inactividad alta) no debe renovar la marca
+    assert validar_pool(engine, 3600)["validadas"] == 0
+    assert validar_pool(engine, 0.2)["validadas"] == 2
@@ -0,0 +1,49 @@
+"""Retención de simulaciones de dotación terminadas y sus CSV."""
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from app.core.config import settings
+from app.schemas.calculadora import SimulacionDotacionRequest
+from app.services.simulacion_dotacion_service import SimulacionDotacionService, TrabajoSimulacion
+
+
+def _terminada(servicio, directorio, hace: timedelta) -> TrabajoSimulacion:
+    trabajo = TrabajoSimulacion(SimulacionDotacionRequest(fecha=date(2026, 1, 1)))
+    trabajo.estado = "completada"
+    trabajo.terminada = datetime.now() - hace
+    trabajo.archivo = os.path.join(directorio, f"simulacion_{trabajo.id}.csv")
+    with open(trabajo.archivo, "w") as f:
+        f.write("rut\n")
+    servicio.trabajos[trabajo.id] = trabajo
+    return trabajo
+
+
+def test_purga_vencidas_y_excedentes_con_sus_archivos(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SIMULACION_DOTACION_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SIMULACION_DOTACION_RETENCION_HORAS", 1.0)
+    monkeypatch.setattr(settings, "SIMULACION_DOTACION_MAX_TERMINADAS", 2)
+    servicio = SimulacionDotacionService()
+
+    vencida = _terminada(servicio, str(tmp_path), timedelta(hours=2))
+    recientes = [_terminada(servicio, str(tmp_path), timedelta(minutes=m)) for m in (30, 20, 10)]
+    huerfano = tmp_path / "simulacion_de_otro_proceso.csv"
+    huerfano.write_text("rut\n")
+    os.utime(huerfano, (time.time() - 7200, time.time() - 7200))
+
+    vigentes = servicio.listar()
+
+    assert [t.id for t in vigentes] == [recientes[2].id, recientes[1].id]
+    assert not os.path.exists(vencida.archivo)
+    assert not os.path.exists(recientes[0].archivo)
+    assert all(os.path.exists(t.archivo) for t in vigentes)
+    assert not huerfano.exists()
+
+
+def test_porcentaje_cuenta_errores_aparte_de_procesados():
+    trabajo = TrabajoSimulacion(SimulacionDotacionRequest(fecha=date(2026, 1, 1)))
+    trabajo.total, trabajo.procesados, trabajo.errores = 10, 6, 2
+
+    estado = trabajo.a_estado()
+
+    assert (estado.procesados, estado.errores, estado.porcentaje) == (6, 2, 80.0)
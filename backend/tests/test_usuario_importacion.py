@@ -0,0 +1,101 @@
+"""Importación masiva de usuarios: las filas inválidas no impiden importar las demás."""
+import pytest
+
+from app.core.principal import CachePrincipales
+from app.core.revocacion import ListaRevocacion
+from app.models.auth import Modulo, Role, Usuario
+from app.services import usuario_importacion_service
+from app.services.usuario_importacion_service import UsuarioImportacionService, leer_csv_usuarios
+
+CSV = """username;password;email;nombre_completo;rol;modulos;activo
+nueva;clave1;nueva@empresa.cl;Nueva Persona;usuario;finiquitos;si
+existente;;nuevo@empresa.cl;;admin;;no
+;clave;;;usuario;;
+sinrol;clave;;;;;
+rolmalo;clave;;;gerente;;
+modmalo;clave;;;usuario;finiquitos|nomina;
+nueva;clave2;;;usuario;;
+activomalo;clave;;;usuario;;quizas
+sinclave;;;;usuario;;
+""".encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def sin_efectos_globales(monkeypatch, tmp_path):
+    # Hash trivial: bcrypt en el pool de procesos no es lo que se prueba aquí
+    monkeypatch.setattr(usuario_importacion_service, "hashear_passwords", lambda ps: [f"hash:{p}" for p in ps])
+    monkeypatch.setattr(usuario_importacion_service, "cache_principales", CachePrincipales(3600, 100))
+    monkeypatch.setattr(
+        usuario_importacion_service, "lista_revocacion",
+        ListaRevocacion(str(tmp_path / "revocaciones.json"), recarga_seconds=3600, vida_token_seconds=3600)
+    )
+
+
+@pytest.fixture
+def db(sesiones_auth):
+    db = sesiones_auth()
+    db.add_all([
+        Role(nombre="usuario"), Role(nombre="admin"),
+        Modulo(codigo="finiquitos", nombre="Finiquitos", orden=1, activo=True),
+    ])
+    db.flush()
+    db.add(Usuario(username="existente", password_hash="antiguo", rol_id=1, activo=True))
+    db.commit()
+    yield db
+    db.close()
+
+
+def _importar(db, actualizar_existentes=True):
+    filas, errores = leer_csv_usuarios(CSV)
+    return UsuarioImportacionService(db).importar(filas, actualizar_existentes, errores)
+
+
+def _usuario(db, username):
+    return db.query(Usuario).filter(Usuario.username == username).one_or_none()
+
+
+def test_filas_validas_se_importan_y_las_invalidas_informan_su_error(db):
+    respuesta = _importar(db)
+
+    estados = {r.fila: (r.estado, r.error) for r in respuesta.resultados}
+    assert estados[1] == ("creado", None)
+    assert estados[2] == ("actualizado", None)
+    assert estados[3] == ("error", "username vacío")
+    assert estados[4] == ("error", "rol es obligatorio para usuarios nuevos")
+    assert estados[5] == ("error", "Rol 'gerente' no existe")
+    assert estados[6] == ("error", "Módulos no existen: nomina")
+    assert estados[7] == ("error", "username 'nueva' repetido en la importación")
+    assert estados[8][0] == "error" and "quizas" in estados[8][1]
+    assert estados[9] == ("error", "password es obligatorio para usuarios nuevos")
+    assert (respuesta.total, respuesta.creados, respuesta.actualizados, respuesta.errores) == (9, 1, 1, 7)
+
+
+def test_importacion_guarda_solo_las_filas_validas(db):
+    _importar(db)
+    db.expire_all()
+
+    nueva = _usuario(db, "nueva")
+    assert nueva.password_hash == "hash:clave1"
+    assert nueva.rol.nombre == "usuario"
+    assert [m.codigo for m in nueva.modulos] == ["finiquitos"]
+    assert nueva.activo
+
+    existente = _usuario(db, "existente")
+    assert existente.email == "nuevo@empresa.cl"
+    assert existente.rol.nombre == "admin"
+    assert existente.password_hash == "antiguo"
+    assert not existente.activo
+
+    for username in ("sinrol", "rolmalo", "modmalo", "activomalo", "sinclave"):
+        assert _usuario(db, username) is None
+    assert db.query(Usuario).count() == 2
+
+
+def test_sin_actualizar_existentes_el_username_existente_es_error(db):
+    respuesta = _importar(db, actualizar_existentes=False)
+    db.expire_all()
+
+    assert respuesta.resultados[1].estado == "error"
+    assert respuesta.resultados[1].error == "El usuario 'existente' ya existe"
+    assert (respuesta.creados, respuesta.actualizados) == (1, 0)
+    assert _usuario(db, "existente").activo
@@ -3,6 +3,7 @@ import { useParams, useNavigate, useLocation } from "react-router-dom";
 import Sidebar from "../components/Sidebar";
 import FiniquitosService from "../services/finiquitos.service";
 import EmployeesService from "../services/employees.service";
+import CalculadoraService from "../services/calculadora.service";
 import { getLicenciasByRut } from "../services/licencias";
 
 const CrearFiniquito = () => {
@@ -28,6 +29,9 @@ const CrearFiniquito = () => {
   const [movilizacion, setMovilizacion] = useState(40000);
   const [liquidacionMesActual, setLiquidacionMesActual] = useState(0);
   const [descuentos, setDescuentos] = useState("");
+  // Sueldo mínimo vigente a la fecha de término, desde los parámetros del
+  // backend (los mismos que usa /finiquitos/calculo); null hasta que respondan
+  const [sueldoMinimo, setSueldoMinimo] = useState(null);
   const [selectedManager, setSelectedManager] = useState("");
 
   // Manager options
@@ -516,6 +520,21 @@ const CrearFiniquito = () => {
     return () => clearTimeout(debounceTimer);
   }, [rut, lastDayWork, vacationDaysManuallyEdited]);
 
+  // Sueldo mínimo para el tope de gratificación, vigente a la fecha de término
+  useEffect(() => {
+    let cancelado = false;
+    CalculadoraService.getParametros(lastDayWork || null)
+      .then((parametros) => {
+        if (!cancelado) setSueldoMinimo(parametros.sueldo_minimo);
+      })
+      .catch((error) => {
+        console.error("Error al obtener parámetros de cálculo:", error);
+      });
+    return () => {
+      cancelado = true;
+    };
+  }, [lastDayWork]);
+
   // Auto-calculate Vacation Value
   // Formula: (Sueldo Base + Promedio Bonos / 30) * Días corridos
   useEffect(() => {
@@ -596,8 +615,9 @@ const CrearFiniquito = () => {
 
   // Gratificación Legal = (Sueldo Base + Promedio Bonificaciones) * 25%
   // Tope = ((4.75/12) * Sueldo Mínimo) * 25%
-  const sueldoMinimo = 539000;
-  const topeGratificacion = (4.75 / 12) * sueldoMinimo;
+  // Sin parámetros aún (o si la API falla) no se aplica tope
+  const topeGratificacion =
+    sueldoMinimo !== null ? (4.75 / 12) * sueldoMinimo : Infinity;
   const gratificacionLegal = Math.min(
     (salary + variableBonus) * 0.25,
     topeGratificacion,
@@ -3,8 +3,11 @@ import axios from "axios";
 const API_URL = "http://localhost:8000/api/v1/calculadora";
 
 const CalculadoraService = {
-  getParametros: async () => {
-    const response = await axios.get(`${API_URL}/parametros`);
+  // fecha (YYYY-MM-DD) opcional: parámetros vigentes a esa fecha
+  getParametros: async (fecha = null) => {
+    const response = await axios.get(`${API_URL}/parametros`, {
+      params: fecha ? { fecha } : {},
+    });
     return response.data;
   },
 
@@ -22,6 +25,12 @@ const CalculadoraService = {
     const response = await axios.post(`${API_URL}/simular`, datos);
     return response.data;
   },
+
+  // Curva completa (columnar) para un rango de sueldos base en una sola llamada
+  getCurva: async (datos) => {
+    const response = await axios.post(`${API_URL}/curva`, datos);
+    return response.data;
+  },
 };
 
 export default CalculadoraService;
\ No newline at end of file
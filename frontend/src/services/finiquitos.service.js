@@ -13,9 +13,16 @@ const FiniquitosService = {
     return response.data;
   },
 
+  // Reporte NDJSON: un trabajador por línea con sus últimos 5 periodos
   getItemsTresMeses: async () => {
-    const response = await axios.get(`${API_URL}/meses-anteriores`);
-    return response.data;
+    const response = await axios.get(`${API_URL}/meses-anteriores`, {
+      params: { formato: "ndjson" },
+      responseType: "text",
+    });
+    return response.data
+      .split("\n")
+      .filter((line) => line.trim())
+      .map((line) => JSON.parse(line));
   },
 
   getDescuentosByRut: async (rut) => {
@@ -23,6 +30,14 @@ const FiniquitosService = {
     return response.data;
   },
 
+  // Items, sueldo base, vacaciones y descuentos en una sola llamada
+  getFiniquitoCompleto: async (rut, date = null) => {
+    const response = await axios.get(`${API_URL}/${rut}/completo`, {
+      params: date ? { date } : {},
+    });
+    return response.data;
+  },
+
   getIndicatorUF: async () => {
     try {
       const response = await axios.get("https://mindicador.cl/api/uf");